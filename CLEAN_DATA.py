@@ -31,8 +31,10 @@ TABLES_TO_TRUNCATE = [
     "comentarios",
     "imagenes_publicacion",
     "publicaciones",
+    "leaderboard_historico",
     "leaderboard",
     "partidas",
+    "partidas_envios",
     "users" # La tabla de usuarios es la última en vaciarse
 ]
 
@@ -1,6 +1,9 @@
 from flask import Flask, send_from_directory, request, jsonify
 from flask_cors import CORS
 from extensions import mysql, bcrypt, init_app as inicializar_extensiones
+from compresion import init_app as inicializar_compresion
+from contrasenas import init_app as inicializar_contrasenas
+from correo import init_app as inicializar_correo
 import os
 from datetime import timedelta
 from flask_jwt_extended import JWTManager
@@ -92,6 +95,15 @@ app.config['API_BASE_URL'] = os.getenv('API_BASE_URL', 'http://localhost:5000')
 # Inicializa TODAS las extensiones
 inicializar_extensiones(app)
 
+# Compresión negociada (br/gzip) de las respuestas de todos los blueprints
+inicializar_compresion(app)
+
+# Pool de conexiones SMTP compartido por todos los envíos de correo
+inicializar_correo(app)
+
+# Pool de procesos para bcrypt y calibración del coste al arrancar
+inicializar_contrasenas(app)
+
 # --- GANCHO DE DEBUGGING PARA TODAS LAS SOLICITUDES ---
 # El gancho before_request se ha eliminado ya que no es necesario para la depuración continua.
 # @app.before_request
@@ -133,11 +145,17 @@ from routes.auth import auth_bp
 from routes.user import user_bp
 from support import support_bp
 from pdf_routes import pdf_bp
+from routes.leaderboard import leaderboard_bp
+from routes.partidas import partidas_bp
+from routes.estadisticas import estadisticas_bp
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(user_bp)
 app.register_blueprint(support_bp)
 app.register_blueprint(pdf_bp)
+app.register_blueprint(leaderboard_bp)
+app.register_blueprint(partidas_bp)
+app.register_blueprint(estadisticas_bp)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
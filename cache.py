@@ -0,0 +1,200 @@
+# cache.py
+# Caché de respuestas en Redis con claves versionadas.
+# Cada recurso (el feed, los comentarios de una publicación...) tiene un contador de versión
+# en Redis. Las claves de caché incluyen esa versión, así que invalidar un recurso es un
+# simple INCR del contador: las entradas antiguas quedan huérfanas y expiran por TTL,
+# sin necesidad de recorrer claves con KEYS/SCAN.
+from extensions import redis_client
+import sys
+import time
+
+VERSION_KEY_PREFIX = "version:"
+CACHE_KEY_PREFIX = "cache:"
+
+# --- Tiempos de vida de las entradas de caché (segundos) ---
+TTL_FEED_SECONDS = 300
+TTL_COMENTARIOS_SECONDS = 300
+TTL_PUBLICACION_SECONDS = 600
+TTL_PERFIL_SECONDS = 600
+
+# --- Nombres de recursos versionados ---
+RECURSO_FEED = "feed"
+
+def recurso_comentarios(publicacion_id):
+    return f"comentarios:{publicacion_id}"
+
+def recurso_perfil(user_id):
+    return f"perfil:{user_id}"
+
+def recurso_publicacion(publicacion_id):
+    return f"publicacion:{publicacion_id}"
+
+def obtener_version(recurso):
+    """
+    Retorna la versión actual del recurso, o None si Redis no está disponible.
+    Si el contador no existe (primer uso o Redis vaciado) se inicializa con el tiempo actual
+    en milisegundos, para no repetir una versión que un cliente pudiera tener guardada.
+    """
+    if redis_client is None:
+        return None
+    clave = f"{VERSION_KEY_PREFIX}{recurso}"
+    try:
+        version = redis_client.get(clave)
+        if version is None:
+            redis_client.set(clave, int(time.time() * 1000), nx=True)
+            version = redis_client.get(clave)
+        return version
+    except Exception as e:
+        print(f"ERROR: cache.obtener_version - Fallo al leer la versión de '{recurso}': {e}", file=sys.stderr)
+        return None
+
+def obtener_versiones(recursos):
+    """
+    Versión de varios recursos en un solo MGET (los contadores que falten se inicializan igual
+    que en obtener_version). Retorna una lista alineada con 'recursos', o None si Redis falla.
+    """
+    if redis_client is None or not recursos:
+        return None
+    claves = [f"{VERSION_KEY_PREFIX}{recurso}" for recurso in recursos]
+    try:
+        versiones = redis_client.mget(claves)
+        faltantes = [clave for clave, version in zip(claves, versiones) if version is None]
+        if faltantes:
+            inicial = int(time.time() * 1000)
+            pipe = redis_client.pipeline()
+            for clave in faltantes:
+                pipe.set(clave, inicial, nx=True)
+            pipe.execute()
+            versiones = redis_client.mget(claves)
+        return versiones
+    except Exception as e:
+        print(f"ERROR: cache.obtener_versiones - Fallo al leer versiones: {e}", file=sys.stderr)
+        return None
+
+def incrementar_version(*recursos):
+    """Invalida todas las entradas de caché de los recursos indicados incrementando su versión."""
+    if redis_client is None or not recursos:
+        return
+    try:
+        pipe = redis_client.pipeline()
+        for recurso in recursos:
+            pipe.incr(f"{VERSION_KEY_PREFIX}{recurso}")
+        pipe.execute()
+    except Exception as e:
+        print(f"ERROR: cache.incrementar_version - Fallo al invalidar {recursos}: {e}", file=sys.stderr)
+
+def clave_cache(recurso, version, *partes):
+    """Construye la clave de caché de una variante (parámetros de consulta) de un recurso versionado."""
+    sufijo = ":".join(str(parte) for parte in partes)
+    return f"{CACHE_KEY_PREFIX}{recurso}:v{version}:{sufijo}"
+
+def generar_etag(recurso, version, *partes):
+    """
+    Construye el valor (sin comillas) de un ETag fuerte a partir de la versión del recurso.
+    Como la versión cambia con cada escritura, no hace falta serializar ni hashear el cuerpo.
+    """
+    if version is None:
+        return None
+    sufijo = ":".join(str(parte) for parte in partes)
+    return f"{recurso}-v{version}" + (f"-{sufijo}" if sufijo else "")
+
+def obtener_cache(clave):
+    """Retorna el cuerpo serializado guardado en la clave, o None si no existe o Redis falla."""
+    if redis_client is None or clave is None:
+        return None
+    try:
+        return redis_client.get(clave)
+    except Exception as e:
+        print(f"ERROR: cache.obtener_cache - Fallo al leer '{clave}': {e}", file=sys.stderr)
+        return None
+
+def guardar_cache(clave, cuerpo, ttl):
+    """Guarda el cuerpo serializado con expiración. Los fallos de Redis no interrumpen la petición."""
+    if redis_client is None or clave is None:
+        return
+    try:
+        redis_client.set(clave, cuerpo, ex=ttl)
+    except Exception as e:
+        print(f"ERROR: cache.guardar_cache - Fallo al escribir '{clave}': {e}", file=sys.stderr)
+
+def obtener_cache_multiple(claves):
+    """Lee varias entradas con un solo MGET. Retorna una lista alineada con 'claves' (None si falta)."""
+    if redis_client is None or not claves:
+        return [None] * len(claves)
+    try:
+        return redis_client.mget(claves)
+    except Exception as e:
+        print(f"ERROR: cache.obtener_cache_multiple - Fallo al leer {len(claves)} claves: {e}", file=sys.stderr)
+        return [None] * len(claves)
+
+def guardar_cache_multiple(entradas, ttl):
+    """Guarda {clave: cuerpo} con expiración en un único pipeline."""
+    if redis_client is None or not entradas:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for clave, cuerpo in entradas.items():
+            pipe.set(clave, cuerpo, ex=ttl)
+        pipe.execute()
+    except Exception as e:
+        print(f"ERROR: cache.guardar_cache_multiple - Fallo al escribir {len(entradas)} claves: {e}", file=sys.stderr)
+
+# --- Agregado de perfil ---
+# El perfil se lee en cada carga del cliente del juego, así que se guarda en una clave fija
+# (HASH {etag, cuerpo}) que se resuelve con un solo HMGET, sin leer antes la versión.
+# Para no dejar en caché un cuerpo anterior a una escritura concurrente, solo se guarda
+# si la versión del perfil sigue siendo la que se leyó antes de consultar MySQL.
+
+# KEYS: [clave_perfil, clave_version]  ARGV: [version, etag, cuerpo, ttl]
+_LUA_GUARDAR_SI_VERSION = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'etag', ARGV[2], 'cuerpo', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+_scripts = {}
+
+def clave_perfil(user_id):
+    return f"{CACHE_KEY_PREFIX}{recurso_perfil(user_id)}"
+
+def obtener_perfil_cacheado(user_id):
+    """Retorna (cuerpo, etag) del perfil cacheado, o (None, None) si no está o Redis falla."""
+    if redis_client is None:
+        return None, None
+    try:
+        etag, cuerpo = redis_client.hmget(clave_perfil(user_id), ['etag', 'cuerpo'])
+        return cuerpo, etag
+    except Exception as e:
+        print(f"ERROR: cache.obtener_perfil_cacheado - Fallo al leer el perfil {user_id}: {e}", file=sys.stderr)
+        return None, None
+
+def guardar_perfil_cacheado(user_id, version, etag, cuerpo):
+    """Guarda el perfil solo si su versión no cambió desde que se leyó 'version'."""
+    if redis_client is None or version is None:
+        return
+    try:
+        if 'perfil' not in _scripts:
+            _scripts['perfil'] = redis_client.register_script(_LUA_GUARDAR_SI_VERSION)
+        _scripts['perfil'](
+            keys=[clave_perfil(user_id), f"{VERSION_KEY_PREFIX}{recurso_perfil(user_id)}"],
+            args=[version, etag, cuerpo, TTL_PERFIL_SECONDS]
+        )
+    except Exception as e:
+        print(f"ERROR: cache.guardar_perfil_cacheado - Fallo al escribir el perfil {user_id}: {e}", file=sys.stderr)
+
+def invalidar_perfil(user_id, *recursos):
+    """Incrementa la versión del perfil (y de otros recursos afectados) y borra el agregado cacheado."""
+    if redis_client is None:
+        return
+    try:
+        pipe = redis_client.pipeline()
+        pipe.incr(f"{VERSION_KEY_PREFIX}{recurso_perfil(user_id)}")
+        for recurso in recursos:
+            pipe.incr(f"{VERSION_KEY_PREFIX}{recurso}")
+        pipe.delete(clave_perfil(user_id))
+        pipe.execute()
+    except Exception as e:
+        print(f"ERROR: cache.invalidar_perfil - Fallo al invalidar el perfil {user_id}: {e}", file=sys.stderr)
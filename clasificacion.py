@@ -0,0 +1,400 @@
+# clasificacion.py
+# Clasificación (leaderboard) por dificultad mantenida en sorted sets de Redis.
+#
+# Cada dificultad tiene su propio ZSET (miembro = user_id, puntuación = mejor puntaje), así que
+# el top-N, la posición de un usuario y sus vecinos son ZREVRANGE / ZREVRANK en O(log n + m):
+# ninguna consulta de posición ordena la tabla 'leaderboard'.
+#
+# La tabla sigue siendo la copia duradera, escrita de forma diferida ("write-behind"): cada mejora
+# de puntaje se anota en un set de pendientes y el comando 'flask --app app leaderboard
+# volcar-clasificacion' la vuelca a MySQL en lote. Varias mejoras del mismo usuario y dificultad
+# antes de un volcado se agrupan en una sola fila. Tras un arranque en frío (o si se pierde
+# Redis), 'reconstruir-clasificacion' vuelve a cargar los sets desde MySQL.
+#
+# Además de la clasificación histórica hay clasificaciones por ventana de tiempo (diaria, semanal
+# y de temporada, en UTC), cada una en su propio ZSET que caduca solo poco después de cerrarse.
+# Cada envío de puntaje actualiza todas las ventanas abiertas en el mismo script Lua. Al cerrarse
+# una ventana, 'archivar-clasificaciones' copia sus posiciones a leaderboard_historico en un
+# INSERT en bloque. Las ventanas pasadas se sirven desde esa tabla por clave primaria y la actual
+# desde Redis: ninguna necesita GROUP BY sobre los envíos.
+#
+#   leaderboard:<dificultad_id>                        ZSET {user_id: puntaje}
+#   leaderboard:pendientes                             SET {"<dificultad_id>:<user_id>"} pendientes de volcar
+#   leaderboard:<dificultad_id>:<ventana>:<periodo>    ZSET {user_id: mejor puntaje del periodo}
+#   leaderboard:ventanas                               ZSET {clave de ventana: instante de cierre}
+from extensions import mysql, redis_client
+from cache import invalidar_perfil
+from MySQLdb.cursors import SSCursor, DictCursor
+from datetime import datetime, timedelta, timezone
+import re
+import sys
+
+CLASIFICACION_KEY_PREFIX = "leaderboard:"
+PENDIENTES_KEY = "leaderboard:pendientes"
+VENTANAS_KEY = "leaderboard:ventanas"
+
+# --- Parámetros ---
+TAMANO_LOTE_VOLCADO = 500
+TAMANO_LOTE_RECONSTRUCCION = 1000
+GRACIA_ARCHIVO_SEGUNDOS = 3 * 24 * 3600   # Una ventana cerrada sigue en Redis este tiempo para poder archivarla
+MAX_POSICIONES_ARCHIVADAS = 1000          # Posiciones de cada ventana que se guardan en leaderboard_historico
+TAMANO_LOTE_ARCHIVO = 5000                # Filas por INSERT al archivar
+
+# Ventana -> formato de su identificador de periodo (la temporada es el trimestre natural).
+VENTANAS = {
+    'diaria': re.compile(r'^\d{4}-\d{2}-\d{2}$'),      # 2025-06-30
+    'semanal': re.compile(r'^\d{4}-W\d{2}$'),           # 2025-W27 (semana ISO)
+    'temporada': re.compile(r'^\d{4}-T[1-4]$'),          # 2025-T3
+}
+
+class ClasificacionNoDisponible(Exception):
+    """Redis no está disponible: la clasificación no se puede consultar ni actualizar."""
+
+# Primero las ventanas abiertas: cada una guarda el mejor puntaje del periodo, fija su caducidad y
+# se anota en el índice de ventanas con su instante de cierre. Después la clasificación histórica:
+# solo se escribe si el puntaje mejora el guardado y en ese caso se anota para volcarlo a MySQL.
+# KEYS: [zset, pendientes, ventanas, ventana_1, ..., ventana_n]
+# ARGV: [user_id, puntaje, pendiente, caducidad_1, cierre_1, ..., caducidad_n, cierre_n]
+# Retorna 1 si el puntaje es un nuevo récord histórico del usuario, 0 si no.
+_LUA_REGISTRAR = """
+local puntaje = tonumber(ARGV[2])
+for i = 4, #KEYS do
+    local previo = redis.call('ZSCORE', KEYS[i], ARGV[1])
+    if not previo or tonumber(previo) < puntaje then
+        redis.call('ZADD', KEYS[i], puntaje, ARGV[1])
+    end
+    local j = 4 + (i - 4) * 2
+    redis.call('EXPIREAT', KEYS[i], ARGV[j])
+    redis.call('ZADD', KEYS[3], ARGV[j + 1], KEYS[i])
+end
+
+local actual = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if actual and tonumber(actual) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+redis.call('SADD', KEYS[2], ARGV[3])
+return 1
+"""
+
+# Posición y vecinos en una sola llamada (la posición no cambia entre ZREVRANK y ZREVRANGE).
+# KEYS: [zset]  ARGV: [user_id, radio]
+# Retorna {posicion_inicial (base 0), [miembro, puntuación, ...]} o nil si el usuario no está.
+_LUA_VECINOS = """
+local posicion = redis.call('ZREVRANK', KEYS[1], ARGV[1])
+if not posicion then
+    return false
+end
+local radio = tonumber(ARGV[2])
+local inicio = math.max(0, posicion - radio)
+return {inicio, redis.call('ZREVRANGE', KEYS[1], inicio, posicion + radio, 'WITHSCORES')}
+"""
+
+# Upsert del mejor puntaje: GREATEST conserva el mayor aunque llegue un volcado desordenado.
+# fecha_registro se evalúa antes que puntaje (MySQL asigna de izquierda a derecha), así que solo
+# cambia cuando el puntaje realmente mejora.
+SQL_UPSERT_LEADERBOARD = """
+    INSERT INTO leaderboard (user_id, dificultad_id, puntaje)
+    VALUES {valores}
+    ON DUPLICATE KEY UPDATE
+        fecha_registro = IF(VALUES(puntaje) > puntaje, CURRENT_TIMESTAMP, fecha_registro),
+        puntaje = GREATEST(puntaje, VALUES(puntaje))
+"""
+
+_scripts = {}
+
+def _script(nombre, codigo):
+    """Registra el script Lua una sola vez por proceso (redis-py usa EVALSHA y recarga si hace falta)."""
+    if nombre not in _scripts:
+        _scripts[nombre] = redis_client.register_script(codigo)
+    return _scripts[nombre]
+
+def _cliente():
+    if redis_client is None:
+        raise ClasificacionNoDisponible("Redis no está conectado.")
+    return redis_client
+
+def clave_clasificacion(dificultad_id):
+    return f"{CLASIFICACION_KEY_PREFIX}{int(dificultad_id)}"
+
+def clave_ventana(dificultad_id, ventana, periodo):
+    return f"{CLASIFICACION_KEY_PREFIX}{int(dificultad_id)}:{ventana}:{periodo}"
+
+def periodo_actual(ventana, ahora=None):
+    """Retorna (periodo, instante_de_cierre) de la ventana que contiene 'ahora' (UTC)."""
+    ahora = ahora or datetime.now(timezone.utc)
+    dia = datetime(ahora.year, ahora.month, ahora.day, tzinfo=timezone.utc)
+    if ventana == 'diaria':
+        return dia.strftime('%Y-%m-%d'), dia + timedelta(days=1)
+    if ventana == 'semanal':
+        anio, semana, dia_semana = ahora.isocalendar()
+        return f"{anio}-W{semana:02d}", dia + timedelta(days=8 - dia_semana)
+    if ventana == 'temporada':
+        trimestre = (ahora.month - 1) // 3 + 1
+        cierre = datetime(ahora.year + trimestre // 4, (trimestre * 3) % 12 + 1, 1, tzinfo=timezone.utc)
+        return f"{ahora.year}-T{trimestre}", cierre
+    raise ValueError(f"Ventana desconocida: {ventana}")
+
+def periodo_valido(ventana, periodo):
+    return ventana in VENTANAS and bool(VENTANAS[ventana].match(periodo or ''))
+
+def _pares(miembros_con_puntuacion):
+    """Convierte [miembro, puntuación, ...] (respuesta de Lua) en [(user_id, puntaje), ...]."""
+    return [
+        (int(miembros_con_puntuacion[i]), int(float(miembros_con_puntuacion[i + 1])))
+        for i in range(0, len(miembros_con_puntuacion), 2)
+    ]
+
+# --- Escritura ---
+
+def registrar_puntaje(user_id, dificultad_id, puntaje):
+    """
+    Actualiza el mejor puntaje del usuario en la dificultad (histórico y ventanas abiertas).
+    Retorna True si fue un nuevo récord histórico. La escritura en MySQL queda pendiente del volcado.
+    """
+    claves = [clave_clasificacion(dificultad_id), PENDIENTES_KEY, VENTANAS_KEY]
+    args = [int(user_id), int(puntaje), f"{int(dificultad_id)}:{int(user_id)}"]
+    ahora = datetime.now(timezone.utc)
+    for ventana in VENTANAS:
+        periodo, cierre = periodo_actual(ventana, ahora)
+        claves.append(clave_ventana(dificultad_id, ventana, periodo))
+        args.extend([int(cierre.timestamp()) + GRACIA_ARCHIVO_SEGUNDOS, int(cierre.timestamp())])
+    return bool(_script('registrar', _LUA_REGISTRAR)(keys=claves, args=args))
+
+def guardar_en_mysql(cursor, filas):
+    """
+    Upsert en bloque de [(user_id, dificultad_id, puntaje), ...] en 'leaderboard' con el cursor
+    del llamador (no hace commit).
+    """
+    if not filas:
+        return
+    cursor.execute(
+        SQL_UPSERT_LEADERBOARD.format(valores=", ".join(["(%s, %s, %s)"] * len(filas))),
+        [valor for fila in filas for valor in fila]
+    )
+
+def volcar_pendientes(lote=TAMANO_LOTE_VOLCADO):
+    """
+    Vuelca a MySQL hasta 'lote' mejoras pendientes con un único INSERT ... ON DUPLICATE KEY UPDATE.
+    Se escribe el puntaje actual del ZSET (no el de cada envío), de modo que las mejoras
+    agrupadas cuestan una fila. Si el commit falla, las entradas vuelven al set de pendientes.
+    Retorna el número de filas volcadas.
+    """
+    cliente = _cliente()
+    pendientes = cliente.spop(PENDIENTES_KEY, lote)
+    if not pendientes:
+        return 0
+
+    claves = []
+    for pendiente in pendientes:
+        dificultad_id, user_id = pendiente.split(':', 1)
+        claves.append((int(user_id), int(dificultad_id)))
+
+    pipe = cliente.pipeline(transaction=False)
+    for user_id, dificultad_id in claves:
+        pipe.zscore(clave_clasificacion(dificultad_id), user_id)
+    puntajes = pipe.execute()
+
+    cursor = mysql.connection.cursor()
+    try:
+        # Un usuario o una dificultad eliminados mientras la entrada estaba pendiente harían
+        # fallar la clave foránea de todo el lote: se descartan antes con dos búsquedas por PK.
+        usuarios = sorted({user_id for user_id, _ in claves})
+        cursor.execute(
+            f"SELECT id FROM users WHERE id IN ({', '.join(['%s'] * len(usuarios))})",
+            usuarios
+        )
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        cursor.execute("SELECT id FROM dificultades")
+        dificultades = {fila[0] for fila in cursor.fetchall()}
+
+        filas, huerfanos = [], []
+        for (user_id, dificultad_id), puntaje in zip(claves, puntajes):
+            if user_id not in existentes or dificultad_id not in dificultades:
+                huerfanos.append((user_id, dificultad_id))
+            elif puntaje is not None:
+                filas.append((user_id, dificultad_id, int(puntaje)))
+
+        guardar_en_mysql(cursor, filas)
+        mysql.connection.commit()
+    except Exception:
+        mysql.connection.rollback()
+        cliente.sadd(PENDIENTES_KEY, *pendientes)
+        raise
+    finally:
+        cursor.close()
+
+    if huerfanos:
+        pipe = cliente.pipeline(transaction=False)
+        for user_id, dificultad_id in huerfanos:
+            pipe.zrem(clave_clasificacion(dificultad_id), user_id)
+        pipe.execute()
+        print(f"INFO: clasificacion - {len(huerfanos)} entradas de usuarios o dificultades eliminados descartadas.", file=sys.stderr)
+
+    # El perfil muestra los puntajes de la tabla: se invalida una vez volcados.
+    for user_id in {user_id for user_id, _, _ in filas}:
+        invalidar_perfil(user_id)
+    return len(filas)
+
+def pendientes_de_volcar():
+    return _cliente().scard(PENDIENTES_KEY)
+
+# --- Lectura ---
+
+def obtener_top(dificultad_id, limite):
+    """Retorna [(user_id, puntaje), ...] de los 'limite' mejores, de mayor a menor."""
+    return [
+        (int(miembro), int(puntuacion))
+        for miembro, puntuacion in _cliente().zrevrange(clave_clasificacion(dificultad_id), 0, limite - 1, withscores=True)
+    ]
+
+def obtener_top_ventana(dificultad_id, ventana, periodo, limite):
+    """Como obtener_top, pero sobre el ZSET de una ventana (vacío si ya caducó)."""
+    return [
+        (int(miembro), int(puntuacion))
+        for miembro, puntuacion in _cliente().zrevrange(clave_ventana(dificultad_id, ventana, periodo), 0, limite - 1, withscores=True)
+    ]
+
+def obtener_historico(dificultad_id, ventana, periodo, limite):
+    """
+    Posiciones archivadas de una ventana cerrada, leídas por clave primaria (ya vienen ordenadas
+    por posición). Retorna una lista de dicts con posicion, user_id, username y puntaje.
+    """
+    cursor = mysql.connection.cursor(DictCursor)
+    try:
+        cursor.execute("""
+            SELECT h.posicion, h.user_id, u.username, h.puntaje
+            FROM leaderboard_historico h
+            JOIN users u ON u.id = h.user_id
+            WHERE h.ventana = %s AND h.periodo = %s AND h.dificultad_id = %s
+            ORDER BY h.posicion
+            LIMIT %s
+        """, (ventana, periodo, int(dificultad_id), limite))
+        return list(cursor.fetchall())
+    finally:
+        cursor.close()
+
+def obtener_posicion(dificultad_id, user_id):
+    """
+    Retorna (posicion, puntaje, total) con posición en base 1, o None si el usuario no tiene
+    puntaje en la dificultad. A igual puntaje, el orden entre usuarios es el de Redis
+    (orden inverso del miembro).
+    """
+    pipe = _cliente().pipeline(transaction=False)
+    clave = clave_clasificacion(dificultad_id)
+    pipe.zrevrank(clave, user_id)
+    pipe.zscore(clave, user_id)
+    pipe.zcard(clave)
+    posicion, puntaje, total = pipe.execute()
+    if posicion is None:
+        return None
+    return posicion + 1, int(puntaje), total
+
+def obtener_vecinos(dificultad_id, user_id, radio):
+    """
+    Retorna (posicion_inicial, [(user_id, puntaje), ...]) con los 'radio' usuarios por encima y
+    por debajo del indicado (incluido él), o None si no tiene puntaje. Posición en base 1.
+    """
+    _cliente()
+    resultado = _script('vecinos', _LUA_VECINOS)(
+        keys=[clave_clasificacion(dificultad_id)],
+        args=[int(user_id), int(radio)]
+    )
+    if not resultado:
+        return None
+    inicio, miembros = resultado
+    return int(inicio) + 1, _pares(miembros)
+
+# --- Mantenimiento ---
+
+def reconstruir_clasificacion():
+    """
+    Carga los sets desde la tabla 'leaderboard' (arranque en frío o tras perder Redis).
+    Se lee la tabla completa una sola vez con un cursor no bufferizado, sin ORDER BY, y cada set
+    se sustituye de forma atómica. Con AGGREGATE MAX se conservan las mejoras todavía no
+    volcadas que ya estuvieran en Redis.
+    Retorna {dificultad_id: usuarios cargados}.
+    """
+    cliente = _cliente()
+    temporales = {}
+    totales = {}
+
+    cursor = mysql.connection.cursor(SSCursor)
+    try:
+        cursor.execute("SELECT dificultad_id, user_id, puntaje FROM leaderboard")
+        while True:
+            filas = cursor.fetchmany(TAMANO_LOTE_RECONSTRUCCION)
+            if not filas:
+                break
+            por_dificultad = {}
+            for dificultad_id, user_id, puntaje in filas:
+                por_dificultad.setdefault(dificultad_id, {})[str(user_id)] = puntaje
+            pipe = cliente.pipeline(transaction=False)
+            for dificultad_id, miembros in por_dificultad.items():
+                if dificultad_id not in temporales:
+                    temporales[dificultad_id] = f"{clave_clasificacion(dificultad_id)}:reconstruccion"
+                    pipe.delete(temporales[dificultad_id])
+                pipe.zadd(temporales[dificultad_id], miembros)
+                totales[dificultad_id] = totales.get(dificultad_id, 0) + len(miembros)
+            pipe.execute()
+    finally:
+        cursor.close()
+
+    for dificultad_id, temporal in temporales.items():
+        clave = clave_clasificacion(dificultad_id)
+        pipe = cliente.pipeline()   # MULTI/EXEC: nadie ve el set a medio sustituir
+        pipe.zunionstore(temporal, [temporal, clave], aggregate='MAX')
+        pipe.rename(temporal, clave)
+        pipe.execute()
+    return totales
+
+def archivar_ventanas_cerradas():
+    """
+    Copia a leaderboard_historico las ventanas cuyo periodo ya terminó (hasta
+    MAX_POSICIONES_ARCHIVADAS posiciones de cada una) y borra sus sets.
+    Todas las ventanas de la pasada se insertan juntas en INSERTs de TAMANO_LOTE_ARCHIVO filas.
+    Retorna (ventanas archivadas, filas insertadas).
+    """
+    cliente = _cliente()
+    cerradas = cliente.zrangebyscore(VENTANAS_KEY, '-inf', int(datetime.now(timezone.utc).timestamp()))
+    if not cerradas:
+        return 0, 0
+
+    pipe = cliente.pipeline(transaction=False)
+    for clave in cerradas:
+        pipe.zrevrange(clave, 0, MAX_POSICIONES_ARCHIVADAS - 1, withscores=True)
+    contenidos = pipe.execute()
+
+    filas = []
+    for clave, miembros in zip(cerradas, contenidos):
+        dificultad_id, ventana, periodo = clave[len(CLASIFICACION_KEY_PREFIX):].split(':', 2)
+        if not miembros:
+            print(f"ERROR: clasificacion - La ventana '{clave}' caducó antes de archivarse.", file=sys.stderr)
+        for posicion, (user_id, puntaje) in enumerate(miembros, start=1):
+            filas.append((int(dificultad_id), ventana, periodo, posicion, int(user_id), int(puntaje)))
+
+    cursor = mysql.connection.cursor()
+    try:
+        for inicio in range(0, len(filas), TAMANO_LOTE_ARCHIVO):
+            lote = filas[inicio:inicio + TAMANO_LOTE_ARCHIVO]
+            # IGNORE: repetir el archivo de una ventana (p. ej. tras un fallo al borrar los sets)
+            # no duplica filas, y se omiten usuarios eliminados entretanto (clave foránea).
+            cursor.execute(
+                f"""
+                INSERT IGNORE INTO leaderboard_historico (dificultad_id, ventana, periodo, posicion, user_id, puntaje)
+                VALUES {", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(lote))}
+                """,
+                [valor for fila in lote for valor in fila]
+            )
+        mysql.connection.commit()
+    except Exception:
+        mysql.connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    pipe = cliente.pipeline()
+    pipe.delete(*cerradas)
+    pipe.zrem(VENTANAS_KEY, *cerradas)
+    pipe.execute()
+    return len(cerradas), len(filas)
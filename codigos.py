@@ -0,0 +1,184 @@
+# codigos.py
+# Códigos de verificación de cuenta y de restablecimiento de contraseña guardados en Redis.
+#
+# Sustituyen a las columnas users.verification_code / code_expiration / reset_token /
+# reset_token_expira: la expiración la gestiona Redis con TTL nativo (no hay UPDATEs para
+# limpiar códigos caducados) y la búsqueda de un código de restablecimiento es un GET O(1)
+# en lugar de un recorrido completo de 'users' por una columna sin índice.
+#
+#   codigo:verificacion:<email>   HASH {codigo, intentos}   TTL 15 min
+#   codigo:reset:<codigo>         -> email                  TTL 1 h
+#   codigo:reset:email:<email>    -> codigo vigente         TTL 1 h (para anular el anterior)
+#   codigo:reset:fallos_ip:<ip>   contador de códigos de restablecimiento inválidos por IP
+#   codigo:reenvio:email:<email>  espera entre reenvíos del código de verificación
+#   codigo:reenvio:ip:<ip>        contador de reenvíos por IP
+from extensions import redis_client
+import random
+import sys
+
+VERIFICACION_KEY_PREFIX = "codigo:verificacion:"
+RESET_KEY_PREFIX = "codigo:reset:"
+RESET_EMAIL_KEY_PREFIX = "codigo:reset:email:"
+RESET_FALLOS_IP_KEY_PREFIX = "codigo:reset:fallos_ip:"
+REENVIO_EMAIL_KEY_PREFIX = "codigo:reenvio:email:"
+REENVIO_IP_KEY_PREFIX = "codigo:reenvio:ip:"
+
+TTL_VERIFICACION_SEGUNDOS = 15 * 60
+TTL_RESET_SEGUNDOS = 60 * 60
+MAX_INTENTOS_VERIFICACION = 5      # Tras 5 códigos erróneos el código se anula
+MAX_FALLOS_RESET_IP = 10           # Códigos de restablecimiento inválidos por IP y ventana
+VENTANA_FALLOS_RESET_SEGUNDOS = 15 * 60
+MAX_REINTENTOS_GENERACION = 5
+ESPERA_REENVIO_SEGUNDOS = 60       # Un reenvío del código de verificación por email y minuto
+MAX_REENVIOS_IP = 10               # Reenvíos por IP y ventana
+VENTANA_REENVIOS_IP_SEGUNDOS = 60 * 60
+
+class CodigosNoDisponibles(Exception):
+    """Redis no está disponible: no se pueden emitir ni comprobar códigos."""
+
+class DemasiadosIntentos(Exception):
+    """Demasiados códigos inválidos desde la misma IP; 'espera' son los segundos restantes."""
+
+    def __init__(self, espera):
+        super().__init__("Demasiados intentos.")
+        self.espera = max(int(espera or 0), 1)
+
+# KEYS: [clave_verificacion]  ARGV: [codigo, max_intentos]
+# Retorna 'ok', 'invalido', 'agotado' (se anula el código) o 'expirado' (no existe).
+_LUA_COMPROBAR_VERIFICACION = """
+local guardado = redis.call('HGET', KEYS[1], 'codigo')
+if not guardado then
+    return 'expirado'
+end
+if guardado == ARGV[1] then
+    return 'ok'
+end
+local intentos = redis.call('HINCRBY', KEYS[1], 'intentos', 1)
+if intentos >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return 'agotado'
+end
+return 'invalido'
+"""
+
+_scripts = {}
+
+def _script(nombre, codigo):
+    """Registra el script Lua una sola vez por proceso (redis-py usa EVALSHA y recarga si hace falta)."""
+    if nombre not in _scripts:
+        _scripts[nombre] = redis_client.register_script(codigo)
+    return _scripts[nombre]
+
+def _cliente():
+    if redis_client is None:
+        raise CodigosNoDisponibles("Redis no está conectado.")
+    return redis_client
+
+def _normalizar(email):
+    return email.strip().lower()
+
+def _generar_codigo():
+    """Código numérico de 6 dígitos."""
+    return str(random.SystemRandom().randint(100000, 999999))
+
+# --- Verificación de cuenta ---
+
+def emitir_codigo_verificacion(email):
+    """Genera y guarda el código de verificación (sustituye al anterior). Retorna el código."""
+    codigo = _generar_codigo()
+    clave = f"{VERIFICACION_KEY_PREFIX}{_normalizar(email)}"
+    pipe = _cliente().pipeline()
+    pipe.delete(clave)
+    pipe.hset(clave, mapping={'codigo': codigo, 'intentos': 0})
+    pipe.expire(clave, TTL_VERIFICACION_SEGUNDOS)
+    pipe.execute()
+    return codigo
+
+def comprobar_codigo_verificacion(email, codigo):
+    """
+    Compara el código sin consumirlo (se consume con anular_codigo_verificacion tras el commit).
+    Retorna 'ok', 'invalido', 'agotado' o 'expirado'.
+    """
+    _cliente()
+    return _script('verificacion', _LUA_COMPROBAR_VERIFICACION)(
+        keys=[f"{VERIFICACION_KEY_PREFIX}{_normalizar(email)}"],
+        args=[str(codigo), MAX_INTENTOS_VERIFICACION]
+    )
+
+def reservar_reenvio_verificacion(email, ip):
+    """
+    Límite de reenvíos del código de verificación: uno por email cada ESPERA_REENVIO_SEGUNDOS y
+    MAX_REENVIOS_IP por IP en la ventana. Lanza DemasiadosIntentos con la espera restante.
+    Se aplica aunque el email no exista, para no revelar qué cuentas hay.
+    """
+    cliente = _cliente()
+    clave_ip = f"{REENVIO_IP_KEY_PREFIX}{ip}"
+    pipe = cliente.pipeline()
+    pipe.incr(clave_ip)
+    pipe.ttl(clave_ip)
+    reenvios, ttl = pipe.execute()
+    if ttl < 0:
+        cliente.expire(clave_ip, VENTANA_REENVIOS_IP_SEGUNDOS)
+        ttl = VENTANA_REENVIOS_IP_SEGUNDOS
+    if reenvios > MAX_REENVIOS_IP:
+        raise DemasiadosIntentos(ttl)
+
+    clave_email = f"{REENVIO_EMAIL_KEY_PREFIX}{_normalizar(email)}"
+    if not cliente.set(clave_email, 1, nx=True, ex=ESPERA_REENVIO_SEGUNDOS):
+        raise DemasiadosIntentos(cliente.ttl(clave_email))
+
+def anular_codigo_verificacion(email):
+    try:
+        _cliente().delete(f"{VERIFICACION_KEY_PREFIX}{_normalizar(email)}")
+    except Exception as e:
+        # El código caducará igualmente por TTL.
+        print(f"ERROR: codigos.anular_codigo_verificacion - Fallo en Redis: {e}", file=sys.stderr)
+
+# --- Restablecimiento de contraseña ---
+
+def emitir_codigo_reset(email):
+    """
+    Genera un código de restablecimiento único entre los vigentes (SET NX) y anula el anterior
+    del mismo email. Retorna el código.
+    """
+    cliente = _cliente()
+    email = _normalizar(email)
+    for _ in range(MAX_REINTENTOS_GENERACION):
+        codigo = _generar_codigo()
+        if cliente.set(f"{RESET_KEY_PREFIX}{codigo}", email, nx=True, ex=TTL_RESET_SEGUNDOS):
+            break
+    else:
+        raise CodigosNoDisponibles("No se pudo generar un código de restablecimiento único.")
+
+    pipe = cliente.pipeline()
+    pipe.get(f"{RESET_EMAIL_KEY_PREFIX}{email}")
+    pipe.set(f"{RESET_EMAIL_KEY_PREFIX}{email}", codigo, ex=TTL_RESET_SEGUNDOS)
+    anterior, _ = pipe.execute()
+    if anterior and anterior != codigo:
+        cliente.delete(f"{RESET_KEY_PREFIX}{anterior}")
+    return codigo
+
+def buscar_email_por_codigo_reset(codigo, ip):
+    """
+    Retorna el email asociado al código, o None si no existe o caducó.
+    Los códigos inválidos cuentan contra la IP; superado MAX_FALLOS_RESET_IP se lanza
+    DemasiadosIntentos para frenar la búsqueda a ciegas en el espacio de códigos.
+    """
+    cliente = _cliente()
+    clave_fallos = f"{RESET_FALLOS_IP_KEY_PREFIX}{ip}"
+    fallos = cliente.get(clave_fallos)
+    if fallos is not None and int(fallos) >= MAX_FALLOS_RESET_IP:
+        raise DemasiadosIntentos(cliente.ttl(clave_fallos))
+
+    # Solo dígitos: evita que un valor como 'email:...' apunte a otra clave del mismo prefijo.
+    codigo = str(codigo)
+    email = cliente.get(f"{RESET_KEY_PREFIX}{codigo}") if codigo.isdigit() else None
+    if email is None and cliente.incr(clave_fallos) == 1:
+        cliente.expire(clave_fallos, VENTANA_FALLOS_RESET_SEGUNDOS)
+    return email
+
+def anular_codigo_reset(codigo, email):
+    try:
+        _cliente().delete(f"{RESET_KEY_PREFIX}{codigo}", f"{RESET_EMAIL_KEY_PREFIX}{_normalizar(email)}")
+    except Exception as e:
+        print(f"ERROR: codigos.anular_codigo_reset - Fallo en Redis: {e}", file=sys.stderr)
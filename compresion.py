@@ -0,0 +1,154 @@
+# compresion.py
+# Compresión negociada (br / gzip) de las respuestas de toda la aplicación.
+# Se registra como un after_request global, así que cubre todos los blueprints,
+# incluidas las respuestas en streaming, que se comprimen fragmento a fragmento.
+from flask import Flask, request, g
+from collections import OrderedDict
+import threading
+import zlib
+import sys
+
+try:
+    import brotli  # Dependencia opcional: sin ella solo se negocia gzip
+except ImportError:
+    brotli = None
+
+# Tipos que ya vienen comprimidos (o no ganan nada): nunca se recomprimen. 'text/event-stream'
+# tampoco: los streams SSE de /publicaciones/eventos y /publicaciones/<id>/eventos (eventos.py)
+# son de larga duración y comprimirlos retiene los eventos en el buffer del compresor.
+TIPOS_EXCLUIDOS = ('image/', 'video/', 'audio/', 'application/pdf', 'application/zip', 'application/gzip',
+                   'text/event-stream')
+
+# Tipos de texto que sí merece la pena comprimir.
+TIPOS_COMPRIMIBLES = ('application/json', 'text/', 'application/javascript', 'application/xml')
+
+# Caché en memoria de cuerpos ya comprimidos: {(clave_cache, codificacion): bytes}.
+# Solo se usa con claves de caché versionadas (ver cache.py), cuyo contenido nunca cambia,
+# así que las entradas no necesitan invalidación: basta con expulsar las menos usadas.
+_precomprimidos = OrderedDict()
+_precomprimidos_lock = threading.Lock()
+
+def init_app(app: Flask):
+    app.config.setdefault('COMPRESION_ACTIVA', True)
+    app.config.setdefault('COMPRESION_TAMANO_MINIMO', 500)       # bytes; por debajo no compensa
+    app.config.setdefault('COMPRESION_NIVEL_GZIP', 6)
+    app.config.setdefault('COMPRESION_CALIDAD_BROTLI', 5)
+    app.config.setdefault('COMPRESION_CACHE_PRECOMPRIMIDO', True)
+    app.config.setdefault('COMPRESION_CACHE_MAX_ENTRADAS', 256)
+
+    @app.after_request
+    def comprimir_respuesta(response):
+        try:
+            return _comprimir(app, response)
+        except Exception as e:
+            # La compresión nunca debe romper una respuesta válida.
+            print(f"ERROR: compresion - Fallo al comprimir {request.path}: {e}", file=sys.stderr)
+            return response
+
+def variantes_etag(etag):
+    """ETags que un cliente puede tener para el mismo recurso según la codificación recibida."""
+    variantes = [etag, f"{etag}-gzip"]
+    if brotli is not None:
+        variantes.append(f"{etag}-br")
+    return variantes
+
+def marcar_precomprimible(clave):
+    """Indica que el cuerpo de esta respuesta corresponde a la clave de caché versionada 'clave'."""
+    g.clave_precomprimida = clave
+
+def _es_comprimible(response):
+    tipo = response.mimetype or ''
+    if tipo.startswith(TIPOS_EXCLUIDOS):
+        return False
+    return tipo.startswith(TIPOS_COMPRIMIBLES)
+
+def _negociar_codificacion():
+    aceptadas = request.accept_encodings
+    calidad_br = aceptadas.quality('br') if brotli is not None else 0
+    calidad_gzip = aceptadas.quality('gzip')
+    if calidad_br > 0 and calidad_br >= calidad_gzip:
+        return 'br'
+    if calidad_gzip > 0:
+        return 'gzip'
+    return None
+
+def _comprimir_bytes(app, datos, codificacion):
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=app.config['COMPRESION_CALIDAD_BROTLI'])
+    compresor = zlib.compressobj(app.config['COMPRESION_NIVEL_GZIP'], zlib.DEFLATED, 31)
+    return compresor.compress(datos) + compresor.flush()
+
+def _comprimir_stream(app, iterable, codificacion):
+    """Comprime un cuerpo en streaming y vacía el compresor tras cada fragmento para no retrasar al cliente."""
+    if codificacion == 'br':
+        compresor = brotli.Compressor(quality=app.config['COMPRESION_CALIDAD_BROTLI'])
+        comprimir = compresor.process
+        vaciar = compresor.flush
+        terminar = compresor.finish
+    else:
+        compresor = zlib.compressobj(app.config['COMPRESION_NIVEL_GZIP'], zlib.DEFLATED, 31)
+        comprimir = compresor.compress
+        vaciar = lambda: compresor.flush(zlib.Z_SYNC_FLUSH)
+        terminar = compresor.flush
+
+    try:
+        for fragmento in iterable:
+            if isinstance(fragmento, str):
+                fragmento = fragmento.encode('utf-8')
+            datos = comprimir(fragmento) + vaciar()
+            if datos:
+                yield datos
+        yield terminar()
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+
+def _obtener_precomprimido(app, clave, codificacion, datos):
+    if not app.config['COMPRESION_CACHE_PRECOMPRIMIDO'] or not clave:
+        return _comprimir_bytes(app, datos, codificacion)
+
+    entrada = (clave, codificacion)
+    with _precomprimidos_lock:
+        comprimido = _precomprimidos.get(entrada)
+        if comprimido is not None:
+            _precomprimidos.move_to_end(entrada)
+            return comprimido
+
+    comprimido = _comprimir_bytes(app, datos, codificacion)
+    with _precomprimidos_lock:
+        _precomprimidos[entrada] = comprimido
+        while len(_precomprimidos) > app.config['COMPRESION_CACHE_MAX_ENTRADAS']:
+            _precomprimidos.popitem(last=False)
+    return comprimido
+
+def _comprimir(app, response):
+    if not app.config['COMPRESION_ACTIVA']:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if not _es_comprimible(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    codificacion = _negociar_codificacion()
+    if codificacion is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _comprimir_stream(app, response.response, codificacion)
+        response.headers.pop('Content-Length', None)
+    else:
+        datos = response.get_data()
+        if len(datos) < app.config['COMPRESION_TAMANO_MINIMO']:
+            return response
+        response.set_data(_obtener_precomprimido(app, g.get('clave_precomprimida'), codificacion, datos))
+
+    response.headers['Content-Encoding'] = codificacion
+
+    # Un ETag fuerte identifica bytes exactos: cada codificación necesita el suyo.
+    etag, debil = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{codificacion}", weak=debil)
+    return response
@@ -0,0 +1,175 @@
+# contrasenas.py
+# Hash y verificación de contraseñas con bcrypt fuera de los hilos de las peticiones.
+#
+# bcrypt consume CPU durante cientos de milisegundos por operación: ejecutado en línea, una
+# ráfaga de logins deja todos los hilos del servidor ocupados. Aquí cada operación se envía a
+# un pool de procesos acotado y, si ya hay demasiadas en cola, se rechaza de inmediato con
+# HashingSaturado (la ruta responde 503) en lugar de acumular esperas.
+#
+# El coste (log_rounds) se calibra para acercarse a un objetivo de latencia, sin bajar nunca de
+# COSTE_MINIMO. La calibración se hace una sola vez y se comparte en Redis (COSTE_KEY): todos los
+# workers y reinicios usan el mismo coste, en lugar de uno distinto según el ruido de cada
+# medición. Los hashes con un coste inferior al actual se regeneran tras un login correcto
+# (ver necesita_rehash); los de coste igual o superior nunca se tocan.
+#
+# Los hashes son compatibles con los que generaba Flask-Bcrypt (prefijo 2b, sin pre-hash SHA-256).
+from flask import Flask
+import extensions
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturoTimeout
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+import os
+import sys
+import threading
+import time
+
+COSTE_MINIMO = 12    # Valor por defecto de Flask-Bcrypt: la calibración nunca lo reduce
+COSTE_MAXIMO = 16
+COSTE_KEY = "contrasenas:coste_bcrypt"
+
+class HashingSaturado(Exception):
+    """Hay demasiadas operaciones de bcrypt pendientes; la petición debe reintentarse más tarde."""
+
+_config = {
+    'procesos': 2,
+    'max_pendientes': 8,
+    'timeout': 5.0,
+    'coste': COSTE_MINIMO,
+}
+_pool = None
+_pool_lock = threading.Lock()
+_pendientes = 0
+_pendientes_lock = threading.Lock()
+
+def init_app(app: Flask):
+    app.config.setdefault('HASH_PROCESOS', max(1, min(4, os.cpu_count() or 1)))
+    app.config.setdefault('HASH_MAX_PENDIENTES', app.config['HASH_PROCESOS'] * 4)
+    app.config.setdefault('HASH_TIMEOUT_SEGUNDOS', 5.0)
+    app.config.setdefault('HASH_OBJETIVO_MS', 250)
+
+    _config['procesos'] = app.config['HASH_PROCESOS']
+    _config['max_pendientes'] = app.config['HASH_MAX_PENDIENTES']
+    _config['timeout'] = app.config['HASH_TIMEOUT_SEGUNDOS']
+
+    # Un coste fijado explícitamente (BCRYPT_LOG_ROUNDS) tiene prioridad sobre la calibración.
+    if app.config.get('BCRYPT_LOG_ROUNDS'):
+        _config['coste'] = int(app.config['BCRYPT_LOG_ROUNDS'])
+    else:
+        _config['coste'] = obtener_coste_compartido(app.config['HASH_OBJETIVO_MS'])
+        app.config['BCRYPT_LOG_ROUNDS'] = _config['coste']
+    print(f"INFO: contrasenas - Coste bcrypt: {_config['coste']} (pool de {_config['procesos']} procesos, "
+          f"máximo {_config['max_pendientes']} pendientes).")
+
+def calibrar_coste(objetivo_ms):
+    """
+    Mide un hash con COSTE_MINIMO y extrapola (cada punto de coste duplica el tiempo) para elegir
+    el mayor coste cuya duración estimada no supera 'objetivo_ms'.
+    """
+    inicio = time.perf_counter()
+    bcrypt.hashpw(b'calibracion', bcrypt.gensalt(rounds=COSTE_MINIMO))
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    coste = COSTE_MINIMO
+    while coste < COSTE_MAXIMO and duracion_ms * 2 <= objetivo_ms:
+        coste += 1
+        duracion_ms *= 2
+    return coste
+
+def obtener_coste_compartido(objetivo_ms):
+    """
+    Coste calibrado compartido por todos los procesos. El primero que arranca lo mide y lo guarda
+    con SET NX (sin caducidad); los demás, y los reinicios, reutilizan ese valor. Para recalibrar
+    (p. ej. tras cambiar de hardware) basta con borrar COSTE_KEY. Sin Redis se calibra en local.
+    """
+    cliente = extensions.redis_client
+    if cliente is not None:
+        try:
+            guardado = cliente.get(COSTE_KEY)
+            if guardado is not None:
+                return int(guardado)
+        except Exception as e:
+            print(f"ERROR: contrasenas - No se pudo leer el coste compartido: {e}", file=sys.stderr)
+            cliente = None
+
+    coste = calibrar_coste(objetivo_ms)
+    if cliente is not None:
+        try:
+            # Si otro proceso lo guardó entretanto, se usa el suyo.
+            cliente.set(COSTE_KEY, coste, nx=True)
+            coste = int(cliente.get(COSTE_KEY))
+        except Exception as e:
+            print(f"ERROR: contrasenas - No se pudo guardar el coste compartido: {e}", file=sys.stderr)
+    return coste
+
+# --- Funciones ejecutadas en los procesos del pool (deben ser de nivel de módulo) ---
+
+def _hashear(password, coste):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=coste))
+
+def _verificar(password, password_hash):
+    try:
+        return bcrypt.checkpw(password, password_hash)
+    except ValueError:
+        # Hash con formato inválido (p. ej. columna vacía): se trata como contraseña incorrecta.
+        return False
+
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Se crea en el primer uso para que cada worker del servidor tenga su propio pool.
+            _pool = ProcessPoolExecutor(max_workers=_config['procesos'])
+        return _pool
+
+def _liberar_hueco(_futuro=None):
+    global _pendientes
+    with _pendientes_lock:
+        _pendientes -= 1
+
+def _ejecutar(funcion, *args):
+    global _pool, _pendientes
+    with _pendientes_lock:
+        if _pendientes >= _config['max_pendientes']:
+            raise HashingSaturado()
+        _pendientes += 1
+    try:
+        try:
+            futuro = _obtener_pool().submit(funcion, *args)
+        except BrokenProcessPool:
+            # Un proceso del pool murió: se descarta el pool y se crea uno nuevo para esta operación.
+            print("ERROR: contrasenas - Pool de procesos roto, recreándolo.", file=sys.stderr)
+            with _pool_lock:
+                _pool = None
+            futuro = _obtener_pool().submit(funcion, *args)
+    except BaseException:
+        # No llegó a encolarse nada: el hueco se libera aquí mismo.
+        _liberar_hueco()
+        raise
+    # El hueco se libera cuando la operación termina de verdad, no cuando se deja de esperarla:
+    # tras un timeout sigue ocupando un proceso del pool y debe seguir contando como pendiente.
+    futuro.add_done_callback(_liberar_hueco)
+    try:
+        return futuro.result(timeout=_config['timeout'])
+    except FuturoTimeout:
+        # El pool no da abasto: se responde como saturación (la operación sigue en su proceso).
+        raise HashingSaturado()
+
+def generar_hash(password):
+    """Retorna el hash bcrypt (str) de la contraseña con el coste actual."""
+    return _ejecutar(_hashear, password.encode('utf-8'), _config['coste']).decode('utf-8')
+
+def verificar(password_hash, password):
+    """Comprueba la contraseña contra el hash guardado (mismo orden de argumentos que Flask-Bcrypt)."""
+    if not password_hash:
+        return False
+    return _ejecutar(_verificar, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+def necesita_rehash(password_hash):
+    """
+    True si el hash se generó con un coste inferior al actual (formato $2b$NN$...).
+    Nunca se rebaja un hash: uno de coste superior se conserva tal cual.
+    """
+    try:
+        return int(password_hash.split('$')[2]) < _config['coste']
+    except (AttributeError, IndexError, ValueError):
+        return False
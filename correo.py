@@ -0,0 +1,219 @@
+# correo.py
+# Transporte SMTP compartido por todos los envíos de correo.
+#
+# Mantiene un pequeño pool de conexiones SMTP ya autenticadas y las reutiliza entre mensajes,
+# en lugar de repetir conexión TCP + TLS + LOGIN por cada correo. Antes de reutilizar una
+# conexión inactiva se comprueba con NOOP; si el servidor la cerró se abre otra de forma
+# transparente. Cada conexión se recicla tras MAIL_MAX_MENSAJES_POR_CONEXION envíos.
+#
+# Para probar en local sin Gmail basta un sumidero SMTP, p. ej.:
+#   python -m aiosmtpd -n -l localhost:1025
+# con MAIL_SERVER=localhost, MAIL_PORT=1025, MAIL_USE_TLS=False y sin MAIL_USERNAME/MAIL_PASSWORD
+# (sin usuario no se hace LOGIN).
+from flask import Flask, current_app
+from email.mime.text import MIMEText
+from email.header import Header
+import queue
+import smtplib
+import ssl
+import sys
+import threading
+import time
+
+class PoolAgotado(smtplib.SMTPException):
+    """No se liberó ninguna conexión del pool dentro del tiempo de espera."""
+
+class _Conexion:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.enviados = 0
+        self.ultimo_uso = time.monotonic()
+
+class TransporteSMTP:
+    """Pool acotado de conexiones SMTP autenticadas y reutilizables (seguro entre hilos)."""
+
+    def __init__(self, servidor, puerto, usuario=None, password=None, usar_tls=True, usar_ssl=False,
+                 timeout=30, max_conexiones=2, max_mensajes_por_conexion=100, inactividad_maxima=60):
+        self.servidor = servidor
+        self.puerto = puerto
+        self.usuario = usuario
+        self.password = password
+        self.usar_tls = usar_tls
+        self.usar_ssl = usar_ssl
+        self.timeout = timeout
+        self.max_mensajes_por_conexion = max_mensajes_por_conexion
+        self.inactividad_maxima = inactividad_maxima
+        self._libres = queue.LifoQueue()   # LIFO: se reutiliza primero la conexión usada más recientemente
+        self._cupos = threading.BoundedSemaphore(max_conexiones)
+
+    # --- Ciclo de vida de las conexiones ---
+
+    def _conectar(self):
+        contexto = ssl.create_default_context()
+        if self.usar_ssl:
+            smtp = smtplib.SMTP_SSL(self.servidor, self.puerto, timeout=self.timeout, context=contexto)
+        else:
+            smtp = smtplib.SMTP(self.servidor, self.puerto, timeout=self.timeout)
+            if self.usar_tls:
+                smtp.starttls(context=contexto)
+        try:
+            if self.usuario:
+                smtp.login(self.usuario, self.password)
+        except Exception:
+            self._cerrar_smtp(smtp)
+            raise
+        return _Conexion(smtp)
+
+    @staticmethod
+    def _cerrar_smtp(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _esta_viva(self, conexion):
+        """Chequeo de salud: solo se paga un NOOP si la conexión lleva tiempo inactiva."""
+        if time.monotonic() - conexion.ultimo_uso < self.inactividad_maxima:
+            return True
+        try:
+            return conexion.smtp.noop()[0] == 250
+        except OSError:  # Incluye smtplib.SMTPException
+            return False
+
+    def _tomar(self):
+        if not self._cupos.acquire(timeout=self.timeout):
+            raise PoolAgotado("No hay conexiones SMTP libres.")
+        try:
+            while True:
+                try:
+                    conexion = self._libres.get_nowait()
+                except queue.Empty:
+                    return self._conectar()
+                if self._esta_viva(conexion):
+                    return conexion
+                self._cerrar_smtp(conexion.smtp)
+        except Exception:
+            self._cupos.release()
+            raise
+
+    def _devolver(self, conexion):
+        if conexion is not None:
+            if conexion.enviados < self.max_mensajes_por_conexion:
+                conexion.ultimo_uso = time.monotonic()
+                self._libres.put(conexion)
+            else:
+                self._cerrar_smtp(conexion.smtp)
+        self._cupos.release()
+
+    # --- API de envío ---
+
+    def enviar_lote(self, mensajes):
+        """
+        Envía varios mensajes por una misma conexión del pool.
+        Retorna una lista alineada con 'mensajes': None si se envió o el texto del error.
+        Los rechazos de un mensaje concreto no afectan a los demás; si el servidor corta la
+        conexión se reconecta una vez y se reintenta ese mensaje.
+        Los fallos al conectar o autenticar se propagan al llamador.
+        """
+        resultados = []
+        conexion = self._tomar()
+        try:
+            for mensaje in mensajes:
+                if conexion is None or conexion.enviados >= self.max_mensajes_por_conexion:
+                    if conexion is not None:
+                        self._cerrar_smtp(conexion.smtp)
+                    conexion = None
+                    conexion = self._conectar()
+                error = None
+                for intento in (1, 2):
+                    # SMTPException hereda de OSError: el orden de los except importa.
+                    try:
+                        conexion.smtp.send_message(mensaje)
+                        break
+                    except smtplib.SMTPServerDisconnected:
+                        pass
+                    except smtplib.SMTPException as e:
+                        # Rechazo del mensaje (destinatario, datos...): la conexión sigue siendo válida.
+                        error = str(e)
+                        try:
+                            conexion.smtp.rset()
+                        except OSError:
+                            self._cerrar_smtp(conexion.smtp)
+                            conexion = None
+                        break
+                    except OSError:
+                        pass
+                    # El servidor cerró la conexión: se reconecta una vez y se reintenta el mensaje.
+                    self._cerrar_smtp(conexion.smtp)
+                    conexion = None
+                    if intento == 2:
+                        raise smtplib.SMTPServerDisconnected("Conexión SMTP perdida al reintentar el envío.")
+                    conexion = self._conectar()
+                if error is None:
+                    conexion.enviados += 1
+                resultados.append(error)
+        except Exception as e:
+            # Fallo de conexión a mitad de lote: lo que falte se marca con el mismo error.
+            print(f"ERROR: correo - Lote interrumpido tras {len(resultados)} mensajes: {e}", file=sys.stderr)
+            resultados.extend([str(e)] * (len(mensajes) - len(resultados)))
+            if conexion is not None:
+                self._cerrar_smtp(conexion.smtp)
+                conexion = None
+        finally:
+            self._devolver(conexion)
+        return resultados
+
+    def enviar(self, mensaje):
+        """Envía un mensaje; lanza smtplib.SMTPException si no se pudo enviar."""
+        error = self.enviar_lote([mensaje])[0]
+        if error is not None:
+            raise smtplib.SMTPException(error)
+
+    def cerrar(self):
+        """Cierra las conexiones libres (las que estén en uso se cierran al devolverse)."""
+        while True:
+            try:
+                conexion = self._libres.get_nowait()
+            except queue.Empty:
+                return
+            self._cerrar_smtp(conexion.smtp)
+
+_transporte = None
+_transporte_lock = threading.Lock()
+
+def init_app(app: Flask):
+    app.config.setdefault('MAIL_POOL_CONEXIONES', 2)
+    app.config.setdefault('MAIL_MAX_MENSAJES_POR_CONEXION', 100)
+    app.config.setdefault('MAIL_INACTIVIDAD_MAXIMA_SEGUNDOS', 60)
+    app.config.setdefault('MAIL_TIMEOUT_SEGUNDOS', 30)
+
+def obtener_transporte():
+    """Transporte del proceso, creado en el primer uso con la configuración MAIL_* de la aplicación."""
+    global _transporte
+    with _transporte_lock:
+        if _transporte is None:
+            config = current_app.config
+            _transporte = TransporteSMTP(
+                config.get('MAIL_SERVER', 'smtp.gmail.com'),
+                config.get('MAIL_PORT', 587),
+                usuario=config.get('MAIL_USERNAME'),
+                password=config.get('MAIL_PASSWORD'),
+                usar_tls=config.get('MAIL_USE_TLS', True),
+                usar_ssl=config.get('MAIL_USE_SSL', False),
+                timeout=config.get('MAIL_TIMEOUT_SEGUNDOS', 30),
+                max_conexiones=config.get('MAIL_POOL_CONEXIONES', 2),
+                max_mensajes_por_conexion=config.get('MAIL_MAX_MENSAJES_POR_CONEXION', 100),
+                inactividad_maxima=config.get('MAIL_INACTIVIDAD_MAXIMA_SEGUNDOS', 60),
+            )
+        return _transporte
+
+def construir_mensaje(destinatario, asunto, cuerpo, subtipo='html', remitente=None):
+    """Construye el MIMEText con las cabeceras que usan todos los correos de la aplicación."""
+    msg = MIMEText(cuerpo, subtipo, 'utf-8')
+    msg['Subject'] = Header(asunto, 'utf-8')
+    msg['From'] = remitente or current_app.config.get('MAIL_USERNAME')
+    msg['To'] = destinatario
+    return msg
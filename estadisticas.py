@@ -0,0 +1,116 @@
+# estadisticas.py
+# Distribución de puntajes por dificultad (percentiles, histograma, media y desviación).
+#
+# Calcularla con SQL en cada petición obligaría a ordenar 'leaderboard' una y otra vez. En su
+# lugar, el comando 'flask --app app estadisticas calcular-estadisticas' lee en bloque los
+# puntajes de cada dificultad en un array de NumPy, calcula todo de forma vectorizada y publica
+# en Redis una instantánea compacta. Las peticiones solo leen esa instantánea: el percentil de un
+# puntaje es una búsqueda binaria sobre los 101 cortes precalculados (percentiles 0..100).
+#
+#   estadisticas:<dificultad_id>   JSON con la instantánea de la dificultad
+from extensions import mysql, redis_client
+from MySQLdb.cursors import SSCursor
+from bisect import bisect_right
+from datetime import datetime, timezone
+import json
+
+try:
+    import numpy as np  # Dependencia opcional: solo la necesita el cálculo, no las peticiones
+except ImportError:
+    np = None
+
+ESTADISTICAS_KEY_PREFIX = "estadisticas:"
+
+# --- Parámetros ---
+NUM_BUCKETS_HISTOGRAMA = 20
+TAMANO_LOTE_LECTURA = 10000
+
+class EstadisticasNoDisponibles(Exception):
+    """Redis no está disponible: no se pueden publicar ni leer las instantáneas."""
+
+def _cliente():
+    if redis_client is None:
+        raise EstadisticasNoDisponibles("Redis no está conectado.")
+    return redis_client
+
+def clave_estadisticas(dificultad_id):
+    return f"{ESTADISTICAS_KEY_PREFIX}{int(dificultad_id)}"
+
+def _leer_puntajes(cursor, dificultad_id):
+    """Lee los puntajes de la dificultad por lotes (cursor no bufferizado) en un array int64."""
+    cursor.execute("SELECT puntaje FROM leaderboard WHERE dificultad_id = %s", (dificultad_id,))
+    lotes = []
+    while True:
+        filas = cursor.fetchmany(TAMANO_LOTE_LECTURA)
+        if not filas:
+            break
+        lotes.append(np.fromiter((fila[0] for fila in filas), dtype=np.int64, count=len(filas)))
+    return np.concatenate(lotes) if lotes else np.empty(0, dtype=np.int64)
+
+def resumir(puntajes):
+    """Calcula la instantánea de un array de puntajes (sin acceso a MySQL ni Redis)."""
+    if puntajes.size == 0:
+        return {"jugadores": 0}
+    # 'inverted_cdf' devuelve puntajes reales (sin interpolar): el corte k es el menor puntaje
+    # tal que al menos el k% de los jugadores tiene un puntaje igual o inferior.
+    cortes = np.percentile(puntajes, np.arange(101), method='inverted_cdf')
+    conteos, bordes = np.histogram(puntajes, bins=NUM_BUCKETS_HISTOGRAMA)
+    return {
+        "jugadores": int(puntajes.size),
+        "media": round(float(puntajes.mean()), 2),
+        "desviacion": round(float(puntajes.std()), 2),
+        "minimo": int(puntajes.min()),
+        "maximo": int(puntajes.max()),
+        "mediana": int(cortes[50]),
+        "percentiles": cortes.astype(np.int64).tolist(),
+        "histograma": {
+            "bordes": [round(float(borde), 2) for borde in bordes],
+            "conteos": conteos.tolist()
+        }
+    }
+
+def calcular_estadisticas():
+    """
+    Recalcula y publica la instantánea de cada dificultad.
+    Retorna {dificultad_id: jugadores}.
+    """
+    if np is None:
+        raise RuntimeError("NumPy no está instalado (pip install numpy).")
+    cliente = _cliente()
+    generado = datetime.now(timezone.utc).isoformat()
+    resultado = {}
+
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute("SELECT id FROM dificultades")
+        dificultades = [fila[0] for fila in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+    cursor = mysql.connection.cursor(SSCursor)
+    try:
+        pipe = cliente.pipeline(transaction=False)
+        for dificultad_id in dificultades:
+            instantanea = resumir(_leer_puntajes(cursor, dificultad_id))
+            instantanea.update({"dificultad_id": dificultad_id, "generado_at": generado})
+            pipe.set(clave_estadisticas(dificultad_id), json.dumps(instantanea, separators=(',', ':')))
+            resultado[dificultad_id] = instantanea["jugadores"]
+        pipe.execute()
+    finally:
+        cursor.close()
+    return resultado
+
+def obtener_estadisticas(dificultad_id):
+    """Retorna la instantánea publicada (dict) o None si todavía no se ha calculado."""
+    instantanea = _cliente().get(clave_estadisticas(dificultad_id))
+    return json.loads(instantanea) if instantanea else None
+
+def calcular_percentil(instantanea, puntaje):
+    """
+    Percentil (0-100) de un puntaje: el mayor k cuyo corte no supera el puntaje, es decir, el
+    puntaje alcanza al menos al k% de los jugadores. Búsqueda binaria sobre los cortes.
+    """
+    cortes = instantanea.get("percentiles")
+    if not cortes:
+        return None
+    return max(bisect_right(cortes, puntaje) - 1, 0)
@@ -0,0 +1,140 @@
+# eventos.py
+# Notificaciones en tiempo real (Server-Sent Events) de publicaciones y comentarios nuevos.
+#
+# Las rutas de escritura publican en Redis (PUBLISH) un mensaje por evento:
+#   - eventos:feed                  -> publicación creada
+#   - eventos:publicacion:<id>      -> comentario nuevo en la publicación <id>
+# Cada proceso mantiene UNA sola suscripción a Redis (PSUBSCRIBE eventos:*) en un hilo de
+# fondo, que reparte cada mensaje en memoria a las colas de los clientes SSE conectados a ese
+# canal. Así, un cliente mirando una publicación no cuesta consultas a MySQL ni conexiones
+# extra a Redis: solo una cola local.
+#
+# Nota de despliegue: cada conexión SSE ocupa un hilo del servidor mientras está abierta,
+# así que conviene servir la aplicación con workers basados en hilos (p. ej. gunicorn --threads).
+from extensions import redis_client
+import json
+import queue
+import sys
+import threading
+import time
+
+CANAL_PREFIX = "eventos:"
+CANAL_FEED = f"{CANAL_PREFIX}feed"
+
+# --- Parámetros de las conexiones SSE ---
+INTERVALO_LATIDO_SEGUNDOS = 15     # Comentario ': latido' para que proxies y navegadores no corten la conexión
+REINTENTO_CLIENTE_MS = 5000        # Valor 'retry:' que indica al navegador cuándo reconectar
+MAX_EVENTOS_PENDIENTES = 100       # Un cliente que acumula más eventos sin leer se desconecta
+PAUSA_RECONEXION_SEGUNDOS = 2      # Espera del hilo suscriptor antes de reintentar tras un fallo de Redis
+
+def canal_publicacion(publicacion_id):
+    return f"{CANAL_PREFIX}publicacion:{publicacion_id}"
+
+def publicar(canal, tipo, datos):
+    """
+    Publica un evento en el canal. Los fallos de Redis se registran pero no interrumpen
+    la escritura que originó el evento (los clientes pueden volver a consultar la API).
+    """
+    if redis_client is None:
+        return
+    try:
+        redis_client.publish(canal, json.dumps({"tipo": tipo, "datos": datos}, default=str))
+    except Exception as e:
+        print(f"ERROR: eventos.publicar - Fallo al publicar '{tipo}' en '{canal}': {e}", file=sys.stderr)
+
+class _Difusor:
+    """Suscripción única por proceso que reparte los mensajes de Redis entre las colas locales."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscriptores = {}   # {canal: set(queue.Queue)}
+        self._hilo = None
+
+    def suscribir(self, canal):
+        cola = queue.Queue(maxsize=MAX_EVENTOS_PENDIENTES)
+        with self._lock:
+            self._suscriptores.setdefault(canal, set()).add(cola)
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._escuchar, name="eventos-sse", daemon=True)
+                self._hilo.start()
+        return cola
+
+    def cancelar(self, canal, cola):
+        with self._lock:
+            colas = self._suscriptores.get(canal)
+            if colas is not None:
+                colas.discard(cola)
+                if not colas:
+                    del self._suscriptores[canal]
+
+    def _repartir(self, canal, mensaje):
+        with self._lock:
+            colas = list(self._suscriptores.get(canal, ()))
+        for cola in colas:
+            try:
+                cola.put_nowait(mensaje)
+            except queue.Full:
+                # Cliente demasiado lento: se le avisa con None para que cierre y reconecte.
+                self.cancelar(canal, cola)
+                try:
+                    cola.get_nowait()
+                    cola.put_nowait(None)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _escuchar(self):
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{CANAL_PREFIX}*")
+                print("INFO: eventos - Suscripción a Redis activa para SSE.", file=sys.stderr)
+                for mensaje in pubsub.listen():
+                    if mensaje.get('type') == 'pmessage':
+                        self._repartir(mensaje['channel'], mensaje['data'])
+            except Exception as e:
+                print(f"ERROR: eventos - Suscripción a Redis interrumpida: {e}. Reintentando.", file=sys.stderr)
+                time.sleep(PAUSA_RECONEXION_SEGUNDOS)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+_difusor = _Difusor()
+
+def _formatear_evento(mensaje):
+    """Convierte un mensaje publicado ({"tipo", "datos"}) al formato de texto de SSE."""
+    try:
+        evento = json.loads(mensaje)
+        return f"event: {evento['tipo']}\ndata: {json.dumps(evento['datos'])}\n\n"
+    except (ValueError, KeyError, TypeError):
+        print(f"ERROR: eventos - Mensaje con formato inválido descartado: {mensaje!r}", file=sys.stderr)
+        return None
+
+def escuchar(canal):
+    """
+    Generador con el cuerpo de una respuesta text/event-stream para el canal indicado.
+    Requiere Redis; las rutas deben comprobar 'disponible()' antes de abrir el stream.
+    """
+    cola = _difusor.suscribir(canal)
+    try:
+        yield f"retry: {REINTENTO_CLIENTE_MS}\n\n"
+        while True:
+            try:
+                mensaje = cola.get(timeout=INTERVALO_LATIDO_SEGUNDOS)
+            except queue.Empty:
+                yield ": latido\n\n"
+                continue
+            if mensaje is None:
+                return
+            texto = _formatear_evento(mensaje)
+            if texto:
+                yield texto
+    finally:
+        # Se ejecuta también cuando el cliente cierra la conexión (GeneratorExit).
+        _difusor.cancelar(canal, cola)
+
+def disponible():
+    return redis_client is not None
@@ -17,11 +17,11 @@ CREATE TABLE IF NOT EXISTS users (
     password_hash VARCHAR(255) NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     verificado BOOLEAN DEFAULT FALSE,
-    verification_code VARCHAR(6),        -- Renamed for consistency with Python
-    code_expiration DATETIME DEFAULT NULL, -- Renamed for consistency with Python
+    verification_code VARCHAR(6),        -- Obsoleta: los códigos viven en Redis con TTL (codigos.py)
+    code_expiration DATETIME DEFAULT NULL, -- Obsoleta: ver codigos.py
     foto_perfil VARCHAR(255) DEFAULT NULL, -- Columna para la URL de la foto de perfil
-    reset_token VARCHAR(255) NULL,         -- Columna para el token/código de restablecimiento de contraseña
-    reset_token_expira DATETIME NULL,      -- Columna para la expiración del token/código de restablecimiento
+    reset_token VARCHAR(255) NULL,         -- Obsoleta: los códigos de restablecimiento viven en Redis (codigos.py)
+    reset_token_expira DATETIME NULL,      -- Obsoleta: ver codigos.py
     token VARCHAR(255) NULL                -- Added token column
 );
 
@@ -66,8 +66,15 @@ CREATE TABLE IF NOT EXISTS publicaciones (
     autor_id INT NOT NULL,
     titulo VARCHAR(255) NOT NULL, -- Added titulo column
     texto TEXT NOT NULL,
+    extracto VARCHAR(255) DEFAULT NULL, -- Extracto precalculado al crear/editar, usado por la vista resumida del feed
     imageUrl VARCHAR(255) DEFAULT NULL, -- Added imageUrl column for primary image
+    cantidad_imagenes INT NOT NULL DEFAULT 0, -- Contador de imagenes_publicacion mantenido por la API
+    cantidad_comentarios INT NOT NULL DEFAULT 0, -- Contador mantenido por la API (ver 'flask user reconciliar-comentarios')
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Índice para la paginación por cursor (keyset) del feed sobre (created_at, id)
+    INDEX idx_publicaciones_created_at_id (created_at, id),
+    -- Índice de texto completo para GET /publicaciones/buscar
+    FULLTEXT INDEX ft_publicaciones_titulo_texto (titulo, texto),
     -- Clave foránea al usuario que creó la publicación
     FOREIGN KEY (autor_id) REFERENCES users(id) ON DELETE CASCADE
 );
@@ -91,6 +98,8 @@ CREATE TABLE IF NOT EXISTS comentarios (
     autor_id INT NOT NULL,
     texto TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Índice para la paginación por cursor de los comentarios de una publicación
+    INDEX idx_comentarios_publicacion_fecha (publicacion_id, created_at, id),
     -- Claves foráneas a la publicación y al autor del comentario
     FOREIGN KEY (publicacion_id) REFERENCES publicaciones(id) ON DELETE CASCADE,
     FOREIGN KEY (autor_id) REFERENCES users(id) ON DELETE CASCADE
@@ -111,6 +120,62 @@ CREATE TABLE IF NOT EXISTS leaderboard (
     FOREIGN KEY (dificultad_id) REFERENCES dificultades(id) ON DELETE CASCADE
 );
 
+-- Tabla de correos pendientes (bandeja de salida transaccional)
+-- Las rutas insertan aquí el correo en la misma transacción que el dato que lo origina;
+-- el worker 'flask --app app auth procesar-correos' los envía con reintentos.
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    destinatario VARCHAR(255) NOT NULL,
+    asunto VARCHAR(255) NOT NULL,
+    cuerpo MEDIUMTEXT NOT NULL,
+    subtipo VARCHAR(10) NOT NULL DEFAULT 'html',     -- 'html' o 'plain'
+    estado ENUM('pendiente', 'enviado', 'fallido') NOT NULL DEFAULT 'pendiente',
+    intentos INT NOT NULL DEFAULT 0,
+    proximo_intento DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ultimo_error VARCHAR(1000) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    enviado_at DATETIME NULL,
+    -- Índice que usa el worker para reclamar los correos pendientes vencidos
+    INDEX idx_email_outbox_pendientes (estado, proximo_intento)
+);
+
+-- Claves de idempotencia de POST /partidas: un reintento con la misma clave no vuelve a sumar
+-- los contadores. 'flask --app app partidas limpiar-envios' borra las antiguas.
+CREATE TABLE IF NOT EXISTS partidas_envios (
+    user_id INT NOT NULL,
+    clave VARCHAR(64) NOT NULL,
+    huella CHAR(64) NOT NULL,                        -- SHA-256 de los resultados enviados
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, clave),
+    INDEX idx_partidas_envios_created_at (created_at),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Checkpoint del volcado de telemetría (telemetria.py): id de la última entrada del stream de
+-- Redis ya aplicada a 'partidas'. Se actualiza en la misma transacción que los incrementos.
+CREATE TABLE IF NOT EXISTS telemetria_checkpoint (
+    stream VARCHAR(64) PRIMARY KEY,
+    ultimo_id VARCHAR(32) NOT NULL DEFAULT '0-0',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Clasificaciones diarias, semanales y de temporada ya cerradas (clasificacion.py). Las abiertas
+-- viven en Redis; 'flask --app app leaderboard archivar-clasificaciones' copia aquí las cerradas.
+CREATE TABLE IF NOT EXISTS leaderboard_historico (
+    ventana ENUM('diaria', 'semanal', 'temporada') NOT NULL,
+    periodo VARCHAR(10) NOT NULL,                     -- 2025-06-30, 2025-W27 o 2025-T3
+    dificultad_id INT NOT NULL,
+    posicion INT NOT NULL,
+    user_id INT NOT NULL,
+    puntaje INT NOT NULL,
+    archivado_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Una página de un periodo se lee por rango de clave primaria, ya en orden de posición
+    PRIMARY KEY (ventana, periodo, dificultad_id, posicion),
+    INDEX idx_leaderboard_historico_usuario (user_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (dificultad_id) REFERENCES dificultades(id) ON DELETE CASCADE
+);
+
 -- Cambiador de delimitador para permitir la creación del TRIGGER
 DELIMITER $$
 
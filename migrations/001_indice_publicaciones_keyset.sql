@@ -0,0 +1,6 @@
+-- Migración para bases de datos existentes (flask.sql ya incluye este cambio para instalaciones nuevas).
+-- Índice usado por la paginación por cursor (keyset) de GET /publicaciones.
+USE flask_api;
+
+ALTER TABLE publicaciones
+    ADD INDEX idx_publicaciones_created_at_id (created_at, id);
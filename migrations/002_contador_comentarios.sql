@@ -0,0 +1,15 @@
+-- Migración para bases de datos existentes (flask.sql ya incluye este cambio para instalaciones nuevas).
+-- Contador de comentarios por publicación, leído por el feed en la misma consulta.
+USE flask_api;
+
+ALTER TABLE publicaciones
+    ADD COLUMN cantidad_comentarios INT NOT NULL DEFAULT 0 AFTER imageUrl;
+
+-- Carga inicial del contador (equivalente a 'flask --app app user reconciliar-comentarios').
+UPDATE publicaciones p
+JOIN (
+    SELECT publicacion_id, COUNT(*) AS total
+    FROM comentarios
+    GROUP BY publicacion_id
+) c ON c.publicacion_id = p.id
+SET p.cantidad_comentarios = c.total;
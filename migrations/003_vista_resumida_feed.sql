@@ -0,0 +1,21 @@
+-- Migración para bases de datos existentes (flask.sql ya incluye este cambio para instalaciones nuevas).
+-- Columnas precalculadas para la vista resumida del feed (GET /publicaciones?view=summary).
+USE flask_api;
+
+ALTER TABLE publicaciones
+    ADD COLUMN extracto VARCHAR(255) DEFAULT NULL AFTER texto,
+    ADD COLUMN cantidad_imagenes INT NOT NULL DEFAULT 0 AFTER imageUrl;
+
+-- Carga inicial del extracto (la API lo recorta en el último espacio; aquí basta un corte simple).
+UPDATE publicaciones
+SET extracto = IF(CHAR_LENGTH(texto) > 200, CONCAT(LEFT(texto, 200), '…'), texto);
+
+-- Carga inicial del contador de imágenes y de la imagen principal.
+UPDATE publicaciones p
+JOIN (
+    SELECT publicacion_id, COUNT(*) AS total, SUBSTRING_INDEX(GROUP_CONCAT(url ORDER BY orden, id), ',', 1) AS primera
+    FROM imagenes_publicacion
+    GROUP BY publicacion_id
+) i ON i.publicacion_id = p.id
+SET p.cantidad_imagenes = i.total,
+    p.imageUrl = COALESCE(p.imageUrl, i.primera);
@@ -0,0 +1,6 @@
+-- Migración para bases de datos existentes (flask.sql ya incluye este cambio para instalaciones nuevas).
+-- Índice FULLTEXT usado por GET /publicaciones/buscar.
+USE flask_api;
+
+ALTER TABLE publicaciones
+    ADD FULLTEXT INDEX ft_publicaciones_titulo_texto (titulo, texto);
@@ -0,0 +1,7 @@
+-- Migración para bases de datos existentes (flask.sql ya incluye este cambio para instalaciones nuevas).
+-- Índice compuesto usado por la paginación por cursor de GET /publicaciones/<id>/comentarios.
+-- También cubre la clave foránea sobre publicacion_id.
+USE flask_api;
+
+ALTER TABLE comentarios
+    ADD INDEX idx_comentarios_publicacion_fecha (publicacion_id, created_at, id);
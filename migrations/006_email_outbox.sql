@@ -0,0 +1,19 @@
+-- Migración para bases de datos existentes (flask.sql ya incluye este cambio para instalaciones nuevas).
+-- Bandeja de salida transaccional de correos; la vacía 'flask --app app auth procesar-correos'.
+USE flask_api;
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    destinatario VARCHAR(255) NOT NULL,
+    asunto VARCHAR(255) NOT NULL,
+    cuerpo MEDIUMTEXT NOT NULL,
+    subtipo VARCHAR(10) NOT NULL DEFAULT 'html',     -- 'html' o 'plain'
+    estado ENUM('pendiente', 'enviado', 'fallido') NOT NULL DEFAULT 'pendiente',
+    intentos INT NOT NULL DEFAULT 0,
+    proximo_intento DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ultimo_error VARCHAR(1000) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    enviado_at DATETIME NULL,
+    -- Índice que usa el worker para reclamar los correos pendientes vencidos
+    INDEX idx_email_outbox_pendientes (estado, proximo_intento)
+);
@@ -0,0 +1,16 @@
+-- Migración para bases de datos existentes (flask.sql ya incluye este cambio para instalaciones nuevas).
+-- Los códigos de verificación y de restablecimiento se guardan ahora en Redis con TTL (codigos.py).
+-- Las columnas se conservan (sin uso) para poder volver a una versión anterior; aquí solo se
+-- vacían. Los usuarios con un código pendiente en el momento del despliegue deberán pedir uno nuevo
+-- (POST /reenviar_verificacion para la verificación, POST /forgot_password para el restablecimiento).
+USE flask_api;
+
+UPDATE users
+SET verification_code = NULL,
+    code_expiration = NULL,
+    reset_token = NULL,
+    reset_token_expira = NULL
+WHERE verification_code IS NOT NULL
+   OR code_expiration IS NOT NULL
+   OR reset_token IS NOT NULL
+   OR reset_token_expira IS NOT NULL;
@@ -0,0 +1,14 @@
+-- Migración para bases de datos existentes (flask.sql ya incluye este cambio para instalaciones nuevas).
+-- Claves de idempotencia de POST /partidas: un reintento con la misma clave no vuelve a sumar
+-- los contadores. 'flask --app app partidas limpiar-envios' borra las antiguas.
+USE flask_api;
+
+CREATE TABLE IF NOT EXISTS partidas_envios (
+    user_id INT NOT NULL,
+    clave VARCHAR(64) NOT NULL,
+    huella CHAR(64) NOT NULL,                        -- SHA-256 de los resultados enviados
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, clave),
+    INDEX idx_partidas_envios_created_at (created_at),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
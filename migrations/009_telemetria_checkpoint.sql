@@ -0,0 +1,10 @@
+-- Migración para bases de datos existentes (flask.sql ya incluye este cambio para instalaciones nuevas).
+USE flask_api;
+
+-- Checkpoint del volcado de telemetría (telemetria.py): id de la última entrada del stream de
+-- Redis ya aplicada a 'partidas'. Se actualiza en la misma transacción que los incrementos.
+CREATE TABLE IF NOT EXISTS telemetria_checkpoint (
+    stream VARCHAR(64) PRIMARY KEY,
+    ultimo_id VARCHAR(32) NOT NULL DEFAULT '0-0',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
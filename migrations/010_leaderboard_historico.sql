@@ -0,0 +1,19 @@
+-- Migración para bases de datos existentes (flask.sql ya incluye este cambio para instalaciones nuevas).
+USE flask_api;
+
+-- Clasificaciones diarias, semanales y de temporada ya cerradas (clasificacion.py). Las abiertas
+-- viven en Redis; 'flask --app app leaderboard archivar-clasificaciones' copia aquí las cerradas.
+CREATE TABLE IF NOT EXISTS leaderboard_historico (
+    ventana ENUM('diaria', 'semanal', 'temporada') NOT NULL,
+    periodo VARCHAR(10) NOT NULL,                     -- 2025-06-30, 2025-W27 o 2025-T3
+    dificultad_id INT NOT NULL,
+    posicion INT NOT NULL,
+    user_id INT NOT NULL,
+    puntaje INT NOT NULL,
+    archivado_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Una página de un periodo se lee por rango de clave primaria, ya en orden de posición
+    PRIMARY KEY (ventana, periodo, dificultad_id, posicion),
+    INDEX idx_leaderboard_historico_usuario (user_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (dificultad_id) REFERENCES dificultades(id) ON DELETE CASCADE
+);
@@ -0,0 +1,127 @@
+# outbox.py
+# Bandeja de salida transaccional de correos (tabla email_outbox).
+#
+# Las rutas no envían correos: insertan el mensaje ya renderizado en email_outbox con el mismo
+# cursor (y por tanto en la misma transacción) que el usuario o el código que lo origina, y
+# responden en cuanto se hace commit. Un proceso aparte (flask --app app auth procesar-correos)
+# vacía la tabla con reintentos y backoff exponencial.
+#
+# Garantía "al menos una vez": antes de enviar, el worker reclama cada fila adelantando su
+# proximo_intento (un "lease"). Si el worker muere a mitad del envío, la fila vuelve a quedar
+# disponible cuando vence el lease; ningún correo se pierde, aunque en ese caso raro podría
+# enviarse dos veces.
+from extensions import mysql
+from correo import obtener_transporte, construir_mensaje
+import sys
+import traceback
+
+# --- Parámetros del worker ---
+TAMANO_LOTE = 20
+DURACION_LEASE_SEGUNDOS = 300     # Tiempo que una fila reclamada queda reservada para un worker
+MAX_INTENTOS = 8
+BACKOFF_BASE_SEGUNDOS = 30        # 30s, 1m, 2m, 4m... hasta BACKOFF_MAXIMO_SEGUNDOS
+BACKOFF_MAXIMO_SEGUNDOS = 3600
+
+def encolar_correo(cursor, destinatario, asunto, cuerpo, subtipo='html'):
+    """
+    Inserta un correo pendiente usando el cursor de la transacción en curso.
+    No hace commit: el correo solo existe si el llamador confirma su propia escritura.
+    """
+    cursor.execute(
+        """
+        INSERT INTO email_outbox (destinatario, asunto, cuerpo, subtipo)
+        VALUES (%s, %s, %s, %s)
+        """,
+        (destinatario, asunto, cuerpo, subtipo)
+    )
+
+def calcular_backoff(intentos):
+    return min(BACKOFF_BASE_SEGUNDOS * 2 ** max(intentos - 1, 0), BACKOFF_MAXIMO_SEGUNDOS)
+
+def _reclamar_lote(cursor, lote):
+    """Reserva hasta 'lote' correos vencidos. SKIP LOCKED permite varios workers en paralelo."""
+    cursor.execute(
+        """
+        SELECT id, destinatario, asunto, cuerpo, subtipo, intentos
+        FROM email_outbox
+        WHERE estado = 'pendiente' AND proximo_intento <= NOW()
+        ORDER BY proximo_intento, id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+        """,
+        (lote,)
+    )
+    filas = cursor.fetchall()
+    if filas:
+        marcadores = ", ".join(["%s"] * len(filas))
+        cursor.execute(
+            f"""
+            UPDATE email_outbox
+            SET intentos = intentos + 1, proximo_intento = NOW() + INTERVAL %s SECOND
+            WHERE id IN ({marcadores})
+            """,
+            (DURACION_LEASE_SEGUNDOS, *[fila[0] for fila in filas])
+        )
+    mysql.connection.commit()
+    return filas
+
+def _enviar_lote(filas):
+    """
+    Envía el lote por el transporte SMTP compartido (una conexión del pool para todo el lote).
+    Retorna {id: None si se envió | mensaje de error}.
+    """
+    mensajes = [
+        construir_mensaje(destinatario, asunto, cuerpo, subtipo)
+        for _, destinatario, asunto, cuerpo, subtipo, _ in filas
+    ]
+    try:
+        errores = obtener_transporte().enviar_lote(mensajes)
+    except Exception as e:
+        # Fallo de conexión o de login: todo el lote se reintenta.
+        print(f"ERROR: outbox - Fallo de conexión SMTP: {e}", file=sys.stderr)
+        errores = [str(e)] * len(filas)
+    return {fila[0]: error for fila, error in zip(filas, errores)}
+
+def procesar_pendientes(lote=TAMANO_LOTE):
+    """
+    Reclama, envía y registra el resultado de un lote de correos.
+    Retorna (enviados, fallidos) de esta pasada.
+    """
+    cursor = mysql.connection.cursor()
+    try:
+        filas = _reclamar_lote(cursor, lote)
+        if not filas:
+            return 0, 0
+
+        resultados = _enviar_lote(filas)
+        enviados = fallidos = 0
+        for outbox_id, destinatario, _, _, _, intentos_previos in filas:
+            error = resultados.get(outbox_id)
+            intentos = intentos_previos + 1
+            if error is None:
+                cursor.execute(
+                    "UPDATE email_outbox SET estado = 'enviado', enviado_at = NOW(), ultimo_error = NULL WHERE id = %s",
+                    (outbox_id,)
+                )
+                enviados += 1
+            elif intentos >= MAX_INTENTOS:
+                cursor.execute(
+                    "UPDATE email_outbox SET estado = 'fallido', ultimo_error = %s WHERE id = %s",
+                    (error[:1000], outbox_id)
+                )
+                print(f"ERROR: outbox - Correo {outbox_id} a {destinatario} descartado tras {intentos} intentos: {error}", file=sys.stderr)
+                fallidos += 1
+            else:
+                cursor.execute(
+                    "UPDATE email_outbox SET proximo_intento = NOW() + INTERVAL %s SECOND, ultimo_error = %s WHERE id = %s",
+                    (calcular_backoff(intentos), error[:1000], outbox_id)
+                )
+                fallidos += 1
+        mysql.connection.commit()
+        return enviados, fallidos
+    except Exception:
+        mysql.connection.rollback()
+        traceback.print_exc(file=sys.stderr)
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,144 @@
+# proteccion_login.py
+# Protección de /login contra credential stuffing y fuerza bruta.
+#
+# Cada verificación bcrypt cuesta cientos de milisegundos de CPU, así que un flood de logins
+# es una denegación de servicio contra toda la API. Antes de tocar MySQL o bcrypt, un único
+# script Lua en Redis comprueba:
+#   1. Bloqueo de la cuenta: tras FALLOS_BLOQUEO fallos en la ventana, la cuenta queda
+#      bloqueada DURACION_BLOQUEO_SEGUNDOS.
+#   2. Ventana deslizante por IP: como máximo MAX_INTENTOS_IP intentos (correctos o no)
+#      cada VENTANA_IP_SEGUNDOS.
+#   3. Retraso progresivo por cuenta: a partir de FALLOS_SIN_RETRASO fallos, cada intento
+#      debe esperar 1, 2, 4... segundos (hasta RETRASO_MAXIMO_SEGUNDOS) desde el último fallo.
+# Si se supera alguno, la ruta responde 429 con Retry-After sin consultar MySQL. El retraso no se
+# implementa durmiendo en el servidor (eso ocuparía hilos): el cliente debe reintentar más tarde.
+from extensions import redis_client
+import sys
+import time
+import uuid
+
+INTENTOS_IP_KEY_PREFIX = "login:intentos_ip:"
+FALLOS_CUENTA_KEY_PREFIX = "login:fallos:"
+BLOQUEO_CUENTA_KEY_PREFIX = "login:bloqueo:"
+
+# --- Parámetros ---
+VENTANA_IP_SEGUNDOS = 300
+MAX_INTENTOS_IP = 30
+VENTANA_FALLOS_SEGUNDOS = 900
+FALLOS_SIN_RETRASO = 3
+RETRASO_MAXIMO_SEGUNDOS = 60
+FALLOS_BLOQUEO = 10
+DURACION_BLOQUEO_SEGUNDOS = 900
+
+# KEYS: [intentos_ip, fallos_cuenta, bloqueo_cuenta]
+# ARGV: [ahora, ventana_ip, max_ip, ventana_fallos, fallos_sin_retraso, retraso_maximo, miembro]
+# Retorna {motivo, segundos_de_espera}; motivo 'ok' registra el intento en la ventana de la IP.
+_LUA_VERIFICAR = """
+local ahora = tonumber(ARGV[1])
+
+local bloqueo = redis.call('PTTL', KEYS[3])
+if bloqueo > 0 then
+    return {'bloqueo', math.ceil(bloqueo / 1000)}
+end
+
+local ventana_ip = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ahora - ventana_ip)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    local primero = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return {'ip', math.max(1, math.ceil(tonumber(primero[2]) + ventana_ip - ahora))}
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ahora - tonumber(ARGV[4]))
+local fallos = redis.call('ZCARD', KEYS[2])
+local sin_retraso = tonumber(ARGV[5])
+if fallos >= sin_retraso then
+    local ultimo = redis.call('ZRANGE', KEYS[2], -1, -1, 'WITHSCORES')
+    local retraso = math.min(2 ^ (fallos - sin_retraso), tonumber(ARGV[6]))
+    local espera = tonumber(ultimo[2]) + retraso - ahora
+    if espera > 0 then
+        return {'retraso', math.max(1, math.ceil(espera))}
+    end
+end
+
+redis.call('ZADD', KEYS[1], ahora, ARGV[7])
+redis.call('EXPIRE', KEYS[1], ventana_ip)
+return {'ok', 0}
+"""
+
+# KEYS: [fallos_cuenta, bloqueo_cuenta]
+# ARGV: [ahora, ventana_fallos, fallos_bloqueo, duracion_bloqueo, miembro]
+_LUA_REGISTRAR_FALLO = """
+local ahora = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ahora - tonumber(ARGV[2]))
+redis.call('ZADD', KEYS[1], ahora, ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+local fallos = redis.call('ZCARD', KEYS[1])
+if fallos >= tonumber(ARGV[3]) then
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[4])
+    redis.call('DEL', KEYS[1])
+end
+return fallos
+"""
+
+_scripts = {}
+
+def _script(nombre, codigo):
+    """Registra el script Lua una sola vez por proceso (redis-py usa EVALSHA y recarga si hace falta)."""
+    if nombre not in _scripts:
+        _scripts[nombre] = redis_client.register_script(codigo)
+    return _scripts[nombre]
+
+def _normalizar(email):
+    return email.strip().lower()
+
+def _miembro(ahora):
+    return f"{ahora:.6f}-{uuid.uuid4().hex[:8]}"
+
+def verificar_intento(ip, email):
+    """
+    Comprueba los límites antes de procesar un login y, si está permitido, cuenta el intento.
+    Retorna (None, 0) si se permite, o (motivo, segundos) con motivo 'bloqueo', 'ip' o 'retraso'.
+    Si Redis no está disponible se permite el intento (no se bloquean todos los logins).
+    """
+    if redis_client is None:
+        print("ERROR: proteccion_login - Redis no está conectado; límites de login desactivados.", file=sys.stderr)
+        return None, 0
+    email = _normalizar(email)
+    ahora = time.time()
+    try:
+        motivo, espera = _script('verificar', _LUA_VERIFICAR)(
+            keys=[f"{INTENTOS_IP_KEY_PREFIX}{ip}", f"{FALLOS_CUENTA_KEY_PREFIX}{email}", f"{BLOQUEO_CUENTA_KEY_PREFIX}{email}"],
+            args=[ahora, VENTANA_IP_SEGUNDOS, MAX_INTENTOS_IP, VENTANA_FALLOS_SEGUNDOS,
+                  FALLOS_SIN_RETRASO, RETRASO_MAXIMO_SEGUNDOS, _miembro(ahora)]
+        )
+    except Exception as e:
+        print(f"ERROR: proteccion_login.verificar_intento - Fallo en Redis: {e}", file=sys.stderr)
+        return None, 0
+    if motivo == 'ok':
+        return None, 0
+    return motivo, int(espera)
+
+def registrar_fallo(email):
+    """Cuenta un fallo de credenciales para la cuenta y la bloquea si alcanza FALLOS_BLOQUEO."""
+    if redis_client is None:
+        return
+    email = _normalizar(email)
+    ahora = time.time()
+    try:
+        fallos = _script('fallo', _LUA_REGISTRAR_FALLO)(
+            keys=[f"{FALLOS_CUENTA_KEY_PREFIX}{email}", f"{BLOQUEO_CUENTA_KEY_PREFIX}{email}"],
+            args=[ahora, VENTANA_FALLOS_SEGUNDOS, FALLOS_BLOQUEO, DURACION_BLOQUEO_SEGUNDOS, _miembro(ahora)]
+        )
+        if fallos >= FALLOS_BLOQUEO:
+            print(f"ALERTA: proteccion_login - Cuenta '{email}' bloqueada {DURACION_BLOQUEO_SEGUNDOS}s tras {fallos} fallos.", file=sys.stderr)
+    except Exception as e:
+        print(f"ERROR: proteccion_login.registrar_fallo - Fallo en Redis: {e}", file=sys.stderr)
+
+def limpiar_fallos(email):
+    """Tras un login correcto se olvidan los fallos previos de la cuenta."""
+    if redis_client is None:
+        return
+    try:
+        redis_client.delete(f"{FALLOS_CUENTA_KEY_PREFIX}{_normalizar(email)}")
+    except Exception as e:
+        print(f"ERROR: proteccion_login.limpiar_fallos - Fallo en Redis: {e}", file=sys.stderr)
@@ -1,16 +1,19 @@
 from flask import Blueprint, request, jsonify, current_app
-from extensions import mysql, bcrypt
-import random
+from extensions import mysql
+import contrasenas
+import proteccion_login
+import codigos
+from codigos import CodigosNoDisponibles, DemasiadosIntentos
+from outbox import encolar_correo, procesar_pendientes
+from contrasenas import HashingSaturado
 import string
-from datetime import datetime, timedelta
-from email.mime.text import MIMEText
-from email.header import Header
-import smtplib
 import os
 import re
 import sys
 import traceback
 import uuid # Importa uuid para generar tokens únicos para usuarios
+import time
+import click
 
 # Importar funciones de Flask-JWT-Extended
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt
@@ -21,59 +24,35 @@ load_dotenv()
 
 auth_bp = Blueprint('auth', __name__)
 
-MAIL_USER = os.getenv('MAIL_USER')
-MAIL_PASS = os.getenv('MAIL_PASS')
-
 def generar_uuid_token():
     """Genera un UUID único para el campo 'token' en la tabla users."""
     return str(uuid.uuid4())
 
-def generar_codigo_verificacion():
-    """Genera un código de verificación numérico de 6 dígitos."""
-    return str(random.randint(100000, 999999))
-
-def enviar_correo_verificacion(destinatario, codigo):
+def encolar_correo_verificacion(cursor, destinatario, codigo):
     """
-    Envía un correo electrónico con el código de verificación.
-    Retorna True si el envío es exitoso, False en caso contrario.
+    Encola el correo con el código de verificación en email_outbox (ver outbox.py).
+    Se escribe en la transacción del cursor; el llamador hace el commit.
     """
-    try:
-        remitente = MAIL_USER
-        asunto = "Código de Verificación para tu Cuenta"
-        cuerpo_html = f"""
-        <html>
-        <body>
-            <p>Hola,</p>
-            <p>Gracias por registrarte. Tu código de verificación es:</p>
-            <h3 style="color: #0056b3;">{codigo}</h3>
-            <p>Este código es válido por 15 minutos.</p>
-            <p>Si no solicitaste este código, por favor ignora este correo.</p>
-            <p>Atentamente,</p>
-            <p>El equipo de tu aplicación</p>
-        </body>
-        </html>
-        """
-
-        msg = MIMEText(cuerpo_html, 'html', 'utf-8')
-        msg['From'] = Header(remitente, 'utf-8')
-        msg['To'] = Header(destinatario, 'utf-8')
-        msg['Subject'] = Header(asunto, 'utf-8')
-
-        # Usar el puerto 587 para STARTTLS
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(MAIL_USER, MAIL_PASS)
-            server.sendmail(remitente, destinatario, msg.as_string())
-        return True
-    except Exception as e:
-        print(f"Error al enviar correo de verificación: {e}", file=sys.stderr)
-        traceback.print_exc(file=sys.stderr)
-        return False
+    asunto = "Código de Verificación para tu Cuenta"
+    cuerpo_html = f"""
+    <html>
+    <body>
+        <p>Hola,</p>
+        <p>Gracias por registrarte. Tu código de verificación es:</p>
+        <h3 style="color: #0056b3;">{codigo}</h3>
+        <p>Este código es válido por 15 minutos.</p>
+        <p>Si no solicitaste este código, por favor ignora este correo.</p>
+        <p>Atentamente,</p>
+        <p>El equipo de tu aplicación</p>
+    </body>
+    </html>
+    """
+    encolar_correo(cursor, destinatario, asunto, cuerpo_html, 'html')
 
-def enviar_correo_restablecimiento(destinatario, reset_code):
+def encolar_correo_restablecimiento(cursor, destinatario, reset_code):
     """
-    Envía un correo electrónico con el CÓDIGO para restablecer la contraseña.
-    Retorna True si el envío es exitoso, False en caso contrario.
+    Encola el correo con el CÓDIGO para restablecer la contraseña.
+    Se escribe en la transacción del cursor; el llamador hace el commit.
     """
     reset_email_body = f"""
     <html>
@@ -89,47 +68,42 @@ def enviar_correo_restablecimiento(destinatario, reset_code):
     </body>
     </html>
     """
-    
-    msg = MIMEText(reset_email_body, 'html', 'utf-8')
-    msg['Subject'] = Header('Restablecimiento de Contraseña - God of Eternia', 'utf-8')
-    msg['From'] = MAIL_USER
-    msg['To'] = destinatario
+    encolar_correo(cursor, destinatario, 'Restablecimiento de Contraseña - God of Eternia', reset_email_body, 'html')
 
-    try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(MAIL_USER, MAIL_PASS)
-            server.send_message(msg)
-        return True
-    except Exception as e:
-        print(f"Error al enviar correo de restablecimiento a {destinatario}: {str(e)}", file=sys.stderr)
-        traceback.print_exc(file=sys.stderr)
-        return False
-
-def enviar_correo_bienvenida(nombre_usuario, destinatario):
+def encolar_correo_bienvenida(cursor, nombre_usuario, destinatario):
     """
-    Envía un correo electrónico de bienvenida después de la verificación exitosa.
-    Retorna True si el envío es exitoso, False en caso contrario.
+    Encola el correo de bienvenida después de la verificación exitosa.
+    Se escribe en la transacción del cursor; el llamador hace el commit.
     """
     cuerpo = f"¡Hola {nombre_usuario}!\n\n" \
              f"Tu cuenta en God of Eternia ha sido verificada exitosamente. ¡Bienvenido a la aventura!\n\n" \
              f"¡Que disfrutes tu experiencia!\n" \
              f"El equipo de God of Eternia."
-    msg = MIMEText(cuerpo, 'plain', 'utf-8')
-    msg['Subject'] = Header('¡Bienvenido a God of Eternia!', 'utf-8')
-    msg['From'] = MAIL_USER
-    msg['To'] = destinatario
-
-    try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(MAIL_USER, MAIL_PASS)
-            server.send_message(msg)
-        return True
-    except Exception as e:
-        print(f"Error al enviar correo de bienvenida a {destinatario}: {str(e)}", file=sys.stderr)
-        traceback.print_exc(file=sys.stderr)
-        return False
+    encolar_correo(cursor, destinatario, '¡Bienvenido a God of Eternia!', cuerpo, 'plain')
+
+def respuesta_saturado(ruta):
+    """Respuesta 503 cuando el pool de bcrypt está saturado (ver contrasenas.py)."""
+    print(f"ERROR: {ruta} -> Pool de hashing saturado. Devolviendo 503.", file=sys.stderr)
+    response = jsonify({"error": "El servidor está ocupado. Inténtalo de nuevo en unos segundos."})
+    response.headers['Retry-After'] = '2'
+    return response, 503
+
+def respuesta_codigos_no_disponibles(ruta):
+    """Respuesta 503 cuando Redis (almacén de los códigos, ver codigos.py) no está disponible."""
+    print(f"ERROR: {ruta} -> Redis no disponible para los códigos de verificación/restablecimiento.", file=sys.stderr)
+    return jsonify({"error": "Servicio temporalmente no disponible. Inténtalo de nuevo más tarde."}), 503
+
+def respuesta_limite_login(motivo, espera):
+    """Respuesta 429 cuando un intento de login supera los límites de proteccion_login.py."""
+    mensajes = {
+        'bloqueo': "Cuenta bloqueada temporalmente por demasiados intentos fallidos.",
+        'ip': "Demasiados intentos de inicio de sesión desde esta dirección.",
+        'retraso': "Demasiados intentos fallidos.",
+    }
+    print(f"DEBUG BACKEND: /login -> Intento rechazado ({motivo}), reintentar en {espera}s. Devolviendo 429.", file=sys.stderr)
+    response = jsonify({"error": f"{mensajes[motivo]} Inténtalo de nuevo en {espera} segundos."})
+    response.headers['Retry-After'] = str(espera)
+    return response, 429
 
 def validar_password(password):
     """
@@ -187,11 +161,19 @@ def register():
             cursor.close()
             return jsonify({"error": "El nombre de usuario o correo electrónico ya está registrado."}), 409
 
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        try:
+            hashed_password = contrasenas.generar_hash(password)
+        except HashingSaturado:
+            cursor.close()
+            return respuesta_saturado('/register')
         
-        # Generar código de verificación y tiempo de expiración
-        verification_code = generar_codigo_verificacion()
-        code_expiration = datetime.now() + timedelta(minutes=15) # Expira en 15 minutos
+        # Código de verificación en Redis con TTL de 15 minutos (ver codigos.py).
+        # Se guarda antes del INSERT: si el commit falla, el código huérfano simplemente caduca.
+        try:
+            verification_code = codigos.emitir_codigo_verificacion(email)
+        except CodigosNoDisponibles:
+            cursor.close()
+            return respuesta_codigos_no_disponibles('/register')
 
         # Generar un token UUID único para el usuario.
         # Esta columna 'token' puede ser usada para identificar públicamente al usuario
@@ -201,23 +183,24 @@ def register():
         # Insertar el nuevo usuario con el token UUID generado
         cursor.execute(
             """
-            INSERT INTO users (username, email, password_hash, token, verificado, verification_code, code_expiration, DescripUsuario)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            INSERT INTO users (username, email, password_hash, token, verificado, DescripUsuario)
+            VALUES (%s, %s, %s, %s, %s, %s)
             """,
-            (username, email, hashed_password, new_user_uuid_token, 0, verification_code, code_expiration, descrip_usuario)
+            (username, email, hashed_password, new_user_uuid_token, 0, descrip_usuario)
         )
+        new_user_id = cursor.lastrowid # ID del usuario recién insertado (antes del INSERT en email_outbox)
+
+        # El correo de verificación se encola en la misma transacción que el usuario:
+        # o se guardan ambos o ninguno. El worker de outbox.py lo envía.
+        encolar_correo_verificacion(cursor, email, verification_code)
         conn.commit()
 
-        # Enviar correo de verificación
-        if not enviar_correo_verificacion(email, verification_code):
-            print(f"Error al enviar correo de verificación a {email}", file=sys.stderr)
-        
         # Cierra el cursor después de usarlo
         cursor.close()
         
         return jsonify({
             "message": "Registro exitoso. Se ha enviado un código de verificación a su correo.",
-            "user_id": cursor.lastrowid # lastrowid obtiene el ID del usuario recién insertado
+            "user_id": new_user_id
         }), 201
 
     except Exception as e:
@@ -241,39 +224,46 @@ def verify_email():
         conn = mysql.connection
         cursor = conn.cursor()
 
-        # Buscar usuario por email y código de verificación
-        cursor.execute("SELECT id, username, verification_code, code_expiration, verificado FROM users WHERE email = %s", (email,))
+        # Buscar usuario por email (el código está en Redis, ver codigos.py)
+        cursor.execute("SELECT id, username, verificado FROM users WHERE email = %s", (email,))
         user_info = cursor.fetchone()
 
         if not user_info:
             cursor.close()
             return jsonify({"error": "Email no encontrado."}), 404
         
-        user_id, username, stored_code, code_expiration, is_verified = user_info
+        user_id, username, is_verified = user_info
 
         if is_verified:
             cursor.close()
             return jsonify({"message": "La cuenta ya está verificada."}), 200
 
-        if stored_code != verification_code:
+        # Comparación atómica con contador de intentos; la expiración la aplica el TTL de Redis.
+        try:
+            resultado = codigos.comprobar_codigo_verificacion(email, verification_code)
+        except CodigosNoDisponibles:
+            cursor.close()
+            return respuesta_codigos_no_disponibles('/verificar')
+
+        if resultado == 'invalido':
             cursor.close()
             return jsonify({"error": "Código de verificación inválido."}), 401
 
-        if code_expiration is None or datetime.now() > code_expiration:
-            # Limpiar el código expirado de la base de datos
-            cursor.execute("UPDATE users SET verification_code = NULL, code_expiration = NULL WHERE id = %s", (user_id,))
-            conn.commit() # Aplicar el cambio para limpiar el token expirado
+        if resultado == 'agotado':
+            cursor.close()
+            return jsonify({"error": "Demasiados intentos con un código inválido. Por favor, solicita uno nuevo en /reenviar_verificacion."}), 401
+
+        if resultado == 'expirado':
             cursor.close()
-            return jsonify({"error": "El código de verificación ha expirado. Por favor, solicita uno nuevo."}), 401
+            return jsonify({"error": "El código de verificación ha expirado. Por favor, solicita uno nuevo en /reenviar_verificacion."}), 401
 
         # Si el código es válido y no ha expirado, actualizar el estado 'verificado'
-        cursor.execute("UPDATE users SET verificado = 1, verification_code = NULL, code_expiration = NULL WHERE id = %s", (user_id,))
+        cursor.execute("UPDATE users SET verificado = 1 WHERE id = %s", (user_id,))
+        # Correo de bienvenida encolado en la misma transacción que la verificación
+        encolar_correo_bienvenida(cursor, username, email)
         conn.commit()
         cursor.close()
-
-        # Enviar correo de bienvenida
-        if not enviar_correo_bienvenida(username, email):
-            print(f"Advertencia: No se pudo enviar el correo de bienvenida a {email}", file=sys.stderr)
+        codigos.anular_codigo_verificacion(email)
 
         return jsonify({"message": "Correo electrónico verificado exitosamente."}), 200
 
@@ -284,6 +274,46 @@ def verify_email():
         traceback.print_exc(file=sys.stderr)
         return jsonify({"error": "Error interno del servidor al verificar correo."}), 500
 
+@auth_bp.route('/reenviar_verificacion', methods=['POST'])
+def reenviar_verificacion():
+    """
+    Emite un nuevo código de verificación (el anterior queda anulado) y encola el correo.
+    Responde lo mismo exista o no la cuenta, para evitar la enumeración de emails.
+    """
+    data = request.get_json(silent=True) or {}
+    email = data.get('email')
+    if not isinstance(email, str) or not email.strip():
+        return jsonify({"error": "El correo electrónico es obligatorio."}), 400
+
+    try:
+        codigos.reservar_reenvio_verificacion(email, request.remote_addr)
+    except CodigosNoDisponibles:
+        return respuesta_codigos_no_disponibles('/reenviar_verificacion')
+    except DemasiadosIntentos as e:
+        response = jsonify({"error": f"Ya se envió un código hace poco. Inténtalo de nuevo en {e.espera} segundos."})
+        response.headers['Retry-After'] = str(e.espera)
+        return response, 429
+
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute("SELECT verificado FROM users WHERE email = %s", (email,))
+        user = cursor.fetchone()
+        if user and not user[0]:
+            try:
+                verification_code = codigos.emitir_codigo_verificacion(email)
+            except CodigosNoDisponibles:
+                return respuesta_codigos_no_disponibles('/reenviar_verificacion')
+            encolar_correo_verificacion(cursor, email, verification_code)
+            mysql.connection.commit()
+        return jsonify({"message": "Si la cuenta existe y no está verificada, se ha enviado un nuevo código de verificación."}), 200
+    except Exception as e:
+        mysql.connection.rollback()
+        print(f"Error en /reenviar_verificacion: {str(e)}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor."}), 500
+    finally:
+        cursor.close()
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     try:
@@ -293,6 +323,14 @@ def login():
 
         if not all([email, password]):
             return jsonify({"error": "Faltan datos requeridos (email, password)."}), 400
+        if not isinstance(email, str) or not isinstance(password, str):
+            return jsonify({"error": "El email y la contraseña deben ser texto."}), 400
+
+        # Límites por IP y por cuenta ANTES de consultar MySQL o gastar CPU en bcrypt.
+        # remote_addr es la IP del cliente directo (detrás de un proxy habría que configurar ProxyFix).
+        motivo, espera = proteccion_login.verificar_intento(request.remote_addr, email)
+        if motivo:
+            return respuesta_limite_login(motivo, espera)
 
         conn = mysql.connection
         cursor = conn.cursor()
@@ -302,11 +340,20 @@ def login():
         user = cursor.fetchone()
         cursor.close()
 
-        if user and bcrypt.check_password_hash(user[3], password): # user[3] es password_hash
-            user_id, username, user_email, _, is_verified = user # Desempaquetar todos los valores
+        try:
+            credenciales_validas = bool(user) and contrasenas.verificar(user[3], password) # user[3] es password_hash
+        except HashingSaturado:
+            return respuesta_saturado('/login')
+
+        if credenciales_validas:
+            user_id, username, user_email, password_hash, is_verified = user # Desempaquetar todos los valores
+            proteccion_login.limpiar_fallos(email)
             
             if is_verified == 0: # is_verified es 0 (False) o 1 (True)
                 return jsonify({"error": "Cuenta no verificada. Por favor, verifica tu correo electrónico."}), 403
+
+            if contrasenas.necesita_rehash(password_hash):
+                rehash_password(user_id, password_hash, password)
             
             # Generar el token JWT de acceso
             access_token_payload = {
@@ -328,12 +375,38 @@ def login():
                 "refresh_token": refresh_token
             }), 200
         else:
+            # Los emails inexistentes también cuentan, para no revelar qué cuentas existen.
+            proteccion_login.registrar_fallo(email)
             return jsonify({"error": "Credenciales inválidas."}), 401
     except Exception as e:
         print(f"Error en /login: {str(e)}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
         return jsonify({"error": "Error interno del servidor al iniciar sesión."}), 500
 
+def rehash_password(user_id, password_hash_actual, password):
+    """
+    Regenera el hash de un usuario con el coste bcrypt actual tras un login correcto.
+    Solo se sobrescribe si el hash no cambió entretanto; cualquier fallo se registra
+    sin afectar al login (se reintentará en el siguiente).
+    """
+    cursor = None
+    try:
+        nuevo_hash = contrasenas.generar_hash(password)
+        cursor = mysql.connection.cursor()
+        cursor.execute(
+            "UPDATE users SET password_hash = %s WHERE id = %s AND password_hash = %s",
+            (nuevo_hash, user_id, password_hash_actual)
+        )
+        mysql.connection.commit()
+        print(f"INFO: /login -> Hash de contraseña actualizado al coste actual para UserID {user_id}.", file=sys.stderr)
+    except HashingSaturado:
+        print(f"DEBUG BACKEND: /login -> Pool saturado, se omite el rehash de UserID {user_id}.", file=sys.stderr)
+    except Exception as e:
+        print(f"ERROR: /login -> No se pudo actualizar el hash de UserID {user_id}: {e}", file=sys.stderr)
+    finally:
+        if cursor is not None:
+            cursor.close()
+
 @auth_bp.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True) # Este endpoint requiere un refresh token válido
 def refresh():
@@ -397,25 +470,20 @@ def forgot_password():
         cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
         user = cursor.fetchone()
         if user: # Solo procede si el usuario existe para evitar enumeración
-            # Generar CÓDIGO de restablecimiento y fecha de expiración
-            reset_code = generar_codigo_verificacion() # Usamos la función para generar código de 6 dígitos
-            expira = datetime.now() + timedelta(hours=1) # El código expira en 1 hora
-            expira_str = expira.strftime('%Y-%m-%d %H:%M:%S')
-
-            # Guardar el CÓDIGO de restablecimiento y su expiración en la base de datos
-            # Se sigue usando la columna 'reset_token' para almacenar este código de 6 dígitos.
-            cursor.execute("""
-                UPDATE users SET reset_token = %s, reset_token_expira = %s WHERE email = %s
-            """, (reset_code, expira_str, email))
+            # CÓDIGO de restablecimiento de 6 dígitos en Redis, con TTL de 1 hora (ver codigos.py).
+            # Emitir uno nuevo anula el anterior del mismo email.
+            try:
+                reset_code = codigos.emitir_codigo_reset(email)
+            except CodigosNoDisponibles:
+                return respuesta_codigos_no_disponibles('/forgot_password')
+
+            # El envío lo hace el worker de outbox.py
+            encolar_correo_restablecimiento(cursor, email, reset_code)
             mysql.connection.commit()
-            
-            # Restaurado el control de errores al enviar correo de restablecimiento
-            if not enviar_correo_restablecimiento(email, reset_code):
-                print(f"Advertencia: No se pudo enviar el correo de restablecimiento a {email}", file=sys.stderr)
-                # No se devuelve error al cliente por seguridad (evitar enumeración de usuarios)
         
         return jsonify({"message": "Si el correo existe, se ha enviado un código para restablecer la contraseña."}), 200
     except Exception as e:
+        mysql.connection.rollback()
         print(f"Error en /forgot_password: {str(e)}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
         return jsonify({"error": "Error interno del servidor."}), 500
@@ -442,24 +510,26 @@ def reset_password():
 
     cursor = mysql.connection.cursor()
     try:
-        # Buscar usuario por el CÓDIGO de restablecimiento (almacenado en 'reset_token')
-        cursor.execute("SELECT email, reset_token_expira FROM users WHERE reset_token = %s", (reset_code,))
-        user_info = cursor.fetchone()
-        if not user_info:
-            return jsonify({"error": "Código de restablecimiento inválido."}), 400
-
-        email, expira = user_info
-        if expira is None or datetime.now() > expira:
-            cursor.execute("UPDATE users SET reset_token = NULL, reset_token_expira = NULL WHERE email = %s", (email,))
-            mysql.connection.commit()
-            return jsonify({"error": "El código de restablecimiento ha expirado."}), 400
-
-        hashed_new_password = bcrypt.generate_password_hash(new_password).decode('utf-8')
-        cursor.execute("""
-            UPDATE users SET password_hash = %s, reset_token = NULL, reset_token_expira = NULL
-            WHERE email = %s
-        """, (hashed_new_password, email))
+        # Buscar el email por el CÓDIGO de restablecimiento: un GET en Redis, sin recorrer 'users'.
+        # Un código caducado ya no existe (TTL), así que se responde igual que a uno inválido.
+        try:
+            email = codigos.buscar_email_por_codigo_reset(reset_code, request.remote_addr)
+        except CodigosNoDisponibles:
+            return respuesta_codigos_no_disponibles('/reset_password')
+        except DemasiadosIntentos as e:
+            response = jsonify({"error": f"Demasiados códigos inválidos. Inténtalo de nuevo en {e.espera} segundos."})
+            response.headers['Retry-After'] = str(e.espera)
+            return response, 429
+        if not email:
+            return jsonify({"error": "Código de restablecimiento inválido o expirado."}), 400
+
+        try:
+            hashed_new_password = contrasenas.generar_hash(new_password)
+        except HashingSaturado:
+            return respuesta_saturado('/reset_password')
+        cursor.execute("UPDATE users SET password_hash = %s WHERE email = %s", (hashed_new_password, email))
         mysql.connection.commit()
+        codigos.anular_codigo_reset(reset_code, email)
         return jsonify({"message": "Contraseña restablecida exitosamente."}), 200
     except Exception as e:
         print(f"Error en /reset_password: {str(e)}", file=sys.stderr)
@@ -467,3 +537,27 @@ def reset_password():
         return jsonify({"error": "Error interno del servidor."}), 500
     finally:
         cursor.close()
+
+
+# --- Comandos de mantenimiento (flask --app app auth <comando>) ---
+
+@auth_bp.cli.command('procesar-correos')
+@click.option('--continuo', is_flag=True, help='Sigue procesando hasta interrumpirlo (Ctrl+C).')
+@click.option('--intervalo', default=5, show_default=True, help='Segundos de espera cuando no hay correos pendientes.')
+def procesar_correos(continuo, intervalo):
+    """Envía los correos pendientes de email_outbox con reintentos y backoff."""
+    try:
+        while True:
+            enviados, fallidos = procesar_pendientes()
+            if enviados or fallidos:
+                print(f"INFO: procesar-correos -> {enviados} enviados, {fallidos} con error.")
+            if not continuo:
+                break
+            if not enviados and not fallidos:
+                time.sleep(intervalo)
+    except KeyboardInterrupt:
+        print("INFO: procesar-correos -> Detenido.")
+    except Exception as e:
+        print(f"ERROR: procesar-correos -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise SystemExit(1)
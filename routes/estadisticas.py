@@ -0,0 +1,97 @@
+from flask import Blueprint, request, jsonify
+from extensions import mysql
+import clasificacion
+import estadisticas
+from estadisticas import EstadisticasNoDisponibles
+import sys
+import traceback
+
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+estadisticas_bp = Blueprint('estadisticas', __name__)
+
+def _respuesta_no_disponible(ruta):
+    print(f"ERROR: {ruta} -> Redis no disponible para las estadísticas.", file=sys.stderr)
+    return jsonify({"error": "Las estadísticas no están disponibles en este momento."}), 503
+
+def _puntaje_de_usuario(dificultad_id, user_id):
+    """Mejor puntaje del usuario: primero el ZSET de la clasificación, si no la fila de leaderboard."""
+    try:
+        posicion = clasificacion.obtener_posicion(dificultad_id, user_id)
+        if posicion is not None:
+            return posicion[1]
+    except Exception as e:
+        print(f"ERROR: /stats/yo -> No se pudo leer la clasificación en Redis: {e}", file=sys.stderr)
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT puntaje FROM leaderboard WHERE user_id = %s AND dificultad_id = %s",
+            (user_id, dificultad_id)
+        )
+        fila = cursor.fetchone()
+        return fila[0] if fila else None
+    finally:
+        cursor.close()
+
+@estadisticas_bp.route('/stats/<int:dificultad_id>', methods=['GET'])
+def estadisticas_dificultad(dificultad_id):
+    # Endpoint público: devuelve la instantánea precalculada; con ?puntaje=N añade su percentil.
+    puntaje = request.args.get('puntaje')
+    if puntaje is not None:
+        try:
+            puntaje = int(puntaje)
+        except ValueError:
+            return jsonify({"error": "El parámetro 'puntaje' debe ser un entero."}), 400
+    try:
+        instantanea = estadisticas.obtener_estadisticas(dificultad_id)
+        if instantanea is None:
+            return jsonify({"error": "Todavía no hay estadísticas para esta dificultad."}), 404
+        if puntaje is not None:
+            instantanea["puntaje"] = puntaje
+            instantanea["percentil"] = estadisticas.calcular_percentil(instantanea, puntaje)
+        return jsonify(instantanea), 200
+    except EstadisticasNoDisponibles:
+        return _respuesta_no_disponible('/stats')
+    except Exception as e:
+        print(f"ERROR: /stats/{dificultad_id} -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al obtener las estadísticas."}), 500
+
+@estadisticas_bp.route('/stats/<int:dificultad_id>/yo', methods=['GET'])
+@jwt_required()
+def mi_percentil(dificultad_id):
+    # Percentil del mejor puntaje del usuario autenticado en la dificultad.
+    current_user_id = int(get_jwt_identity())
+    try:
+        instantanea = estadisticas.obtener_estadisticas(dificultad_id)
+        if instantanea is None:
+            return jsonify({"error": "Todavía no hay estadísticas para esta dificultad."}), 404
+        puntaje = _puntaje_de_usuario(dificultad_id, current_user_id)
+        if puntaje is None:
+            return jsonify({"error": "Todavía no tienes puntaje en esta dificultad."}), 404
+        return jsonify({
+            "dificultad_id": dificultad_id,
+            "puntaje": puntaje,
+            "percentil": estadisticas.calcular_percentil(instantanea, puntaje),
+            "jugadores": instantanea["jugadores"],
+            "generado_at": instantanea["generado_at"]
+        }), 200
+    except EstadisticasNoDisponibles:
+        return _respuesta_no_disponible('/stats/yo')
+    except Exception as e:
+        print(f"ERROR: /stats/{dificultad_id}/yo -> Error para UserID {current_user_id}: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al obtener el percentil."}), 500
+
+# --- Comandos de mantenimiento (flask --app app estadisticas <comando>) ---
+
+@estadisticas_bp.cli.command('calcular-estadisticas')
+def calcular_estadisticas():
+    """Recalcula con NumPy la distribución de puntajes de cada dificultad (ejecutar periódicamente, p. ej. cada 10 min)."""
+    try:
+        for dificultad_id, jugadores in sorted(estadisticas.calcular_estadisticas().items()):
+            print(f"INFO: calcular-estadisticas -> Dificultad {dificultad_id}: {jugadores} jugadores.")
+    except Exception as e:
+        print(f"ERROR: calcular-estadisticas -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise SystemExit(1)
@@ -0,0 +1,242 @@
+from flask import Blueprint, request, jsonify
+from extensions import mysql
+from utils import obtener_limite
+import clasificacion
+from clasificacion import ClasificacionNoDisponible
+import sys
+import time
+import traceback
+import click
+
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+leaderboard_bp = Blueprint('leaderboard', __name__)
+
+LIMITE_TOP_POR_DEFECTO = 10
+LIMITE_TOP_MAXIMO = 100
+RADIO_VECINOS_POR_DEFECTO = 5
+RADIO_VECINOS_MAXIMO = 25
+# Un usuario eliminado sigue en el set hasta el siguiente volcado: se piden unas filas de más
+# para que, al omitirlo, la página siga teniendo 'limit' entradas.
+MARGEN_USUARIOS_ELIMINADOS = 10
+
+def _respuesta_no_disponible(ruta):
+    print(f"ERROR: {ruta} -> Redis no disponible para la clasificación.", file=sys.stderr)
+    return jsonify({"error": "La clasificación no está disponible en este momento."}), 503
+
+def _obtener_radio(valor, por_defecto):
+    """Convierte el parámetro 'radio' en un entero dentro de [0, RADIO_VECINOS_MAXIMO]."""
+    if valor is None or valor == '':
+        return por_defecto
+    radio = int(valor)
+    if radio < 0:
+        raise ValueError("El parámetro 'radio' debe ser un entero no negativo.")
+    return min(radio, RADIO_VECINOS_MAXIMO)
+
+def _obtener_usernames(user_ids):
+    """Retorna {user_id: username} con una búsqueda por clave primaria (sin ordenar nada)."""
+    if not user_ids:
+        return {}
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute(
+            f"SELECT id, username FROM users WHERE id IN ({', '.join(['%s'] * len(user_ids))})",
+            list(user_ids)
+        )
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
+
+def _numerar_entradas(posicion_inicial, pares, usernames, limite=None):
+    """
+    [(user_id, puntaje), ...] -> entradas con posición y username. Los usuarios eliminados (sin
+    username) se omiten ANTES de numerar, así que las posiciones son consecutivas, sin huecos.
+    """
+    existentes = [(user_id, puntaje) for user_id, puntaje in pares if user_id in usernames]
+    if limite is not None:
+        existentes = existentes[:limite]
+    return [
+        {"posicion": posicion_inicial + i, "user_id": user_id, "username": usernames[user_id], "puntaje": puntaje}
+        for i, (user_id, puntaje) in enumerate(existentes)
+    ]
+
+def _formatear_entradas(posicion_inicial, pares, limite=None):
+    return _numerar_entradas(posicion_inicial, pares, _obtener_usernames({user_id for user_id, _ in pares}), limite)
+
+def _formatear_vecinos(posicion, inicio, user_id, pares):
+    """
+    Como _formatear_entradas, pero numerando respecto a la posición del propio usuario, para que
+    sus vecinos queden en posicion - 1, posicion + 1... aunque se omita algún usuario eliminado.
+    Si el propio usuario está eliminado se numera desde 'inicio', la posición del primer vecino.
+    """
+    usernames = _obtener_usernames({vecino for vecino, _ in pares})
+    existentes = [vecino for vecino, _ in pares if vecino in usernames]
+    primera = posicion - existentes.index(user_id) if user_id in existentes else inicio
+    return _numerar_entradas(primera, pares, usernames)
+
+def _posicion_y_vecinos(dificultad_id, user_id, radio):
+    posicion = clasificacion.obtener_posicion(dificultad_id, user_id)
+    if posicion is None:
+        return None
+    vecinos = clasificacion.obtener_vecinos(dificultad_id, user_id, radio)
+    inicio, pares = vecinos if vecinos else (posicion[0], [])
+    return {
+        "dificultad_id": dificultad_id,
+        "user_id": user_id,
+        "posicion": posicion[0],
+        "puntaje": posicion[1],
+        "total": posicion[2],
+        "vecinos": _formatear_vecinos(posicion[0], inicio, user_id, pares)
+    }
+
+@leaderboard_bp.route('/leaderboard/<int:dificultad_id>', methods=['GET'])
+def top_clasificacion(dificultad_id):
+    # Endpoint público: ZREVRANGE sobre el set de la dificultad + usernames por clave primaria.
+    try:
+        limite = obtener_limite(request.args.get('limit'), LIMITE_TOP_POR_DEFECTO, LIMITE_TOP_MAXIMO)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        pares = clasificacion.obtener_top(dificultad_id, limite + MARGEN_USUARIOS_ELIMINADOS)
+        return jsonify({
+            "dificultad_id": dificultad_id,
+            "clasificacion": _formatear_entradas(1, pares, limite)
+        }), 200
+    except ClasificacionNoDisponible:
+        return _respuesta_no_disponible('/leaderboard')
+    except Exception as e:
+        print(f"ERROR: /leaderboard/{dificultad_id} -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al obtener la clasificación."}), 500
+
+@leaderboard_bp.route('/leaderboard/<int:dificultad_id>/<any(diaria, semanal, temporada):ventana>', methods=['GET'])
+def clasificacion_por_ventana(dificultad_id, ventana):
+    # ?periodo=2025-06-30 | 2025-W27 | 2025-T3. Sin periodo (o con el actual) se lee el ZSET en
+    # Redis; un periodo cerrado se lee de leaderboard_historico por clave primaria.
+    try:
+        limite = obtener_limite(request.args.get('limit'), LIMITE_TOP_POR_DEFECTO, LIMITE_TOP_MAXIMO)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    periodo_actual, cierre = clasificacion.periodo_actual(ventana)
+    periodo = request.args.get('periodo') or periodo_actual
+    if not clasificacion.periodo_valido(ventana, periodo):
+        return jsonify({"error": f"Periodo no válido para la clasificación {ventana}."}), 400
+
+    try:
+        entradas = None
+        if periodo != periodo_actual:
+            entradas = clasificacion.obtener_historico(dificultad_id, ventana, periodo, limite)
+        # Periodo actual, o uno recién cerrado que todavía no se ha archivado.
+        if not entradas:
+            try:
+                pares = clasificacion.obtener_top_ventana(dificultad_id, ventana, periodo, limite + MARGEN_USUARIOS_ELIMINADOS)
+                entradas = _formatear_entradas(1, pares, limite)
+            except ClasificacionNoDisponible:
+                if periodo == periodo_actual:
+                    raise
+                entradas = []
+        resultado = {
+            "dificultad_id": dificultad_id,
+            "ventana": ventana,
+            "periodo": periodo,
+            "clasificacion": entradas
+        }
+        if periodo == periodo_actual:
+            resultado["cierre"] = cierre.isoformat()
+        return jsonify(resultado), 200
+    except ClasificacionNoDisponible:
+        return _respuesta_no_disponible(f'/leaderboard/{ventana}')
+    except Exception as e:
+        print(f"ERROR: /leaderboard/{dificultad_id}/{ventana} -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al obtener la clasificación."}), 500
+
+@leaderboard_bp.route('/leaderboard/<int:dificultad_id>/usuarios/<int:user_id>', methods=['GET'])
+def posicion_usuario(dificultad_id, user_id):
+    # Posición del usuario y, con ?radio=N, los N jugadores por encima y por debajo.
+    try:
+        radio = _obtener_radio(request.args.get('radio'), 0)
+    except ValueError:
+        return jsonify({"error": "El parámetro 'radio' debe ser un entero no negativo."}), 400
+    try:
+        resultado = _posicion_y_vecinos(dificultad_id, user_id, radio)
+        if resultado is None:
+            return jsonify({"error": "El usuario no tiene puntaje en esta dificultad."}), 404
+        if not radio:
+            del resultado['vecinos']
+        return jsonify(resultado), 200
+    except ClasificacionNoDisponible:
+        return _respuesta_no_disponible('/leaderboard/usuarios')
+    except Exception as e:
+        print(f"ERROR: /leaderboard/{dificultad_id}/usuarios/{user_id} -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al obtener la posición."}), 500
+
+@leaderboard_bp.route('/leaderboard/<int:dificultad_id>/yo', methods=['GET'])
+@jwt_required()
+def mi_posicion(dificultad_id):
+    # Posición del usuario autenticado junto con los jugadores que tiene alrededor.
+    current_user_id = int(get_jwt_identity())
+    try:
+        radio = _obtener_radio(request.args.get('radio'), RADIO_VECINOS_POR_DEFECTO)
+    except ValueError:
+        return jsonify({"error": "El parámetro 'radio' debe ser un entero no negativo."}), 400
+    try:
+        resultado = _posicion_y_vecinos(dificultad_id, current_user_id, radio)
+        if resultado is None:
+            return jsonify({"error": "Todavía no tienes puntaje en esta dificultad."}), 404
+        return jsonify(resultado), 200
+    except ClasificacionNoDisponible:
+        return _respuesta_no_disponible('/leaderboard/yo')
+    except Exception as e:
+        print(f"ERROR: /leaderboard/{dificultad_id}/yo -> Error para UserID {current_user_id}: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al obtener la posición."}), 500
+
+# --- Comandos de mantenimiento (flask --app app leaderboard <comando>) ---
+
+@leaderboard_bp.cli.command('volcar-clasificacion')
+@click.option('--continuo', is_flag=True, help='Sigue volcando hasta interrumpirlo (Ctrl+C).')
+@click.option('--intervalo', default=5, show_default=True, help='Segundos de espera cuando no hay mejoras pendientes.')
+def volcar_clasificacion(continuo, intervalo):
+    """Escribe en la tabla leaderboard las mejoras de puntaje pendientes en Redis."""
+    try:
+        while True:
+            volcadas = clasificacion.volcar_pendientes()
+            if volcadas:
+                print(f"INFO: volcar-clasificacion -> {volcadas} puntajes guardados en MySQL.")
+            if not continuo:
+                break
+            if volcadas < clasificacion.TAMANO_LOTE_VOLCADO:
+                time.sleep(intervalo)
+    except KeyboardInterrupt:
+        print("INFO: volcar-clasificacion -> Detenido.")
+    except Exception as e:
+        print(f"ERROR: volcar-clasificacion -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise SystemExit(1)
+
+@leaderboard_bp.cli.command('reconstruir-clasificacion')
+def reconstruir_clasificacion():
+    """Carga los sorted sets de la clasificación desde la tabla leaderboard (arranque en frío)."""
+    try:
+        totales = clasificacion.reconstruir_clasificacion()
+        for dificultad_id, total in sorted(totales.items()):
+            print(f"INFO: reconstruir-clasificacion -> Dificultad {dificultad_id}: {total} usuarios cargados.")
+        if not totales:
+            print("INFO: reconstruir-clasificacion -> La tabla leaderboard está vacía.")
+    except Exception as e:
+        print(f"ERROR: reconstruir-clasificacion -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise SystemExit(1)
+
+@leaderboard_bp.cli.command('archivar-clasificaciones')
+def archivar_clasificaciones():
+    """Guarda en leaderboard_historico las clasificaciones diarias/semanales/de temporada ya cerradas (ejecutar cada hora)."""
+    try:
+        ventanas, filas = clasificacion.archivar_ventanas_cerradas()
+        print(f"INFO: archivar-clasificaciones -> {ventanas} ventanas cerradas archivadas ({filas} posiciones).")
+    except Exception as e:
+        print(f"ERROR: archivar-clasificaciones -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise SystemExit(1)
@@ -0,0 +1,265 @@
+from flask import Blueprint, request, jsonify
+from extensions import mysql
+from cache import invalidar_perfil
+import clasificacion
+import telemetria
+from telemetria import TelemetriaNoDisponible, TelemetriaSaturada
+import hashlib
+import json
+import re
+import sys
+import time
+import traceback
+import click
+
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+partidas_bp = Blueprint('partidas', __name__)
+
+# --- Límites de un envío ---
+MAX_RESULTADOS_POR_ENVIO = 20
+MAX_PUNTAJE = 2 ** 31 - 1           # Rango de la columna INT
+MAX_CONTADOR_POR_ENVIO = 100000     # Evita que un envío manipulado desborde los contadores
+PATRON_CLAVE_IDEMPOTENCIA = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+DIAS_RETENCION_ENVIOS = 7
+
+CONTADORES = (
+    'pergaminos_comunes',
+    'pergaminos_raros',
+    'pergaminos_epicos',
+    'pergaminos_legendarios',
+    'mobs_derrotados',
+)
+
+# Una fila por dificultad: el mejor puntaje se conserva con GREATEST y los contadores se suman.
+# Si el mismo envío repite una dificultad, MySQL aplica las filas en orden y también se acumulan.
+SQL_UPSERT_PARTIDAS = """
+    INSERT INTO partidas (
+        user_id, dificultad_id, puntaje_actual,
+        pergaminos_comunes, pergaminos_raros, pergaminos_epicos, pergaminos_legendarios, mobs_derrotados
+    )
+    VALUES {valores}
+    ON DUPLICATE KEY UPDATE
+        puntaje_actual = GREATEST(puntaje_actual, VALUES(puntaje_actual)),
+        pergaminos_comunes = pergaminos_comunes + VALUES(pergaminos_comunes),
+        pergaminos_raros = pergaminos_raros + VALUES(pergaminos_raros),
+        pergaminos_epicos = pergaminos_epicos + VALUES(pergaminos_epicos),
+        pergaminos_legendarios = pergaminos_legendarios + VALUES(pergaminos_legendarios),
+        mobs_derrotados = mobs_derrotados + VALUES(mobs_derrotados)
+"""
+
+def _entero(valor, nombre, maximo):
+    """Valida un entero no negativo (los booleanos de JSON no cuentan como enteros)."""
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor < 0 or valor > maximo:
+        raise ValueError(f"'{nombre}' debe ser un entero entre 0 y {maximo}.")
+    return valor
+
+def _validar_resultados(resultados):
+    """Retorna [(dificultad_id, puntaje, *contadores), ...] o lanza ValueError."""
+    if not isinstance(resultados, list) or not resultados:
+        raise ValueError("'resultados' debe ser una lista no vacía.")
+    if len(resultados) > MAX_RESULTADOS_POR_ENVIO:
+        raise ValueError(f"Como máximo se aceptan {MAX_RESULTADOS_POR_ENVIO} resultados por envío.")
+    filas = []
+    for resultado in resultados:
+        if not isinstance(resultado, dict) or 'dificultad_id' not in resultado:
+            raise ValueError("Cada resultado debe ser un objeto con 'dificultad_id'.")
+        filas.append((
+            _entero(resultado['dificultad_id'], 'dificultad_id', MAX_PUNTAJE),
+            _entero(resultado.get('puntaje', 0), 'puntaje', MAX_PUNTAJE),
+            *(_entero(resultado.get(contador, 0), contador, MAX_CONTADOR_POR_ENVIO) for contador in CONTADORES)
+        ))
+    return filas
+
+def _huella(filas):
+    """Resumen del contenido del envío: detecta una clave de idempotencia reutilizada con otros datos."""
+    return hashlib.sha256(json.dumps(filas, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+def _registrar_en_clasificacion(user_id, filas):
+    """
+    Tras el commit, propaga los puntajes a la clasificación en Redis (ver clasificacion.py).
+    Si Redis falla, el mejor puntaje se escribe directamente en la tabla leaderboard para no perderlo.
+    Solo cuentan los resultados con puntaje (> 0): un envío con solo contadores, o sin 'puntaje',
+    no debe dar de alta al usuario en la clasificación con 0 puntos.
+    """
+    puntajes = [(dificultad_id, puntaje) for dificultad_id, puntaje, *_ in filas if puntaje > 0]
+    if not puntajes:
+        return
+    try:
+        for dificultad_id, puntaje in puntajes:
+            clasificacion.registrar_puntaje(user_id, dificultad_id, puntaje)
+        return
+    except Exception as e:
+        print(f"ERROR: /partidas -> No se pudo actualizar la clasificación en Redis para UserID {user_id}: {e}. "
+              f"Escribiendo en leaderboard directamente.", file=sys.stderr)
+
+    cursor = mysql.connection.cursor()
+    try:
+        clasificacion.guardar_en_mysql(cursor, [(user_id, dificultad_id, puntaje) for dificultad_id, puntaje in puntajes])
+        mysql.connection.commit()
+        invalidar_perfil(user_id)
+    except Exception as e:
+        mysql.connection.rollback()
+        print(f"ERROR: /partidas -> Fallo al escribir leaderboard para UserID {user_id}: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+    finally:
+        cursor.close()
+
+@partidas_bp.route('/partidas', methods=['POST'])
+@jwt_required()
+def registrar_partidas():
+    """
+    Registra los resultados de una sesión de juego en un solo viaje:
+        Idempotency-Key: <clave única por sesión, 8-64 caracteres [A-Za-z0-9_-]>
+        {"resultados": [{"dificultad_id": 1, "puntaje": 1200, "pergaminos_comunes": 2, ..., "mobs_derrotados": 35}]}
+    Reintentar con la misma clave no vuelve a sumar los contadores.
+    """
+    current_user_id = int(get_jwt_identity())
+
+    clave = request.headers.get('Idempotency-Key', '')
+    if not PATRON_CLAVE_IDEMPOTENCIA.match(clave):
+        return jsonify({"error": "Falta la cabecera Idempotency-Key o no es válida (8-64 caracteres A-Z, a-z, 0-9, '_' o '-')."}), 400
+
+    data = request.get_json(silent=True) or {}
+    try:
+        filas = _validar_resultados(data.get('resultados'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    huella = _huella(filas)
+    respuesta = {"mensaje": "Resultados registrados.", "procesados": len(filas)}
+
+    cursor = mysql.connection.cursor()
+    try:
+        # La clave se registra en la misma transacción que los resultados: o se aplican ambos o
+        # ninguno. Un reintento concurrente con la misma clave espera al bloqueo de la fila y,
+        # tras el commit del primero, INSERT IGNORE no inserta nada (rowcount 0).
+        cursor.execute(
+            "INSERT IGNORE INTO partidas_envios (user_id, clave, huella) VALUES (%s, %s, %s)",
+            (current_user_id, clave, huella)
+        )
+        if cursor.rowcount == 0:
+            mysql.connection.rollback()
+            cursor.execute(
+                "SELECT huella FROM partidas_envios WHERE user_id = %s AND clave = %s",
+                (current_user_id, clave)
+            )
+            fila = cursor.fetchone()
+            if fila and fila[0] != huella:
+                return jsonify({"error": "La Idempotency-Key ya se usó con otros resultados."}), 422
+            print(f"DEBUG BACKEND: /partidas -> Reintento de UserID {current_user_id} con clave ya aplicada; se ignora.", file=sys.stderr)
+            response = jsonify(respuesta)
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response, 200
+
+        cursor.execute(
+            SQL_UPSERT_PARTIDAS.format(valores=", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(filas))),
+            [valor for fila in filas for valor in (current_user_id, *fila)]
+        )
+        mysql.connection.commit()
+    except Exception as e:
+        mysql.connection.rollback()
+        # 1452: clave foránea inexistente (dificultad_id que no está en 'dificultades').
+        if getattr(e, 'args', None) and e.args[0] == 1452:
+            return jsonify({"error": "Alguna de las dificultades indicadas no existe."}), 400
+        print(f"ERROR: /partidas -> Error para UserID {current_user_id}: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al registrar los resultados."}), 500
+    finally:
+        cursor.close()
+
+    _registrar_en_clasificacion(current_user_id, filas)
+    print(f"DEBUG BACKEND: /partidas -> {len(filas)} resultados registrados para UserID {current_user_id}.", file=sys.stderr)
+    return jsonify(respuesta), 200
+
+@partidas_bp.route('/partidas/eventos', methods=['POST'])
+@jwt_required()
+def ingerir_eventos():
+    """
+    Ingesta de eventos de juego de alta frecuencia; se aplican a 'partidas' de forma diferida
+    (ver telemetria.py):
+        {"eventos": [{"tipo": "mob_derrotado", "dificultad_id": 1, "cantidad": 1}, ...]}
+    """
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+    try:
+        por_dificultad, total = telemetria.agrupar_eventos(data.get('eventos'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        telemetria.encolar_eventos(current_user_id, por_dificultad)
+    except TelemetriaSaturada:
+        print("ERROR: /partidas/eventos -> Stream de telemetría saturado. Devolviendo 503.", file=sys.stderr)
+        response = jsonify({"error": "El servidor está ocupado. Inténtalo de nuevo en unos segundos."})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    except TelemetriaNoDisponible:
+        print("ERROR: /partidas/eventos -> Redis no disponible para la telemetría.", file=sys.stderr)
+        return jsonify({"error": "Servicio temporalmente no disponible. Inténtalo de nuevo más tarde."}), 503
+    except Exception as e:
+        print(f"ERROR: /partidas/eventos -> Error para UserID {current_user_id}: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al registrar los eventos."}), 500
+    # 202: los eventos están almacenados, pero los contadores se actualizan en el próximo volcado.
+    return jsonify({"mensaje": "Eventos aceptados.", "aceptados": total}), 202
+
+# --- Comandos de mantenimiento (flask --app app partidas <comando>) ---
+
+@partidas_bp.cli.command('volcar-telemetria')
+@click.option('--continuo', is_flag=True, help='Sigue volcando hasta interrumpirlo (Ctrl+C).')
+@click.option('--intervalo', default=5, show_default=True, help='Segundos entre volcados cuando el stream está al día.')
+def volcar_telemetria(continuo, intervalo):
+    """Aplica a la tabla partidas los eventos acumulados en el stream de telemetría."""
+    try:
+        while True:
+            entradas, filas, retraso_ms = telemetria.volcar_eventos()
+            if entradas:
+                print(f"INFO: volcar-telemetria -> {entradas} entradas aplicadas en {filas} filas (retraso {retraso_ms} ms).")
+            if not continuo:
+                break
+            # Con el stream al día se espera el intervalo completo: el ritmo de escritura en
+            # MySQL queda acotado a un upsert por intervalo. Si hay atraso se sigue sin esperar.
+            if entradas < telemetria.TAMANO_LOTE_VOLCADO:
+                time.sleep(intervalo)
+    except KeyboardInterrupt:
+        print("INFO: volcar-telemetria -> Detenido.")
+    except Exception as e:
+        print(f"ERROR: volcar-telemetria -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise SystemExit(1)
+
+@partidas_bp.cli.command('estado-telemetria')
+def estado_telemetria():
+    """Muestra las métricas del buffer de telemetría (pendientes y retraso del volcado)."""
+    try:
+        for clave, valor in sorted(telemetria.obtener_metricas().items()):
+            print(f"INFO: estado-telemetria -> {clave}: {valor}")
+    except Exception as e:
+        print(f"ERROR: estado-telemetria -> Error: {e}", file=sys.stderr)
+        raise SystemExit(1)
+
+@partidas_bp.cli.command('limpiar-envios')
+@click.option('--dias', default=DIAS_RETENCION_ENVIOS, show_default=True, help='Antigüedad a partir de la cual se olvidan las claves de idempotencia.')
+def limpiar_envios(dias):
+    """Borra las claves de idempotencia antiguas de partidas_envios por lotes."""
+    cursor = mysql.connection.cursor()
+    try:
+        total = 0
+        while True:
+            cursor.execute(
+                "DELETE FROM partidas_envios WHERE created_at < NOW() - INTERVAL %s DAY LIMIT 5000",
+                (dias,)
+            )
+            borradas = cursor.rowcount
+            mysql.connection.commit()
+            total += borradas
+            if borradas < 5000:
+                break
+        print(f"INFO: limpiar-envios -> {total} claves de idempotencia eliminadas.")
+    except Exception as e:
+        mysql.connection.rollback()
+        print(f"ERROR: limpiar-envios -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise SystemExit(1)
+    finally:
+        cursor.close()
@@ -1,12 +1,26 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
 from extensions import mysql
-from MySQLdb.cursors import DictCursor
+from MySQLdb.cursors import DictCursor, SSDictCursor
 from werkzeug.utils import secure_filename
 import os
 import sys
 import traceback
 from datetime import datetime
 import shutil # Importar shutil para eliminar directorios
+import re
+import hashlib
+from markupsafe import escape
+from utils import codificar_cursor, decodificar_cursor, obtener_limite, recortar_pagina
+from cache import (
+    RECURSO_FEED, TTL_FEED_SECONDS, TTL_COMENTARIOS_SECONDS, TTL_PUBLICACION_SECONDS,
+    recurso_comentarios, recurso_perfil, recurso_publicacion,
+    obtener_perfil_cacheado, guardar_perfil_cacheado, invalidar_perfil,
+    obtener_version, obtener_versiones, incrementar_version, clave_cache, obtener_cache, guardar_cache,
+    obtener_cache_multiple, guardar_cache_multiple, generar_etag
+)
+import tendencias
+import eventos
+from compresion import variantes_etag, marcar_precomprimible
 
 # Importar funciones de Flask-JWT-Extended
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
@@ -28,6 +42,54 @@ def get_user_details(user_id):
     finally:
         cursor.close()
 
+def _recursos_con_autor(cursor, user_id):
+    """Recursos cacheados cuyo cuerpo incluye el username del usuario: sus publicaciones y las listas de comentarios en que participa."""
+    cursor.execute("SELECT id FROM publicaciones WHERE autor_id = %s", (user_id,))
+    recursos = [recurso_publicacion(fila[0]) for fila in cursor.fetchall()]
+    cursor.execute("SELECT DISTINCT publicacion_id FROM comentarios WHERE autor_id = %s", (user_id,))
+    recursos.extend(recurso_comentarios(fila[0]) for fila in cursor.fetchall())
+    return recursos
+
+# Agregado del perfil en una sola consulta: fila del usuario + puntajes + nombre de la dificultad.
+# Con LEFT JOIN, un usuario sin puntajes devuelve una única fila con dificultad_id NULL.
+SQL_PERFIL_AGREGADO = """
+    SELECT
+        u.username,
+        u.email,
+        u.DescripUsuario,
+        u.foto_perfil,
+        l.dificultad_id,
+        d.nombre AS dificultad,
+        l.puntaje
+    FROM users u
+    LEFT JOIN leaderboard l ON l.user_id = u.id
+    LEFT JOIN dificultades d ON d.id = l.dificultad_id
+    WHERE u.id = %s
+    ORDER BY l.dificultad_id
+"""
+
+def _construir_perfil(user_id):
+    """Retorna el cuerpo JSON serializado del perfil, o None si el usuario no existe."""
+    cursor = mysql.connection.cursor(DictCursor)
+    try:
+        cursor.execute(SQL_PERFIL_AGREGADO, (user_id,))
+        filas = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not filas:
+        return None
+    usuario = filas[0]
+    return current_app.json.dumps({
+        "username": usuario['username'],
+        "email": usuario['email'],
+        "descripcion": usuario['DescripUsuario'],
+        "foto_perfil": usuario['foto_perfil'],
+        "puntajes": [
+            {"dificultad_id": fila['dificultad_id'], "dificultad": fila['dificultad'], "puntaje": fila['puntaje']}
+            for fila in filas if fila['dificultad_id'] is not None
+        ]
+    })
+
 # --- Rutas protegidas (ahora usando @jwt_required) ---
 
 @user_bp.route('/logeado', methods=['GET'])
@@ -69,36 +131,37 @@ def logeado():
 def perfil():
     try:
         current_user_id = get_jwt_identity() # Obtiene la identidad (user_id) del token
+
+        if request.method == 'GET':
+            # Camino habitual: un único HMGET en Redis (cuerpo + ETag), sin consultar MySQL.
+            cuerpo, etag = obtener_perfil_cacheado(current_user_id)
+            if cuerpo is not None:
+                return _no_modificado(etag, privado=True) or _respuesta_json(cuerpo, etag=etag, privado=True)
+
+            # Sin caché: la versión se lee ANTES de consultar MySQL para que una escritura
+            # concurrente impida guardar un agregado desactualizado (ver cache.py).
+            version = obtener_version(recurso_perfil(current_user_id))
+            etag = generar_etag(recurso_perfil(current_user_id), version)
+            no_modificado = _no_modificado(etag, privado=True)
+            if no_modificado:
+                return no_modificado
+
+            cuerpo = _construir_perfil(current_user_id)
+            if cuerpo is None:
+                print(f"ERROR: /perfil -> Usuario {current_user_id} no encontrado en DB.", file=sys.stderr)
+                return jsonify({"error": "Usuario no encontrado en la base de datos."}), 404
+            guardar_perfil_cacheado(current_user_id, version, etag, cuerpo)
+            print(f"DEBUG BACKEND: /perfil -> Perfil para UserID {current_user_id} cargado desde MySQL.", file=sys.stderr)
+            return _respuesta_json(cuerpo, etag=etag, privado=True)
+
         user_details_from_db = get_user_details(current_user_id)
         if not user_details_from_db:
             print(f"ERROR: /perfil -> Usuario {current_user_id} no encontrado en DB.", file=sys.stderr)
             return jsonify({"error": "Usuario no encontrado en la base de datos."}), 404
 
-        username_from_db = user_details_from_db.get('username')
-        email_from_db = user_details_from_db.get('email')
-        descripcion = user_details_from_db.get('DescripUsuario')
-        foto_perfil = user_details_from_db.get('foto_perfil')
-
         cursor = mysql.connection.cursor()
         try:
-            if request.method == 'GET':
-                cursor.execute("SELECT dificultad_id, puntaje FROM leaderboard WHERE user_id = %s", (current_user_id,))
-                puntajes_raw = cursor.fetchall()
-
-                puntajes_formateados = []
-                for p in puntajes_raw:
-                    puntajes_formateados.append({"dificultad_id": p[0], "puntaje": p[1]})
-                
-                print(f"DEBUG BACKEND: /perfil -> Perfil para UserID {current_user_id} cargado.", file=sys.stderr)
-                return jsonify({
-                    "username": username_from_db,
-                    "email": email_from_db,
-                    "descripcion": descripcion,  
-                    "foto_perfil": foto_perfil,  
-                    "puntajes": puntajes_formateados
-                }), 200
-
-            elif request.method == 'PUT':
+            if request.method == 'PUT':
                 data = request.get_json()
                 nueva_descripcion = data.get("descripcion")
                 nuevo_username = data.get("username")
@@ -113,6 +176,12 @@ def perfil():
 
                 cursor.execute("UPDATE users SET DescripUsuario = %s, username = %s WHERE id = %s", (nueva_descripcion, nuevo_username, current_user_id))
                 mysql.connection.commit()
+                # El username aparece como 'author' en el feed, en cada publicación cacheada y en las
+                # listas de comentarios, así que también se invalidan las que lo contienen.
+                recursos = [RECURSO_FEED]
+                if nuevo_username != user_details_from_db['username']:
+                    recursos.extend(_recursos_con_autor(cursor, current_user_id))
+                invalidar_perfil(current_user_id, *recursos)
                 print(f"DEBUG BACKEND: /perfil -> Perfil para UserID {current_user_id} actualizado. Nuevo username: {nuevo_username}.", file=sys.stderr)
                 return jsonify({
                     "message": "Perfil actualizado correctamente. Para que el nuevo nombre de usuario se refleje completamente en la aplicación, por favor, cierre sesión y vuelva a iniciarla.",
@@ -141,45 +210,406 @@ def perfil():
         return jsonify({"error": "Error interno del servidor al procesar el perfil."}), 500
 
 
+def _respuesta_json(cuerpo, status=200, etag=None, privado=False):
+    """Construye una respuesta a partir de un cuerpo JSON ya serializado (p. ej. leído de la caché)."""
+    response = current_app.response_class(cuerpo, status=status, mimetype='application/json')
+    return _con_etag(response, etag, privado)
+
+def _con_etag(response, etag, privado=False):
+    """Añade el ETag y obliga al cliente a revalidar (If-None-Match) antes de reutilizar su copia."""
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache' if privado else 'no-cache'
+    return response
+
+def _no_modificado(etag, privado=False):
+    """
+    Retorna una respuesta 304 si el If-None-Match del cliente coincide con el ETag actual,
+    o None si hay que generar la respuesta completa.
+    """
+    if not etag:
+        return None
+    # El cliente puede tener la variante comprimida del ETag (ver compresion.py).
+    for variante in variantes_etag(etag):
+        if request.if_none_match.contains_weak(variante):
+            return _con_etag(current_app.response_class(status=304), variante, privado)
+    return None
+
+# Longitud máxima (en caracteres) del extracto precalculado de cada publicación.
+LONGITUD_EXTRACTO = 200
+
+# Número de filas que se leen del cursor del servidor y se escriben por cada fragmento del stream.
+FILAS_POR_FRAGMENTO_STREAM = 100
+
+def _respuesta_json_en_streaming(consulta, parametros, formatear, etag=None, descripcion=''):
+    """
+    Ejecuta la consulta con un cursor no bufferizado (SSDictCursor) y devuelve una respuesta
+    que escribe el array JSON a medida que se leen las filas, sin materializar la lista completa.
+    La consulta se ejecuta antes de crear el generador para que los errores de SQL produzcan
+    un 500 normal en lugar de un cuerpo truncado.
+    """
+    cursor = mysql.connection.cursor(SSDictCursor)
+    try:
+        cursor.execute(consulta, parametros)
+    except Exception:
+        cursor.close()
+        raise
+
+    def generar():
+        total = 0
+        try:
+            yield '['
+            while True:
+                filas = cursor.fetchmany(FILAS_POR_FRAGMENTO_STREAM)
+                if not filas:
+                    break
+                fragmento = ','.join(current_app.json.dumps(formatear(fila)) for fila in filas)
+                yield (',' if total else '') + fragmento
+                total += len(filas)
+            yield ']'
+            print(f"DEBUG BACKEND: {descripcion} -> {total} elementos enviados en streaming.", file=sys.stderr)
+        except Exception as e:
+            # Los encabezados ya se enviaron: solo se puede registrar el error y cortar el cuerpo.
+            print(f"ERROR: {descripcion} -> Error durante el streaming: {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+        finally:
+            cursor.close()
+
+    response = current_app.response_class(stream_with_context(generar()), mimetype='application/json')
+    return _con_etag(response, etag)
+
+def _formatear_comentario(comentario):
+    if isinstance(comentario['created_at'], datetime):
+        comentario['created_at'] = comentario['created_at'].isoformat()
+    return comentario
+
+def _formatear_resumen(pub):
+    pub['created_at'] = pub['created_at'].isoformat() if pub['created_at'] else None
+    return pub
+
+def _generar_extracto(texto):
+    """
+    Genera el extracto que se guarda junto a la publicación para la vista resumida del feed.
+    Corta en el último espacio antes de LONGITUD_EXTRACTO para no partir palabras.
+    """
+    texto = ' '.join(texto.split())
+    if len(texto) <= LONGITUD_EXTRACTO:
+        return texto
+    corte = texto.rfind(' ', 0, LONGITUD_EXTRACTO)
+    if corte <= 0:
+        corte = LONGITUD_EXTRACTO
+    return texto[:corte].rstrip() + '…'
+
+def _formatear_publicacion(pub):
+    """
+    Convierte una fila de publicación (DictCursor) al formato JSON que espera el frontend.
+    Separa la lista concatenada de imágenes en imagen principal e imágenes adicionales.
+    """
+    pub['created_at'] = pub['created_at'].isoformat() if pub['created_at'] else None
+
+    all_urls_str = pub.pop('all_image_urls')
+    if all_urls_str:
+        all_urls = [url for url in all_urls_str.split(',') if url]
+        pub['imageUrl'] = all_urls[0] if all_urls else None
+        pub['imagenes_adicionales_urls'] = all_urls[1:] if len(all_urls) > 1 else []
+    else:
+        pub['imageUrl'] = None
+        pub['imagenes_adicionales_urls'] = []
+    return pub
+
+SQL_FEED_COMPLETO = """
+    SELECT
+        p.id,
+        p.autor_id,
+        u.username AS author,
+        p.titulo AS title,
+        p.texto AS content,
+        p.created_at,
+        p.cantidad_comentarios,
+        GROUP_CONCAT(ip.url ORDER BY ip.orden ASC) AS all_image_urls
+    FROM publicaciones p
+    JOIN users u ON p.autor_id = u.id
+    LEFT JOIN imagenes_publicacion ip ON p.id = ip.publicacion_id
+    GROUP BY p.id, p.autor_id, u.username, p.titulo, p.texto, p.created_at, p.cantidad_comentarios
+    ORDER BY p.created_at DESC, p.id DESC
+"""
+
+# Proyección resumida del feed (?view=summary): no lee la columna TEXT 'texto' ni las imágenes
+# adicionales; usa el extracto, la imagen principal y el contador de imágenes mantenidos al escribir.
+SQL_FEED_RESUMEN = """
+    SELECT
+        p.id,
+        p.autor_id,
+        u.username AS author,
+        p.titulo AS title,
+        p.extracto,
+        p.imageUrl,
+        p.cantidad_imagenes,
+        p.cantidad_comentarios,
+        p.created_at
+    FROM publicaciones p
+    JOIN users u ON p.autor_id = u.id
+    {filtro_posicion}
+    ORDER BY p.created_at DESC, p.id DESC
+    {limite}
+"""
+
+SQL_PUBLICACIONES_POR_IDS = """
+    SELECT
+        p.id,
+        p.autor_id,
+        u.username AS author,
+        p.titulo AS title,
+        p.texto AS content,
+        p.created_at,
+        p.cantidad_comentarios,
+        GROUP_CONCAT(ip.url ORDER BY ip.orden ASC) AS all_image_urls
+    FROM publicaciones p
+    JOIN users u ON p.autor_id = u.id
+    LEFT JOIN imagenes_publicacion ip ON p.id = ip.publicacion_id
+    WHERE p.id IN ({marcadores})
+    GROUP BY p.id, p.autor_id, u.username, p.titulo, p.texto, p.created_at, p.cantidad_comentarios
+"""
+
+MAX_IDS_POR_CONSULTA = 50
+
+def _obtener_publicaciones_por_ids(ids):
+    """
+    Retorna {id: publicación serializada en JSON} para los ids que existen.
+    Primero lee la caché por publicación (un MGET de versiones y otro de entradas) y resuelve
+    los ids restantes con una sola consulta IN; los ids inexistentes no aparecen en el resultado.
+    """
+    ids = list(dict.fromkeys(ids))
+    versiones = obtener_versiones([recurso_publicacion(i) for i in ids]) or [None] * len(ids)
+    claves = {
+        i: clave_cache(recurso_publicacion(i), version, "full")
+        for i, version in zip(ids, versiones) if version is not None
+    }
+    encontrados = {}
+    for i, cuerpo in zip(claves.keys(), obtener_cache_multiple(list(claves.values()))):
+        if cuerpo is not None:
+            encontrados[i] = cuerpo
+
+    faltantes = [i for i in ids if i not in encontrados]
+    if faltantes:
+        cursor = mysql.connection.cursor(DictCursor)
+        try:
+            marcadores = ', '.join(['%s'] * len(faltantes))
+            cursor.execute(SQL_PUBLICACIONES_POR_IDS.format(marcadores=marcadores), faltantes)
+            nuevos = {fila['id']: current_app.json.dumps(_formatear_publicacion(fila)) for fila in cursor.fetchall()}
+        finally:
+            cursor.close()
+        encontrados.update(nuevos)
+        guardar_cache_multiple({claves[i]: cuerpo for i, cuerpo in nuevos.items() if i in claves}, TTL_PUBLICACION_SECONDS)
+
+    print(f"DEBUG BACKEND: _obtener_publicaciones_por_ids -> {len(ids)} pedidas, {len(ids) - len(faltantes)} desde caché.", file=sys.stderr)
+    return encontrados
+
+def _multiget_publicaciones(ids_param):
+    """GET /publicaciones?ids=1,2,3 -> array alineado con los ids pedidos, con null para los inexistentes."""
+    try:
+        ids = [int(valor) for valor in ids_param.split(',') if valor.strip()]
+    except ValueError:
+        return jsonify({"error": "El parámetro 'ids' debe ser una lista de enteros separados por comas."}), 400
+    if not ids or len(ids) > MAX_IDS_POR_CONSULTA:
+        return jsonify({"error": f"El parámetro 'ids' debe contener entre 1 y {MAX_IDS_POR_CONSULTA} ids."}), 400
+
+    try:
+        encontrados = _obtener_publicaciones_por_ids(ids)
+        return _respuesta_json('[' + ','.join(encontrados.get(i, 'null') for i in ids) + ']')
+    except Exception as e:
+        print(f"ERROR: /publicaciones?ids -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al obtener publicaciones."}), 500
+
+@user_bp.route('/publicaciones/<int:publicacion_id>', methods=['GET'])
+def get_publicacion(publicacion_id):
+    # Detalle público de una publicación, servido desde la caché por publicación cuando está caliente.
+    try:
+        cuerpo = _obtener_publicaciones_por_ids([publicacion_id]).get(publicacion_id)
+        if cuerpo is None:
+            return jsonify({"error": "Publicación no encontrada."}), 404
+        return _respuesta_json(cuerpo)
+    except Exception as e:
+        print(f"ERROR: /publicaciones/<id> -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al obtener la publicación."}), 500
+
+# Comentarios más recientes por publicación para ?embed_comments=N, en una sola consulta con ventana.
+SQL_COMENTARIOS_RECIENTES = """
+    SELECT id, publicacion_id, autor_id, author, text, created_at
+    FROM (
+        SELECT
+            c.id,
+            c.publicacion_id,
+            c.autor_id,
+            u.username AS author,
+            c.texto AS text,
+            c.created_at,
+            ROW_NUMBER() OVER (PARTITION BY c.publicacion_id ORDER BY c.created_at DESC, c.id DESC) AS fila
+        FROM comentarios c
+        JOIN users u ON c.autor_id = u.id
+        WHERE c.publicacion_id IN ({marcadores})
+    ) recientes
+    WHERE fila <= %s
+    ORDER BY publicacion_id, fila
+"""
+
+MAX_COMENTARIOS_EMBEBIDOS = 10
+
+def _adjuntar_comentarios_recientes(cursor, publicaciones, cantidad):
+    """Añade 'comentarios_recientes' (los N más nuevos) a cada publicación de la página."""
+    if not publicaciones:
+        return
+    ids = [pub['id'] for pub in publicaciones]
+    marcadores = ', '.join(['%s'] * len(ids))
+    cursor.execute(SQL_COMENTARIOS_RECIENTES.format(marcadores=marcadores), ids + [cantidad])
+
+    por_publicacion = {}
+    for comentario in cursor.fetchall():
+        publicacion_id = comentario.pop('publicacion_id')
+        por_publicacion.setdefault(publicacion_id, []).append(_formatear_comentario(comentario))
+    for pub in publicaciones:
+        pub['comentarios_recientes'] = por_publicacion.get(pub['id'], [])
+
 @user_bp.route('/publicaciones', methods=['GET'])
 def publicaciones():
     # Este endpoint es público, no requiere autenticación JWT.
-    cursor = mysql.connection.cursor(DictCursor)
+    # Por defecto devuelve una página (?limit=&cursor=) ordenada por (created_at, id) DESC.
+    # El listado completo sin paginar solo se devuelve con ?all=1.
+    # Con ?stream=1 el listado completo se escribe en streaming desde un cursor del servidor.
+    # Con ?view=summary se devuelve la proyección resumida (sin el cuerpo completo).
+    # Con ?ids=1,2,3 se devuelven solo esas publicaciones (ver _multiget_publicaciones).
+    ids_param = request.args.get('ids')
+    if ids_param is not None:
+        return _multiget_publicaciones(ids_param)
+
+    transmitir = request.args.get('stream', '').lower() in ('1', 'true')
+    listado_completo = transmitir or request.args.get('all', '').lower() in ('1', 'true')
+    cursor_param = request.args.get('cursor')
+    vista = request.args.get('view', 'full')
+    if vista not in ('full', 'summary'):
+        return jsonify({"error": "El parámetro 'view' debe ser 'full' o 'summary'."}), 400
+    resumen = vista == 'summary'
+    formatear = _formatear_resumen if resumen else _formatear_publicacion
+
+    # Con ?embed_comments=N cada publicación de la página incluye sus N comentarios más recientes.
     try:
-        cursor.execute("""
-            SELECT
-                p.id,
-                p.autor_id,
-                u.username AS author,
-                p.titulo AS title,
-                p.texto AS content,
-                p.created_at,
-                GROUP_CONCAT(ip.url ORDER BY ip.orden ASC) AS all_image_urls
-            FROM publicaciones p
-            JOIN users u ON p.autor_id = u.id
-            LEFT JOIN imagenes_publicacion ip ON p.id = ip.publicacion_id
-            GROUP BY p.id, p.autor_id, u.username, p.titulo, p.texto, p.created_at
-            ORDER BY p.created_at DESC
-        """)
-        publicaciones = cursor.fetchall()
+        comentarios_embebidos = int(request.args.get('embed_comments', 0))
+        if comentarios_embebidos < 0 or comentarios_embebidos > MAX_COMENTARIOS_EMBEBIDOS:
+            raise ValueError(comentarios_embebidos)
+    except ValueError:
+        return jsonify({"error": f"El parámetro 'embed_comments' debe estar entre 0 y {MAX_COMENTARIOS_EMBEBIDOS}."}), 400
+    if comentarios_embebidos and listado_completo:
+        return jsonify({"error": "El parámetro 'embed_comments' solo está disponible en el modo paginado."}), 400
 
-        for pub in publicaciones:
-            cursor.execute("SELECT COUNT(*) AS cantidad FROM comentarios WHERE publicacion_id = %s", (pub['id'],))
-            pub['cantidad_comentarios'] = cursor.fetchone()['cantidad']
+    try:
+        limite = obtener_limite(request.args.get('limit'))
+        posicion = decodificar_cursor(cursor_param) if cursor_param else None
+    except ValueError as e:
+        print(f"DEBUG BACKEND: /publicaciones -> Parámetros de paginación inválidos: {e}", file=sys.stderr)
+        return jsonify({"error": "Parámetros de paginación inválidos (limit o cursor)."}), 400
+
+    # Caché de páginas del feed: la clave incluye la versión del feed, que las escrituras incrementan.
+    version_feed = obtener_version(RECURSO_FEED)
+    if transmitir:
+        variante = f"{vista}:stream"
+    elif listado_completo:
+        variante = f"{vista}:all"
+    else:
+        # La variante usa el cursor recodificado, no el recibido: decodificar_cursor tolera relleno
+        # y caracteres sobrantes, y un cursor no canónico no debe crear otra entrada de caché
+        # (ni llegar al ETag, que no admite comillas).
+        variante = f"{vista}:{limite}:{comentarios_embebidos}:{codificar_cursor(*posicion) if posicion else ''}"
+    clave = clave_cache(RECURSO_FEED, version_feed, variante) if version_feed else None
+    etag = generar_etag(RECURSO_FEED, version_feed, variante)
+    no_modificado = _no_modificado(etag)
+    if no_modificado:
+        return no_modificado
+
+    if transmitir:
+        try:
+            consulta = SQL_FEED_RESUMEN.format(filtro_posicion="", limite="") if resumen else SQL_FEED_COMPLETO
+            return _respuesta_json_en_streaming(consulta, (), formatear, etag, '/publicaciones')
+        except Exception as e:
+            print(f"ERROR: /publicaciones -> Error al iniciar el streaming: {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            return jsonify({"error": "Error interno del servidor al obtener publicaciones."}), 500
+
+    cuerpo_cache = obtener_cache(clave)
+    if cuerpo_cache is not None:
+        print(f"DEBUG BACKEND: /publicaciones -> Página servida desde caché ({variante}).", file=sys.stderr)
+        # Las páginas cacheadas son inmutables (clave versionada): se comprimen una sola vez por proceso.
+        marcar_precomprimible(clave)
+        return _respuesta_json(cuerpo_cache, etag=etag)
 
-            pub['created_at'] = pub['created_at'].isoformat() if pub['created_at'] else None
+    cursor = mysql.connection.cursor(DictCursor)
+    try:
+        if listado_completo:
+            cursor.execute(SQL_FEED_RESUMEN.format(filtro_posicion="", limite="") if resumen else SQL_FEED_COMPLETO)
+        elif resumen:
+            filtro_posicion = ""
+            parametros = []
+            if posicion:
+                filtro_posicion = "WHERE (p.created_at, p.id) < (%s, %s)"
+                parametros = [posicion[0], posicion[1]]
+            parametros.append(limite + 1)
+            cursor.execute(SQL_FEED_RESUMEN.format(filtro_posicion=filtro_posicion, limite="LIMIT %s"), parametros)
+        else:
+            # Búsqueda por posición (keyset): la subconsulta recorre el índice (created_at, id)
+            # y solo lee limite + 1 filas, sin importar el tamaño de la tabla.
+            # La fila extra indica si existe una página siguiente. La comparación de filas
+            # (created_at, id) < (...) se resuelve como un único rango sobre ese índice.
+            filtro_posicion = ""
+            parametros = []
+            if posicion:
+                filtro_posicion = "WHERE (created_at, id) < (%s, %s)"
+                parametros = [posicion[0], posicion[1]]
+            parametros.append(limite + 1)
+
+            cursor.execute(f"""
+                SELECT
+                    p.id,
+                    p.autor_id,
+                    u.username AS author,
+                    p.titulo AS title,
+                    p.texto AS content,
+                    p.created_at,
+                    p.cantidad_comentarios,
+                    GROUP_CONCAT(ip.url ORDER BY ip.orden ASC) AS all_image_urls
+                FROM (
+                    SELECT id, autor_id, titulo, texto, created_at, cantidad_comentarios
+                    FROM publicaciones
+                    {filtro_posicion}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                ) p
+                JOIN users u ON p.autor_id = u.id
+                LEFT JOIN imagenes_publicacion ip ON p.id = ip.publicacion_id
+                GROUP BY p.id, p.autor_id, u.username, p.titulo, p.texto, p.created_at, p.cantidad_comentarios
+                ORDER BY p.created_at DESC, p.id DESC
+            """, parametros)
+        publicaciones = list(cursor.fetchall())
+
+        next_cursor = None
+        if not listado_completo:
+            publicaciones, next_cursor = recortar_pagina(publicaciones, limite)
+
+        # cantidad_comentarios es un contador mantenido por comentar_publicacion/eliminar_comentario,
+        # así que se lee en la misma consulta en lugar de un COUNT(*) por publicación.
+        for pub in publicaciones:
+            formatear(pub)
 
-            all_urls_str = pub.pop('all_image_urls')
-            if all_urls_str:
-                all_urls = [url for url in all_urls_str.split(',') if url]
-                pub['imageUrl'] = all_urls[0] if all_urls else None
-                pub['imagenes_adicionales_urls'] = all_urls[1:] if len(all_urls) > 1 else []
-            else:
-                pub['imageUrl'] = None
-                pub['imagenes_adicionales_urls'] = []
+        if comentarios_embebidos:
+            _adjuntar_comentarios_recientes(cursor, publicaciones, comentarios_embebidos)
 
         print(f"DEBUG BACKEND: /publicaciones -> {len(publicaciones)} publicaciones obtenidas.", file=sys.stderr)
-        return jsonify(publicaciones), 200
+        if listado_completo:
+            cuerpo = current_app.json.dumps(publicaciones)
+        else:
+            cuerpo = current_app.json.dumps({"publicaciones": publicaciones, "next_cursor": next_cursor})
+        guardar_cache(clave, cuerpo, TTL_FEED_SECONDS)
+        return _respuesta_json(cuerpo, etag=etag)
     except Exception as e:
         print(f"ERROR: /publicaciones -> Error: {e}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
@@ -187,6 +617,183 @@ def publicaciones():
     finally:
         cursor.close()
 
+# --- Ranking "hot" (ver tendencias.py) ---
+LIMITE_HOT_POR_DEFECTO = 20
+LIMITE_HOT_MAXIMO = 100
+
+def _obtener_resumenes_por_ids(cursor, ids):
+    """Retorna {id: publicación en proyección resumida} para los ids dados, con una sola consulta IN."""
+    if not ids:
+        return {}
+    marcadores = ', '.join(['%s'] * len(ids))
+    cursor.execute(
+        SQL_FEED_RESUMEN.format(filtro_posicion=f"WHERE p.id IN ({marcadores})", limite=""),
+        list(ids)
+    )
+    return {fila['id']: _formatear_resumen(fila) for fila in cursor.fetchall()}
+
+@user_bp.route('/publicaciones/hot', methods=['GET'])
+def publicaciones_hot():
+    # Endpoint público. El orden sale del sorted set de Redis; MySQL solo resuelve los ids
+    # de la página por clave primaria, sin ORDER BY sobre la tabla completa.
+    try:
+        limite = obtener_limite(request.args.get('limit'), LIMITE_HOT_POR_DEFECTO, LIMITE_HOT_MAXIMO)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    ids = tendencias.obtener_ids_hot(limite)
+
+    cursor = mysql.connection.cursor(DictCursor)
+    try:
+        if ids:
+            por_id = _obtener_resumenes_por_ids(cursor, ids)
+            # Se conserva el orden del ranking y se omiten ids que ya no existan en MySQL.
+            resultado = [por_id[i] for i in ids if i in por_id]
+        else:
+            # Ranking vacío (arranque en frío o Redis caído): se devuelven las más recientes.
+            print("DEBUG BACKEND: /publicaciones/hot -> Ranking vacío, devolviendo publicaciones recientes.", file=sys.stderr)
+            cursor.execute(SQL_FEED_RESUMEN.format(filtro_posicion="", limite="LIMIT %s"), (limite,))
+            resultado = [_formatear_resumen(fila) for fila in cursor.fetchall()]
+        return jsonify(resultado), 200
+    except Exception as e:
+        print(f"ERROR: /publicaciones/hot -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al obtener publicaciones en tendencia."}), 500
+    finally:
+        cursor.close()
+
+# --- Búsqueda de texto completo ---
+LONGITUD_MINIMA_BUSQUEDA = 3   # Igual a innodb_ft_min_token_size: términos más cortos no están indexados
+LONGITUD_MAXIMA_BUSQUEDA = 100
+MAX_PAGINA_BUSQUEDA = 50       # Limita el OFFSET para que el coste de una página sea acotado
+LIMITE_BUSQUEDA_POR_DEFECTO = 10
+LIMITE_BUSQUEDA_MAXIMO = 50
+LONGITUD_FRAGMENTO = 160
+
+SQL_BUSQUEDA_PUBLICACIONES = """
+    SELECT
+        p.id,
+        p.autor_id,
+        u.username AS author,
+        p.titulo AS title,
+        p.texto,
+        p.imageUrl,
+        p.cantidad_comentarios,
+        p.created_at,
+        MATCH(p.titulo, p.texto) AGAINST (%s IN NATURAL LANGUAGE MODE) AS relevancia
+    FROM publicaciones p
+    JOIN users u ON p.autor_id = u.id
+    WHERE MATCH(p.titulo, p.texto) AGAINST (%s IN NATURAL LANGUAGE MODE)
+    ORDER BY relevancia DESC, p.id DESC
+    LIMIT %s OFFSET %s
+"""
+
+def _generar_fragmento(texto, terminos):
+    """
+    Devuelve un fragmento del texto alrededor de la primera coincidencia, con los términos
+    buscados envueltos en <mark>. El texto se escapa antes de insertar las marcas.
+    """
+    texto = ' '.join(texto.split())
+    patron = re.compile('|'.join(re.escape(t) for t in terminos), re.IGNORECASE) if terminos else None
+    coincidencia = patron.search(texto) if patron else None
+
+    inicio = 0
+    if coincidencia:
+        inicio = max(0, coincidencia.start() - LONGITUD_FRAGMENTO // 3)
+        espacio = texto.rfind(' ', 0, inicio)
+        inicio = espacio + 1 if inicio > 0 and espacio >= 0 else inicio
+    fin = min(len(texto), inicio + LONGITUD_FRAGMENTO)
+    fragmento = texto[inicio:fin]
+
+    partes = []
+    ultimo = 0
+    if patron:
+        for m in patron.finditer(fragmento):
+            partes.append(str(escape(fragmento[ultimo:m.start()])))
+            partes.append(f"<mark>{escape(m.group(0))}</mark>")
+            ultimo = m.end()
+    partes.append(str(escape(fragmento[ultimo:])))
+    return ('…' if inicio > 0 else '') + ''.join(partes) + ('…' if fin < len(texto) else '')
+
+@user_bp.route('/publicaciones/buscar', methods=['GET'])
+def buscar_publicaciones():
+    # Endpoint público. Usa el índice FULLTEXT ft_publicaciones_titulo_texto y devuelve
+    # páginas ordenadas por relevancia (?q=&limit=&page=) con un fragmento resaltado.
+    consulta = ' '.join(request.args.get('q', '').split())
+    if len(consulta) < LONGITUD_MINIMA_BUSQUEDA or len(consulta) > LONGITUD_MAXIMA_BUSQUEDA:
+        return jsonify({"error": f"El parámetro 'q' debe tener entre {LONGITUD_MINIMA_BUSQUEDA} y {LONGITUD_MAXIMA_BUSQUEDA} caracteres."}), 400
+
+    try:
+        limite = obtener_limite(request.args.get('limit'), LIMITE_BUSQUEDA_POR_DEFECTO, LIMITE_BUSQUEDA_MAXIMO)
+        pagina = int(request.args.get('page', 1))
+        if pagina < 1 or pagina > MAX_PAGINA_BUSQUEDA:
+            raise ValueError(f"Página fuera de rango: {pagina}")
+    except ValueError as e:
+        print(f"DEBUG BACKEND: /publicaciones/buscar -> Parámetros inválidos: {e}", file=sys.stderr)
+        return jsonify({"error": f"Parámetros inválidos: 'limit' debe ser positivo y 'page' estar entre 1 y {MAX_PAGINA_BUSQUEDA}."}), 400
+
+    # Los resultados dependen del contenido del feed, así que se cachean bajo su versión.
+    version_feed = obtener_version(RECURSO_FEED)
+    firma = hashlib.sha1(consulta.lower().encode('utf-8')).hexdigest()
+    clave = clave_cache(RECURSO_FEED, version_feed, "buscar", firma, limite, pagina) if version_feed else None
+    cuerpo_cache = obtener_cache(clave)
+    if cuerpo_cache is not None:
+        return _respuesta_json(cuerpo_cache)
+
+    terminos = [t for t in re.split(r'\W+', consulta) if len(t) >= LONGITUD_MINIMA_BUSQUEDA]
+
+    cursor = mysql.connection.cursor(DictCursor)
+    try:
+        cursor.execute(SQL_BUSQUEDA_PUBLICACIONES, (consulta, consulta, limite + 1, (pagina - 1) * limite))
+        resultados = list(cursor.fetchall())
+
+        hay_mas = len(resultados) > limite
+        resultados = resultados[:limite]
+        for resultado in resultados:
+            resultado['fragmento'] = _generar_fragmento(resultado.pop('texto'), terminos)
+            resultado['relevancia'] = round(float(resultado['relevancia']), 4)
+            resultado['created_at'] = resultado['created_at'].isoformat() if resultado['created_at'] else None
+
+        print(f"DEBUG BACKEND: /publicaciones/buscar -> {len(resultados)} resultados para '{consulta}' (página {pagina}).", file=sys.stderr)
+        cuerpo = current_app.json.dumps({
+            "resultados": resultados,
+            "page": pagina,
+            "next_page": pagina + 1 if hay_mas and pagina < MAX_PAGINA_BUSQUEDA else None
+        })
+        guardar_cache(clave, cuerpo, TTL_FEED_SECONDS)
+        return _respuesta_json(cuerpo)
+    except Exception as e:
+        print(f"ERROR: /publicaciones/buscar -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al buscar publicaciones."}), 500
+    finally:
+        cursor.close()
+
+def _respuesta_eventos(canal, descripcion):
+    """Abre un stream text/event-stream sobre el canal indicado (ver eventos.py)."""
+    if not eventos.disponible():
+        print(f"ERROR: {descripcion} -> Redis no disponible, no se pueden servir eventos.", file=sys.stderr)
+        return jsonify({"error": "Las notificaciones en tiempo real no están disponibles en este momento."}), 503
+    print(f"DEBUG BACKEND: {descripcion} -> Cliente suscrito a '{canal}'.", file=sys.stderr)
+    response = current_app.response_class(eventos.escuchar(canal), mimetype='text/event-stream')
+    # no-transform: tampoco un proxy intermedio debe comprimir el stream (ver TIPOS_EXCLUIDOS en compresion.py).
+    response.headers['Cache-Control'] = 'no-cache, no-transform'
+    response.headers['X-Accel-Buffering'] = 'no'  # Evita que nginx acumule los eventos en su búfer
+    return response
+
+@user_bp.route('/publicaciones/eventos', methods=['GET'])
+def eventos_feed():
+    """Server-Sent Events con las publicaciones nuevas (evento 'publicacion')."""
+    return _respuesta_eventos(eventos.CANAL_FEED, '/publicaciones/eventos')
+
+@user_bp.route('/publicaciones/<int:publicacion_id>/eventos', methods=['GET'])
+def eventos_publicacion(publicacion_id):
+    """
+    Server-Sent Events con los comentarios nuevos de una publicación (evento 'comentario').
+    No consulta MySQL: sustituye al sondeo periódico de /publicaciones/<id>/comentarios.
+    """
+    return _respuesta_eventos(eventos.canal_publicacion(publicacion_id), f'/publicaciones/{publicacion_id}/eventos')
+
 @user_bp.route('/crear-publicacion', methods=['POST'])
 @jwt_required() # Requiere un access token válido
 def crear_publicacion():
@@ -204,13 +811,28 @@ def crear_publicacion():
     if not texto or not titulo:
         print(f"DEBUG BACKEND: /crear-publicacion -> Faltan título o texto.", file=sys.stderr)
         return jsonify({"error": "Título y texto de la publicación son requeridos."}), 400
+    if not isinstance(texto, str) or not isinstance(titulo, str):
+        return jsonify({"error": "Título y texto de la publicación deben ser texto."}), 400
 
     cursor = mysql.connection.cursor()
     try:
-        cursor.execute("INSERT INTO publicaciones (autor_id, titulo, texto) VALUES (%s, %s, %s)", (current_user_id, titulo, texto))
+        cursor.execute(
+            "INSERT INTO publicaciones (autor_id, titulo, texto, extracto) VALUES (%s, %s, %s, %s)",
+            (current_user_id, titulo, texto, _generar_extracto(texto))
+        )
         mysql.connection.commit()
 
         new_post_id = cursor.lastrowid
+        incrementar_version(RECURSO_FEED)
+        tendencias.registrar_evento(new_post_id, tendencias.PESO_PUBLICACION)
+        eventos.publicar(eventos.CANAL_FEED, 'publicacion', {
+            "id": new_post_id,
+            "autor_id": int(current_user_id),
+            "author": claims.get('username'),
+            "titulo": titulo,
+            "extracto": _generar_extracto(texto),
+            "created_at": datetime.now().isoformat()
+        })
         print(f"DEBUG BACKEND: /crear-publicacion -> Publicación {new_post_id} creada por UserID {current_user_id}. Devolviendo 201 OK.", file=sys.stderr)
         return jsonify({"message": "Publicación creada exitosamente.", "publicacion_id": new_post_id}), 201
     except Exception as e:
@@ -220,6 +842,26 @@ def crear_publicacion():
     finally:
         cursor.close()
 
+def _mutar_como_autor(cursor, tabla, sentencia, parametros, registro_id, autor_id):
+    """
+    Ejecuta una sentencia UPDATE/DELETE cuyo WHERE ya incluye el id del registro y 'autor_id = %s',
+    de modo que la comprobación de autoría y la escritura son una sola operación atómica.
+    Retorna (error, lastrowid): error es None si la fila cumplía el WHERE, y lastrowid el valor
+    que la sentencia haya dejado con LAST_INSERT_ID(expr), leído antes de cualquier otra consulta.
+    Solo si no se afectó ninguna fila se consulta el autor: 404 si el registro no existe, 403 si
+    pertenece a otro usuario, y None si es suyo (un UPDATE que no cambia ningún valor no cuenta
+    como fila afectada en MySQL).
+    """
+    cursor.execute(sentencia, parametros)
+    lastrowid = cursor.lastrowid
+    if cursor.rowcount > 0:
+        return None, lastrowid
+    cursor.execute(f"SELECT autor_id FROM {tabla} WHERE id = %s", (registro_id,))
+    fila = cursor.fetchone()
+    if fila is None:
+        return 404, None
+    return (None if fila[0] == autor_id else 403), lastrowid
+
 @user_bp.route('/editar-publicacion/<int:publicacion_id>', methods=['PUT'])
 @jwt_required() # Requiere un access token válido
 def editar_publicacion(publicacion_id):
@@ -238,22 +880,26 @@ def editar_publicacion(publicacion_id):
     if not nuevo_texto or not nuevo_titulo:
         print(f"DEBUG BACKEND: /editar-publicacion -> Faltan título o texto.", file=sys.stderr)
         return jsonify({"error": "Nuevo título y texto de publicación son requeridos."}), 400
+    if not isinstance(nuevo_texto, str) or not isinstance(nuevo_titulo, str):
+        return jsonify({"error": "Nuevo título y texto de publicación deben ser texto."}), 400
 
     cursor = mysql.connection.cursor()
     try:
-        cursor.execute("SELECT autor_id FROM publicaciones WHERE id = %s", (publicacion_id,))
-        resultado = cursor.fetchone()
-        
-        # DEBUG: Comprobación de autoría
-        post_author_id_from_db = resultado[0] if resultado else 'N/A'
-        print(f"DEBUG BACKEND: /editar-publicacion -> UserID: {current_user_id}, Post AuthorID (DB): {post_author_id_from_db}. Match: {current_user_id == post_author_id_from_db}", file=sys.stderr)
-
-        if not resultado or resultado[0] != current_user_id:
-            print(f"DEBUG BACKEND: /editar-publicacion -> Acceso DENEGADO (ID no coincide). Devolviendo 403.", file=sys.stderr)
+        error, _ = _mutar_como_autor(
+            cursor, 'publicaciones',
+            "UPDATE publicaciones SET texto = %s, titulo = %s, extracto = %s WHERE id = %s AND autor_id = %s",
+            (nuevo_texto, nuevo_titulo, _generar_extracto(nuevo_texto), publicacion_id, current_user_id),
+            publicacion_id, current_user_id
+        )
+        if error == 404:
+            print(f"DEBUG BACKEND: /editar-publicacion -> Publicación {publicacion_id} no encontrada. Devolviendo 404.", file=sys.stderr)
+            return jsonify({"error": "Publicación no encontrada."}), 404
+        if error == 403:
+            print(f"DEBUG BACKEND: /editar-publicacion -> Acceso DENEGADO (UserID {current_user_id} no es el autor). Devolviendo 403.", file=sys.stderr)
             return jsonify({"error": "No autorizado para editar esta publicación."}), 403
-        
-        cursor.execute("UPDATE publicaciones SET texto = %s, titulo = %s WHERE id = %s", (nuevo_texto, nuevo_titulo, publicacion_id))
+
         mysql.connection.commit()
+        incrementar_version(RECURSO_FEED, recurso_publicacion(publicacion_id))
         print(f"DEBUG BACKEND: /editar-publicacion -> Publicación {publicacion_id} editada por UserID {current_user_id}. Devolviendo 200 OK.", file=sys.stderr)
         return jsonify({"message": "Publicación editada correctamente."}), 200
     except Exception as e:
@@ -277,21 +923,22 @@ def eliminar_publicacion(publicacion_id):
 
     cursor = mysql.connection.cursor()
     try:
-        cursor.execute("SELECT autor_id FROM publicaciones WHERE id = %s", (publicacion_id,))
-        resultado = cursor.fetchone()
-        
-        # DEBUG: Comprobación de autoría
-        post_author_id_from_db = resultado[0] if resultado else 'N/A'
-        print(f"DEBUG BACKEND: /eliminar-publicacion -> UserID: {current_user_id}, Post AuthorID (DB): {post_author_id_from_db}. Match: {current_user_id == post_author_id_from_db}", file=sys.stderr)
-
-        if not resultado or resultado[0] != current_user_id:
-            print(f"DEBUG BACKEND: /eliminar-publicacion -> Acceso DENEGADO (ID no coincide). Devolviendo 403.", file=sys.stderr)
+        error, _ = _mutar_como_autor(
+            cursor, 'publicaciones',
+            "DELETE FROM publicaciones WHERE id = %s AND autor_id = %s",
+            (publicacion_id, current_user_id),
+            publicacion_id, current_user_id
+        )
+        if error == 404:
+            print(f"DEBUG BACKEND: /eliminar-publicacion -> Publicación {publicacion_id} no encontrada. Devolviendo 404.", file=sys.stderr)
+            return jsonify({"error": "Publicación no encontrada."}), 404
+        if error == 403:
+            print(f"DEBUG BACKEND: /eliminar-publicacion -> Acceso DENEGADO (UserID {current_user_id} no es el autor). Devolviendo 403.", file=sys.stderr)
             return jsonify({"error": "No autorizado para eliminar esta publicación."}), 403
 
-        # DEBUG: Autorización OK, iniciando eliminación
-        print(f"DEBUG BACKEND: /eliminar-publicacion -> Autorización PASÓ. Eliminando publicación {publicacion_id}.", file=sys.stderr)
+        mysql.connection.commit()
 
-        # --- Lógica para eliminar la carpeta completa de la publicación ---
+        # --- Lógica para eliminar la carpeta completa de la publicación (solo tras borrar la fila) ---
         upload_folder = current_app.config.get('UPLOAD_FOLDER')
         base_publicaciones_path = os.path.join(upload_folder, 'publicaciones')
         publicacion_folder_name = f"publicacion-{publicacion_id}" 
@@ -304,11 +951,12 @@ def eliminar_publicacion(publicacion_id):
             except Exception as e:
                 print(f"ERROR: No se pudo eliminar la carpeta de publicación {publicacion_folder_path}: {e}", file=sys.stderr)
 
-        cursor.execute("DELETE FROM publicaciones WHERE id = %s", (publicacion_id,))
-        mysql.connection.commit()
+        incrementar_version(RECURSO_FEED, recurso_comentarios(publicacion_id), recurso_publicacion(publicacion_id))
+        tendencias.eliminar_publicacion(publicacion_id)
         print(f"DEBUG BACKEND: /eliminar-publicacion -> Publicación {publicacion_id} eliminada por UserID {current_user_id}. Devolviendo 200 OK.", file=sys.stderr)
         return jsonify({"message": "Publicación eliminada correctamente."}), 200
     except Exception as e:
+        mysql.connection.rollback()
         print(f"ERROR: /eliminar-publicacion -> Error: {e}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
         return jsonify({"error": "Error interno del servidor al eliminar publicación."}), 500
@@ -336,8 +984,14 @@ def comentar_publicacion():
 
     cursor = mysql.connection.cursor()
     try:
-        cursor.execute("SELECT id FROM publicaciones WHERE id = %s", (publicacion_id,))
-        if not cursor.fetchone():
+        # El incremento del contador sirve también como comprobación de existencia:
+        # si no se actualizó ninguna fila, la publicación no existe.
+        cursor.execute(
+            "UPDATE publicaciones SET cantidad_comentarios = cantidad_comentarios + 1 WHERE id = %s",
+            (publicacion_id,)
+        )
+        if cursor.rowcount == 0:
+            mysql.connection.rollback()
             print(f"DEBUG BACKEND: /comentar-publicacion -> Publicación {publicacion_id} no encontrada.", file=sys.stderr)
             return jsonify({"error": "La publicación no existe."}), 404
 
@@ -345,53 +999,158 @@ def comentar_publicacion():
             "INSERT INTO comentarios (publicacion_id, autor_id, texto) VALUES (%s, %s, %s)",
             (publicacion_id, current_user_id, comentario)
         )
+        comentario_id = cursor.lastrowid
         mysql.connection.commit()
+        incrementar_version(RECURSO_FEED, recurso_comentarios(publicacion_id), recurso_publicacion(publicacion_id))
+        tendencias.registrar_evento(publicacion_id, tendencias.PESO_COMENTARIO)
+        # Mismo formato que GET /publicaciones/<id>/comentarios; el nombre sale del token, sin consultar MySQL.
+        eventos.publicar(eventos.canal_publicacion(publicacion_id), 'comentario', {
+            "id": comentario_id,
+            "publicacion_id": publicacion_id,
+            "autor_id": current_user_id,
+            "author": claims.get('username'),
+            "text": comentario,
+            "created_at": datetime.now().isoformat()
+        })
         print(f"DEBUG BACKEND: /comentar-publicacion -> Comentario para Publicación {publicacion_id} creado por UserID {current_user_id}. Devolviendo 201 OK.", file=sys.stderr)
         return jsonify({"message": "Comentario publicado exitosamente."}), 201
     except Exception as e:
+        mysql.connection.rollback()
         print(f"ERROR: /comentar-publicacion -> Error: {e}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
         return jsonify({"error": "Error interno del servidor al comentar."}), 500
     finally:
         cursor.close()
 
+SQL_COMENTARIOS_PUBLICACION = """
+    SELECT 
+        c.id, 
+        c.autor_id, 
+        u.username AS author, 
+        c.texto AS text, 
+        c.created_at 
+    FROM 
+        comentarios c
+    JOIN 
+        users u ON c.autor_id = u.id
+    WHERE 
+        c.publicacion_id = %s
+    ORDER BY 
+        c.created_at DESC, c.id DESC
+"""
+
+# Página de comentarios con la comprobación de existencia incluida: la fila de 'publicaciones'
+# siempre aparece si existe (LEFT JOIN), así que ninguna fila significa 404 y una fila con
+# c.id NULL significa que la página está vacía. La subconsulta recorre el índice
+# idx_comentarios_publicacion_fecha (publicacion_id, created_at, id) sin filesort.
+SQL_PAGINA_COMENTARIOS = """
+    SELECT
+        c.id,
+        c.autor_id,
+        c.author,
+        c.text,
+        c.created_at
+    FROM publicaciones p
+    LEFT JOIN (
+        SELECT
+            c.id,
+            c.autor_id,
+            u.username AS author,
+            c.texto AS text,
+            c.created_at
+        FROM comentarios c
+        JOIN users u ON c.autor_id = u.id
+        WHERE c.publicacion_id = %s {filtro_posicion}
+        ORDER BY c.created_at DESC, c.id DESC
+        {limite}
+    ) c ON TRUE
+    WHERE p.id = %s
+    ORDER BY c.created_at DESC, c.id DESC
+"""
+
 # Ruta para obtener comentarios de una publicación
+# Por defecto devuelve una página (?limit=&cursor=) ordenada por (created_at, id) DESC.
+# Con ?all=1 devuelve la lista completa y con ?stream=1 la escribe en streaming desde un cursor del servidor.
 @user_bp.route('/publicaciones/<int:publicacion_id>/comentarios', methods=['GET'])
 def get_comentarios_publicacion(publicacion_id):
+    transmitir = request.args.get('stream', '').lower() in ('1', 'true')
+    listado_completo = transmitir or request.args.get('all', '').lower() in ('1', 'true')
+    cursor_param = request.args.get('cursor')
+
     try:
-        conn = mysql.connection
-        cursor = conn.cursor(DictCursor)
+        limite = obtener_limite(request.args.get('limit'))
+        posicion = decodificar_cursor(cursor_param) if cursor_param else None
+    except ValueError as e:
+        print(f"DEBUG BACKEND: /publicaciones/<id>/comentarios -> Parámetros de paginación inválidos: {e}", file=sys.stderr)
+        return jsonify({"error": "Parámetros de paginación inválidos (limit o cursor)."}), 400
+
+    if transmitir:
+        variante = "stream"
+    elif listado_completo:
+        variante = "all"
+    else:
+        # Cursor recodificado en forma canónica (ver el feed en publicaciones()).
+        variante = f"{limite}:{codificar_cursor(*posicion) if posicion else ''}"
+    version_comentarios = obtener_version(recurso_comentarios(publicacion_id))
+    clave = clave_cache(recurso_comentarios(publicacion_id), version_comentarios, variante) if version_comentarios else None
+    etag = generar_etag(recurso_comentarios(publicacion_id), version_comentarios, variante)
+    no_modificado = _no_modificado(etag)
+    if no_modificado:
+        return no_modificado
+
+    cuerpo_cache = None if transmitir else obtener_cache(clave)
+    if cuerpo_cache is not None:
+        print(f"DEBUG BACKEND: /publicaciones/<id>/comentarios -> Comentarios de Publicación {publicacion_id} servidos desde caché.", file=sys.stderr)
+        return _respuesta_json(cuerpo_cache, etag=etag)
 
-        cursor.execute("SELECT id FROM publicaciones WHERE id = %s", (publicacion_id,))
-        publication_exists = cursor.fetchone()
-        if not publication_exists:
+    cursor = mysql.connection.cursor(DictCursor)
+    try:
+        if transmitir:
+            # En streaming el estado HTTP se decide antes de escribir el cuerpo, así que aquí
+            # sí se necesita la comprobación de existencia previa.
+            cursor.execute("SELECT id FROM publicaciones WHERE id = %s", (publicacion_id,))
+            if not cursor.fetchone():
+                print(f"DEBUG BACKEND: /publicaciones/<id>/comentarios -> Publicación {publicacion_id} no encontrada.", file=sys.stderr)
+                return jsonify({"error": "Publicación no encontrada."}), 404
+            cursor.close()
+            return _respuesta_json_en_streaming(
+                SQL_COMENTARIOS_PUBLICACION, (publicacion_id,), _formatear_comentario, etag,
+                '/publicaciones/<id>/comentarios'
+            )
+
+        filtro_posicion = ""
+        parametros = [publicacion_id]
+        if posicion:
+            filtro_posicion = "AND (c.created_at, c.id) < (%s, %s)"
+            parametros += [posicion[0], posicion[1]]
+        limite_sql = ""
+        if not listado_completo:
+            limite_sql = "LIMIT %s"
+            parametros.append(limite + 1)
+        parametros.append(publicacion_id)
+
+        cursor.execute(
+            SQL_PAGINA_COMENTARIOS.format(filtro_posicion=filtro_posicion, limite=limite_sql),
+            parametros
+        )
+        filas = cursor.fetchall()
+        if not filas:
             print(f"DEBUG BACKEND: /publicaciones/<id>/comentarios -> Publicación {publicacion_id} no encontrada.", file=sys.stderr)
             return jsonify({"error": "Publicación no encontrada."}), 404
 
-        cursor.execute("""
-            SELECT 
-                c.id, 
-                c.autor_id, 
-                u.username AS author, 
-                c.texto AS text, 
-                c.created_at 
-            FROM 
-                comentarios c
-            JOIN 
-                users u ON c.autor_id = u.id
-            WHERE 
-                c.publicacion_id = %s
-            ORDER BY 
-                c.created_at DESC
-        """, (publicacion_id,))
-        comentarios = cursor.fetchall()
-
-        for comentario in comentarios:
-            if isinstance(comentario['created_at'], datetime):
-                comentario['created_at'] = comentario['created_at'].isoformat()
-        
+        comentarios = [_formatear_comentario(fila) for fila in filas if fila['id'] is not None]
+
+        next_cursor = None
+        if not listado_completo:
+            comentarios, next_cursor = recortar_pagina(comentarios, limite)
+
         print(f"DEBUG BACKEND: /publicaciones/<id>/comentarios -> {len(comentarios)} comentarios para Publicación {publicacion_id} obtenidos.", file=sys.stderr)
-        return jsonify(comentarios), 200
+        if listado_completo:
+            cuerpo = current_app.json.dumps(comentarios)
+        else:
+            cuerpo = current_app.json.dumps({"comentarios": comentarios, "next_cursor": next_cursor})
+        guardar_cache(clave, cuerpo, TTL_COMENTARIOS_SECONDS)
+        return _respuesta_json(cuerpo, etag=etag)
     except Exception as e:
         print(f"ERROR: /publicaciones/<id>/comentarios -> Error: {str(e)}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
@@ -420,19 +1179,24 @@ def editar_comentario(comentario_id):
 
     cursor = mysql.connection.cursor()
     try:
-        cursor.execute("SELECT autor_id FROM comentarios WHERE id = %s", (comentario_id,))
-        resultado = cursor.fetchone()
-        
-        # DEBUG: Comprobación de autoría
-        comment_author_id_from_db = resultado[0] if resultado else 'N/A'
-        print(f"DEBUG BACKEND: /editar-comentario -> UserID: {current_user_id}, Comment AuthorID (DB): {comment_author_id_from_db}. Match: {current_user_id == comment_author_id_from_db}", file=sys.stderr)
-
-        if not resultado or resultado[0] != current_user_id:
-            print(f"DEBUG BACKEND: /editar-comentario -> Acceso DENEGADO (ID no coincide). Devolviendo 403.", file=sys.stderr)
+        # LAST_INSERT_ID(publicacion_id) deja el id de la publicación en lastrowid: la misma
+        # sentencia que comprueba la autoría dice qué caché invalidar, sin un SELECT adicional.
+        error, publicacion_id = _mutar_como_autor(
+            cursor, 'comentarios',
+            "UPDATE comentarios SET texto = %s, publicacion_id = LAST_INSERT_ID(publicacion_id) WHERE id = %s AND autor_id = %s",
+            (nuevo_texto, comentario_id, current_user_id),
+            comentario_id, current_user_id
+        )
+        if error == 404:
+            print(f"DEBUG BACKEND: /editar-comentario -> Comentario {comentario_id} no encontrado. Devolviendo 404.", file=sys.stderr)
+            return jsonify({"error": "Comentario no encontrado."}), 404
+        if error == 403:
+            print(f"DEBUG BACKEND: /editar-comentario -> Acceso DENEGADO (UserID {current_user_id} no es el autor). Devolviendo 403.", file=sys.stderr)
             return jsonify({"error": "No autorizado para editar este comentario."}), 403
 
-        cursor.execute("UPDATE comentarios SET texto = %s WHERE id = %s", (nuevo_texto, comentario_id))
         mysql.connection.commit()
+        # El feed también se invalida porque puede embeber el texto del comentario (?embed_comments).
+        incrementar_version(RECURSO_FEED, recurso_comentarios(publicacion_id))
         print(f"DEBUG BACKEND: /editar-comentario -> Comentario {comentario_id} editado por UserID {current_user_id}. Devolviendo 200 OK.", file=sys.stderr)
         return jsonify({"message": "Comentario editado correctamente."}), 200
     except Exception as e:
@@ -456,22 +1220,35 @@ def eliminar_comentario(comentario_id):
 
     cursor = mysql.connection.cursor()
     try:
-        cursor.execute("SELECT autor_id FROM comentarios WHERE id = %s", (comentario_id,))
-        resultado = cursor.fetchone()
-
-        # DEBUG: Comprobación de autoría
-        comment_author_id_from_db = resultado[0] if resultado else 'N/A'
-        print(f"DEBUG BACKEND: /eliminar-comentario -> UserID: {current_user_id}, Comment AuthorID (DB): {comment_author_id_from_db}. Match: {current_user_id == comment_author_id_from_db}", file=sys.stderr)
-
-        if not resultado or resultado[0] != current_user_id:
-            print(f"DEBUG BACKEND: /eliminar-comentario -> Acceso DENEGADO (ID no coincide). Devolviendo 403.", file=sys.stderr)
+        # El DELETE no puede devolver columnas, así que la comprobación de autoría se hace con un
+        # UPDATE multitabla que, en la misma sentencia, descuenta el comentario de la publicación,
+        # bloquea la fila y deja publicacion_id en lastrowid vía LAST_INSERT_ID (el valor no cambia).
+        error, publicacion_id = _mutar_como_autor(
+            cursor, 'comentarios',
+            """
+            UPDATE comentarios c
+            JOIN publicaciones p ON p.id = c.publicacion_id
+            SET p.cantidad_comentarios = GREATEST(p.cantidad_comentarios - 1, 0),
+                c.publicacion_id = LAST_INSERT_ID(c.publicacion_id)
+            WHERE c.id = %s AND c.autor_id = %s
+            """,
+            (comentario_id, current_user_id),
+            comentario_id, current_user_id
+        )
+        if error == 404:
+            print(f"DEBUG BACKEND: /eliminar-comentario -> Comentario {comentario_id} no encontrado. Devolviendo 404.", file=sys.stderr)
+            return jsonify({"error": "Comentario no encontrado."}), 404
+        if error == 403:
+            print(f"DEBUG BACKEND: /eliminar-comentario -> Acceso DENEGADO (UserID {current_user_id} no es el autor). Devolviendo 403.", file=sys.stderr)
             return jsonify({"error": "No autorizado para eliminar este comentario."}), 403
 
         cursor.execute("DELETE FROM comentarios WHERE id = %s", (comentario_id,))
         mysql.connection.commit()
+        incrementar_version(RECURSO_FEED, recurso_comentarios(publicacion_id), recurso_publicacion(publicacion_id))
         print(f"DEBUG BACKEND: /eliminar-comentario -> Comentario {comentario_id} eliminado por UserID {current_user_id}. Devolviendo 200 OK.", file=sys.stderr)
         return jsonify({"message": "Comentario eliminado correctamente."}), 200
     except Exception as e:
+        mysql.connection.rollback()
         print(f"ERROR: /eliminar-comentario -> Error: {e}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
         return jsonify({"error": "Error interno del servidor al eliminar comentario."}), 500
@@ -541,6 +1318,7 @@ def upload_profile_picture():
 
             cursor.execute("UPDATE users SET foto_perfil = %s WHERE id = %s", (image_url, current_user_id))
             mysql.connection.commit()
+            invalidar_perfil(current_user_id)
             print(f"DEBUG BACKEND: /perfil/foto -> Foto de perfil para UserID {current_user_id} actualizada. Devolviendo 200 OK.", file=sys.stderr)
             return jsonify({
                 'message': 'Foto de perfil actualizada exitosamente.',
@@ -571,75 +1349,131 @@ def upload_publicacion_image(publicacion_id):
         print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Usuario NO verificado (UserID: {current_user_id}). Devolviendo 403.", file=sys.stderr)
         return jsonify({"error": "Usuario no verificado."}), 403
 
-    cursor = mysql.connection.cursor()
-    try:
-        # 1. Verificar si la publicación existe y pertenece al usuario actual
-        cursor.execute("SELECT autor_id FROM publicaciones WHERE id = %s", (publicacion_id,))
-        publicacion = cursor.fetchone()
-        
-        # DEBUG: Comprobación de autoría
-        post_author_id_from_db = publicacion[0] if publicacion else 'N/A'
-        print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> UserID: {current_user_id}, Post AuthorID (DB): {post_author_id_from_db}. Match: {current_user_id == post_author_id_from_db}", file=sys.stderr)
-
-        if not publicacion or publicacion[0] != current_user_id:
-            print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Acceso DENEGADO (ID no coincide o publicación no encontrada). Devolviendo 403.", file=sys.stderr)
-            return jsonify({"error": "No tienes permiso para subir imágenes a esta publicación."}), 403
+    if 'imagen_publicacion' not in request.files:
+        print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Archivo de imagen faltante.", file=sys.stderr)
+        return jsonify({'error': 'No se encontró el archivo de imagen en la solicitud. El campo esperado es "imagen_publicacion".'}), 400
 
-        if 'imagen_publicacion' not in request.files:
-            print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Archivo de imagen faltante.", file=sys.stderr)
-            return jsonify({'error': 'No se encontró el archivo de imagen en la solicitud. El campo esperado es "imagen_publicacion".'}), 400
+    file = request.files['imagen_publicacion']
 
-        file = request.files['imagen_publicacion']
+    if file.filename == '':
+        print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Nombre de archivo vacío.", file=sys.stderr)
+        return jsonify({'error': 'No se seleccionó ningún archivo.'}), 400
 
-        if file.filename == '':
-            print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Nombre de archivo vacío.", file=sys.stderr)
-            return jsonify({'error': 'No se seleccionó ningún archivo.'}), 400
+    allowed_extensions = current_app.config.get('ALLOWED_EXTENSIONS', {'png', 'jpg', 'jpeg', 'gif'})
 
-        allowed_extensions = current_app.config.get('ALLOWED_EXTENSIONS', {'png', 'jpg', 'jpeg', 'gif'})
+    if not ('.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
+        print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Tipo de archivo no permitido: {file.filename}", file=sys.stderr)
+        return jsonify({'error': f"Tipo de archivo no permitido o nombre de archivo inválido. Solo se permiten {', '.join(allowed_extensions)}."}), 400
 
-        if file and '.' in file.filename and \
-        file.filename.rsplit('.', 1)[1].lower() in allowed_extensions:
+    upload_folder = current_app.config.get('UPLOAD_FOLDER')
+    if not upload_folder:
+        print("ERROR: UPLOAD_FOLDER no está configurado en app.config.", file=sys.stderr)
+        return jsonify({"error": "Error de configuración del servidor (UPLOAD_FOLDER no definido)."}), 500
 
-            file_extension = file.filename.rsplit('.', 1)[1].lower()
+    file_extension = file.filename.rsplit('.', 1)[1].lower()
+    publicacion_folder_name = f"publicacion-{publicacion_id}"
+    publicacion_folder_path = os.path.join(upload_folder, 'publicaciones', publicacion_folder_name)
 
-            upload_folder = current_app.config.get('UPLOAD_FOLDER')
-            if not upload_folder:
-                print("ERROR: UPLOAD_FOLDER no está configurado en app.config.", file=sys.stderr)
-                return jsonify({"error": "Error de configuración del servidor (UPLOAD_FOLDER no definido)."}, 500)
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    original_filename_secure = secure_filename(file.filename.rsplit('.', 1)[0])
+    new_filename = f"{original_filename_secure}_{timestamp}.{file_extension}"
+    filepath = os.path.join(publicacion_folder_path, new_filename)
 
-            base_publicaciones_path = os.path.join(upload_folder, 'publicaciones')
-            publicacion_folder_name = f"publicacion-{publicacion_id}" 
-            publicacion_folder_path = os.path.join(base_publicaciones_path, publicacion_folder_name)
+    base_url = current_app.config.get('API_BASE_URL', request.url_root.rstrip('/'))
+    image_url = f"{base_url}/uploads/publicaciones/{publicacion_folder_name}/{new_filename}"
 
-            if not os.path.exists(publicacion_folder_path):
-                os.makedirs(publicacion_folder_path)
+    cursor = mysql.connection.cursor()
+    try:
+        # La comprobación de autoría va en el propio UPDATE que mantiene el contador de imágenes
+        # y la imagen principal de la vista resumida; el contador también fija el 'orden' de la nueva imagen.
+        # El archivo solo se escribe en disco cuando el UPDATE confirma que el usuario es el autor.
+        error, _ = _mutar_como_autor(
+            cursor, 'publicaciones',
+            "UPDATE publicaciones SET cantidad_imagenes = cantidad_imagenes + 1, imageUrl = COALESCE(imageUrl, %s) WHERE id = %s AND autor_id = %s",
+            (image_url, publicacion_id, current_user_id),
+            publicacion_id, current_user_id
+        )
+        if error == 404:
+            print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Publicación {publicacion_id} no encontrada. Devolviendo 404.", file=sys.stderr)
+            return jsonify({"error": "Publicación no encontrada."}), 404
+        if error == 403:
+            print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Acceso DENEGADO (UserID {current_user_id} no es el autor). Devolviendo 403.", file=sys.stderr)
+            return jsonify({"error": "No tienes permiso para subir imágenes a esta publicación."}), 403
 
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
-            original_filename_secure = secure_filename(file.filename.rsplit('.', 1)[0])
-            new_filename = f"{original_filename_secure}_{timestamp}.{file_extension}"
-            filepath = os.path.join(publicacion_folder_path, new_filename)
+        os.makedirs(publicacion_folder_path, exist_ok=True)
+        file.save(filepath)
 
-            try:
-                file.save(filepath)
+        cursor.execute(
+            """
+            INSERT INTO imagenes_publicacion (publicacion_id, url, orden)
+            SELECT id, %s, cantidad_imagenes FROM publicaciones WHERE id = %s
+            """,
+            (image_url, publicacion_id)
+        )
+        mysql.connection.commit()
+        incrementar_version(RECURSO_FEED, recurso_publicacion(publicacion_id))
+        tendencias.registrar_evento(publicacion_id, tendencias.PESO_IMAGEN)
+        print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Imagen subida para PostID {publicacion_id} por UserID {current_user_id}. Devolviendo 201 OK.", file=sys.stderr)
+        return jsonify({
+            'message': 'Imagen de publicación subida exitosamente.',
+            'imagen_url': image_url
+        }), 201
+    except Exception as save_e:
+        mysql.connection.rollback()
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        print(f"ERROR: /publicaciones/<id>/upload_imagen -> Error al guardar archivo o DB: {save_e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return jsonify({"error": "Error interno del servidor al guardar la imagen de la publicación."}), 500
+    finally:
+        cursor.close()
 
-                base_url = current_app.config.get('API_BASE_URL', request.url_root.rstrip('/'))
-                image_url = f"{base_url}/uploads/publicaciones/{publicacion_folder_name}/{new_filename}"
+# --- Comandos de mantenimiento (flask --app app user <comando>) ---
 
-                cursor.execute("INSERT INTO imagenes_publicacion (publicacion_id, url) VALUES (%s, %s)", (publicacion_id, image_url))
-                mysql.connection.commit()
-                print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Imagen subida para PostID {publicacion_id} por UserID {current_user_id}. Devolviendo 201 OK.", file=sys.stderr)
-                return jsonify({
-                    'message': 'Imagen de publicación subida exitosamente.',
-                    'imagen_url': image_url
-                }), 201
-            except Exception as save_e:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                print(f"ERROR: /publicaciones/<id>/upload_imagen -> Error al guardar archivo o DB: {save_e}", file=sys.stderr)
-                traceback.print_exc(file=sys.stderr)
-                return jsonify({"error": "Error interno del servidor al guardar la imagen de la publicación."}), 500
-        else:
-            print(f"DEBUG BACKEND: /publicaciones/<id>/upload_imagen -> Tipo de archivo no permitido: {file.filename}", file=sys.stderr)
-            return jsonify({'error': f"Tipo de archivo no permitido o nombre de archivo inválido. Solo se permiten {', '.join(allowed_extensions)}."}), 400
+@user_bp.cli.command('reconciliar-comentarios')
+def reconciliar_comentarios():
+    """Recalcula en bloque publicaciones.cantidad_comentarios y corrige las que no coinciden."""
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute("""
+            UPDATE publicaciones p
+            LEFT JOIN (
+                SELECT publicacion_id, COUNT(*) AS total
+                FROM comentarios
+                GROUP BY publicacion_id
+            ) c ON c.publicacion_id = p.id
+            SET p.cantidad_comentarios = COALESCE(c.total, 0)
+            WHERE p.cantidad_comentarios <> COALESCE(c.total, 0)
+        """)
+        corregidas = cursor.rowcount
+        mysql.connection.commit()
+        print(f"INFO: reconciliar-comentarios -> {corregidas} publicaciones corregidas.")
+    except Exception as e:
+        mysql.connection.rollback()
+        print(f"ERROR: reconciliar-comentarios -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise SystemExit(1)
     finally:
         cursor.close()
+
+@user_bp.cli.command('decaer-tendencias')
+def decaer_tendencias():
+    """Reescala el ranking hot a la época actual y lo recorta (ejecutar periódicamente, p. ej. cada hora)."""
+    try:
+        total = tendencias.decaer_tendencias()
+        print(f"INFO: decaer-tendencias -> {total} publicaciones en el ranking.")
+    except Exception as e:
+        print(f"ERROR: decaer-tendencias -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise SystemExit(1)
+
+@user_bp.cli.command('reconstruir-tendencias')
+def reconstruir_tendencias():
+    """Reconstruye el ranking hot desde MySQL (arranque en frío)."""
+    try:
+        total = tendencias.reconstruir_tendencias()
+        print(f"INFO: reconstruir-tendencias -> {total} publicaciones cargadas en el ranking.")
+    except Exception as e:
+        print(f"ERROR: reconstruir-tendencias -> Error: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        raise SystemExit(1)
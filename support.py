@@ -2,10 +2,7 @@ from flask import Blueprint, request, jsonify, current_app
 from extensions import mysql, redis_client # Importar redis_client
 import sys
 import traceback
-import smtplib
-from email.mime.text import MIMEText
-from email.header import Header
-import ssl
+from outbox import encolar_correo
 import time
 from datetime import datetime, timedelta, timezone
 
@@ -103,13 +100,11 @@ def handle_support_request():
     # y podemos proceder con el envío del correo.
     print(f"DEBUG: Solicitud de soporte recibida de: {nombre} ({correo}), Motivo: {motivo}", file=sys.stderr)
 
-    # --- LÓGICA DE ENVÍO DE CORREO ELECTRÓNICO USANDO SMTPLIB con STARTTLS ---
+    # --- ENCOLADO DEL CORREO EN email_outbox (lo envía el worker de outbox.py) ---
+    cursor = None
     try:
-        # Obtener las credenciales del correo desde la configuración de la aplicación
+        # El correo de soporte se envía a la propia cuenta configurada
         MAIL_USER = current_app.config['MAIL_USERNAME']
-        MAIL_PASS = current_app.config['MAIL_PASSWORD']
-        MAIL_SERVER = current_app.config.get('MAIL_SERVER', 'smtp.gmail.com')
-        MAIL_PORT_TLS = current_app.config.get('MAIL_PORT', 587) # Usamos el puerto 587 para STARTTLS
 
         # Obtener la hora actual en UTC y convertirla a la hora de Colombia (UTC-5)
         utc_now = datetime.now(timezone.utc)
@@ -172,31 +167,25 @@ def handle_support_request():
         </html>
         """
 
-        # Crear el objeto de mensaje MIME
-        msg = MIMEText(html_body, 'html', 'utf-8')
-        msg['Subject'] = Header(f'Nueva Solicitud de Soporte: {nombre}', 'utf-8')
-        msg['From'] = MAIL_USER
-        msg['To'] = MAIL_USER # El correo de soporte recibirá la solicitud
-
-        # Configuración y envío del correo
-        context = ssl.create_default_context()
-        with smtplib.SMTP(MAIL_SERVER, MAIL_PORT_TLS) as server:
-            server.starttls(context=context) # Iniciar la conexión TLS
-            server.login(MAIL_USER, MAIL_PASS)
-            server.send_message(msg)
+        conn = mysql.connection
+        cursor = conn.cursor()
+        encolar_correo(cursor, MAIL_USER, f'Nueva Solicitud de Soporte: {nombre}', html_body, 'html')
+        conn.commit()
 
         # Ya no necesitamos llamar a setex aquí, ya que set(..., nx=True, ex=...) lo hizo arriba.
-        # El correo se envía solo si se pudo establecer la clave de cooldown al principio.
+        # El correo se encola solo si se pudo establecer la clave de cooldown al principio.
 
-        print("DEBUG: Correo de soporte enviado exitosamente con smtplib y STARTTLS.", file=sys.stderr)
+        print("DEBUG: Correo de soporte encolado en email_outbox.", file=sys.stderr)
 
-        return jsonify({"message": "Solicitud de soporte recibida y correo enviado exitosamente."}), 200
+        return jsonify({"message": "Solicitud de soporte recibida. El correo al equipo de soporte quedó en cola y se enviará en breve."}), 200
 
     except Exception as e:
-        print(f"ERROR: No se pudo enviar el correo de soporte: {e}", file=sys.stderr)
+        if 'conn' in locals() and conn.open:
+            conn.rollback()
+        print(f"ERROR: No se pudo encolar el correo de soporte: {e}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
         
-        # IMPORTANTE: Si el envío del correo falla, elimina la clave de cooldown
+        # IMPORTANTE: Si el encolado del correo falla, elimina la clave de cooldown
         # para que el usuario pueda intentarlo de nuevo sin esperar el cooldown completo.
         try:
             redis_client.delete(user_cooldown_key)
@@ -204,4 +193,7 @@ def handle_support_request():
         except Exception as redis_err:
             print(f"ADVERTENCIA: Fallo al eliminar la clave de cooldown para {correo} después de un error de envío: {redis_err}", file=sys.stderr)
             
-        return jsonify({"error": "Error interno del servidor al enviar el correo de soporte."}), 500
\ No newline at end of file
+        return jsonify({"error": "Error interno del servidor al enviar el correo de soporte."}), 500
+    finally:
+        if cursor is not None:
+            cursor.close()
\ No newline at end of file
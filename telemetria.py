@@ -0,0 +1,194 @@
+# telemetria.py
+# Buffer de ingesta de los eventos de juego de alta frecuencia (mob derrotado, pergamino encontrado).
+#
+# POST /partidas/eventos no escribe en MySQL: agrupa los eventos de la petición por dificultad y
+# los añade a un stream de Redis (una entrada por dificultad), respondiendo en cuanto Redis los
+# acepta. El comando 'flask --app app partidas volcar-telemetria' lee el stream por lotes, suma
+# los incrementos por (user_id, dificultad_id) y los aplica con un único INSERT ... ON DUPLICATE
+# KEY UPDATE por lote. Miles de eventos se convierten así en una escritura cada pocos segundos.
+#
+# Exactamente una vez: el id de la última entrada aplicada se guarda en telemetria_checkpoint en
+# la misma transacción que los incrementos, y la lectura siguiente empieza justo después de él.
+# Si el proceso muere entre el commit y el XDEL, las entradas ya aplicadas no se vuelven a sumar.
+# El checkpoint se lee con FOR UPDATE, así que varios volcadores en paralelo se turnan.
+#
+#   telemetria:eventos     STREAM {u: user_id, d: dificultad_id, <contador>: incremento, ...}
+#   telemetria:metricas    HASH con los contadores y el retraso del último volcado
+from extensions import mysql, redis_client
+import sys
+import time
+
+STREAM_KEY = "telemetria:eventos"
+METRICAS_KEY = "telemetria:metricas"
+
+# --- Parámetros ---
+TAMANO_LOTE_VOLCADO = 2000
+MAX_EVENTOS_POR_PETICION = 200
+MAX_CANTIDAD_POR_EVENTO = 1000
+MAX_ENTRADAS_PENDIENTES = 200000   # Por encima, la ingesta responde 503 hasta que el volcador se ponga al día
+
+# Tipo de evento -> columna de 'partidas' que incrementa.
+TIPOS_EVENTO = {
+    'mob_derrotado': 'mobs_derrotados',
+    'pergamino_comun': 'pergaminos_comunes',
+    'pergamino_raro': 'pergaminos_raros',
+    'pergamino_epico': 'pergaminos_epicos',
+    'pergamino_legendario': 'pergaminos_legendarios',
+}
+COLUMNAS = tuple(sorted(set(TIPOS_EVENTO.values())))
+
+SQL_INCREMENTAR_PARTIDAS = """
+    INSERT INTO partidas (user_id, dificultad_id, {columnas})
+    VALUES {valores}
+    ON DUPLICATE KEY UPDATE {incrementos}
+""".format(
+    columnas=", ".join(COLUMNAS),
+    valores="{valores}",
+    incrementos=", ".join(f"{columna} = {columna} + VALUES({columna})" for columna in COLUMNAS)
+)
+
+class TelemetriaNoDisponible(Exception):
+    """Redis no está disponible: los eventos no se pueden almacenar."""
+
+class TelemetriaSaturada(Exception):
+    """El stream acumula demasiadas entradas sin volcar; el cliente debe reintentar más tarde."""
+
+def _cliente():
+    if redis_client is None:
+        raise TelemetriaNoDisponible("Redis no está conectado.")
+    return redis_client
+
+def _ms_de_id(entrada_id):
+    """Los ids de un stream empiezan por el instante de inserción en milisegundos."""
+    return int(entrada_id.split('-', 1)[0])
+
+def _siguiente_id(entrada_id):
+    """Menor id estrictamente posterior ('(' exclusivo de XRANGE requiere Redis 6.2)."""
+    ms, secuencia = entrada_id.split('-', 1)
+    return f"{ms}-{int(secuencia) + 1}"
+
+def agrupar_eventos(eventos):
+    """
+    Valida los eventos de una petición y los suma por dificultad.
+    Retorna ({dificultad_id: {columna: incremento}}, total_eventos) o lanza ValueError.
+    """
+    if not isinstance(eventos, list) or not eventos:
+        raise ValueError("'eventos' debe ser una lista no vacía.")
+    if len(eventos) > MAX_EVENTOS_POR_PETICION:
+        raise ValueError(f"Como máximo se aceptan {MAX_EVENTOS_POR_PETICION} eventos por petición.")
+    por_dificultad = {}
+    for evento in eventos:
+        if not isinstance(evento, dict):
+            raise ValueError("Cada evento debe ser un objeto.")
+        columna = TIPOS_EVENTO.get(evento.get('tipo'))
+        if columna is None:
+            raise ValueError(f"Tipo de evento no válido. Tipos admitidos: {', '.join(sorted(TIPOS_EVENTO))}.")
+        dificultad_id = evento.get('dificultad_id')
+        cantidad = evento.get('cantidad', 1)
+        for valor, maximo, nombre in ((dificultad_id, 2 ** 31 - 1, 'dificultad_id'), (cantidad, MAX_CANTIDAD_POR_EVENTO, 'cantidad')):
+            if isinstance(valor, bool) or not isinstance(valor, int) or valor < 1 or valor > maximo:
+                raise ValueError(f"'{nombre}' debe ser un entero entre 1 y {maximo}.")
+        incrementos = por_dificultad.setdefault(dificultad_id, {})
+        incrementos[columna] = incrementos.get(columna, 0) + cantidad
+    return por_dificultad, len(eventos)
+
+def encolar_eventos(user_id, por_dificultad):
+    """Añade al stream una entrada por dificultad con los incrementos ya sumados."""
+    cliente = _cliente()
+    if cliente.xlen(STREAM_KEY) >= MAX_ENTRADAS_PENDIENTES:
+        raise TelemetriaSaturada()
+    pipe = cliente.pipeline(transaction=False)
+    for dificultad_id, incrementos in por_dificultad.items():
+        pipe.xadd(STREAM_KEY, {'u': int(user_id), 'd': int(dificultad_id), **incrementos})
+    pipe.execute()
+
+def volcar_eventos(lote=TAMANO_LOTE_VOLCADO):
+    """
+    Aplica en MySQL hasta 'lote' entradas del stream con un único upsert de incrementos.
+    Retorna (entradas, filas, retraso_ms): entradas leídas, filas (user_id, dificultad_id)
+    escritas y antigüedad de la entrada más antigua del lote al confirmar.
+    """
+    cliente = _cliente()
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute("SELECT ultimo_id FROM telemetria_checkpoint WHERE stream = %s FOR UPDATE", (STREAM_KEY,))
+        fila = cursor.fetchone()
+        if fila is None:
+            cursor.execute("INSERT INTO telemetria_checkpoint (stream, ultimo_id) VALUES (%s, '0-0')", (STREAM_KEY,))
+            ultimo_id = '0-0'
+        else:
+            ultimo_id = fila[0]
+
+        entradas = cliente.xrange(STREAM_KEY, min=_siguiente_id(ultimo_id), count=lote)
+        if not entradas:
+            mysql.connection.commit()
+            return 0, 0, 0
+
+        sumas = {}
+        for _, campos in entradas:
+            acumulado = sumas.setdefault((int(campos['u']), int(campos['d'])), dict.fromkeys(COLUMNAS, 0))
+            for columna in COLUMNAS:
+                acumulado[columna] += int(campos.get(columna, 0))
+
+        # Usuarios eliminados o dificultades inexistentes harían fallar la clave foránea de todo el lote.
+        usuarios = sorted({user_id for user_id, _ in sumas})
+        cursor.execute(f"SELECT id FROM users WHERE id IN ({', '.join(['%s'] * len(usuarios))})", usuarios)
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        cursor.execute("SELECT id FROM dificultades")
+        dificultades = {fila[0] for fila in cursor.fetchall()}
+        filas = [
+            (user_id, dificultad_id, *(acumulado[columna] for columna in COLUMNAS))
+            for (user_id, dificultad_id), acumulado in sumas.items()
+            if user_id in existentes and dificultad_id in dificultades
+        ]
+        if len(filas) < len(sumas):
+            print(f"INFO: telemetria - {len(sumas) - len(filas)} grupos de eventos de usuarios o dificultades inexistentes descartados.", file=sys.stderr)
+
+        if filas:
+            marcadores = "(" + ", ".join(["%s"] * (2 + len(COLUMNAS))) + ")"
+            cursor.execute(
+                SQL_INCREMENTAR_PARTIDAS.format(valores=", ".join([marcadores] * len(filas))),
+                [valor for fila in filas for valor in fila]
+            )
+        cursor.execute(
+            "UPDATE telemetria_checkpoint SET ultimo_id = %s WHERE stream = %s",
+            (entradas[-1][0], STREAM_KEY)
+        )
+        mysql.connection.commit()
+    except Exception:
+        mysql.connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    ahora_ms = int(time.time() * 1000)
+    retraso_ms = max(ahora_ms - _ms_de_id(entradas[0][0]), 0)
+    try:
+        pipe = cliente.pipeline(transaction=False)
+        # Ya aplicadas (el checkpoint evita repetirlas aunque este XDEL fallara).
+        pipe.xdel(STREAM_KEY, *[entrada_id for entrada_id, _ in entradas])
+        pipe.hincrby(METRICAS_KEY, 'volcados', 1)
+        pipe.hincrby(METRICAS_KEY, 'entradas_volcadas', len(entradas))
+        pipe.hincrby(METRICAS_KEY, 'filas_escritas', len(filas))
+        pipe.hset(METRICAS_KEY, mapping={'ultimo_volcado_ms': ahora_ms, 'ultimo_retraso_ms': retraso_ms})
+        pipe.execute()
+    except Exception as e:
+        print(f"ERROR: telemetria.volcar_eventos - Fallo al limpiar el stream tras el volcado: {e}", file=sys.stderr)
+    return len(entradas), len(filas), retraso_ms
+
+def obtener_metricas():
+    """
+    Estado del buffer: entradas pendientes, antigüedad de la más antigua (retraso actual del
+    volcado) y los contadores acumulados de los volcados.
+    """
+    cliente = _cliente()
+    pipe = cliente.pipeline(transaction=False)
+    pipe.xlen(STREAM_KEY)
+    pipe.xrange(STREAM_KEY, count=1)
+    pipe.hgetall(METRICAS_KEY)
+    pendientes, primera, metricas = pipe.execute()
+    metricas = {clave: int(valor) for clave, valor in metricas.items()}
+    metricas['entradas_pendientes'] = pendientes
+    # Puede incluir entradas ya aplicadas cuyo XDEL falló; es una cota superior del retraso.
+    metricas['retraso_actual_ms'] = max(int(time.time() * 1000) - _ms_de_id(primera[0][0]), 0) if primera else 0
+    return metricas
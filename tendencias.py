@@ -0,0 +1,179 @@
+# tendencias.py
+# Ranking "hot" de publicaciones mantenido de forma incremental en un sorted set de Redis.
+#
+# Cada evento (publicación creada, comentario, imagen) suma  peso * 2^((t - epoca) / VIDA_MEDIA)
+# a la puntuación de la publicación. Hacer crecer el valor de los eventos nuevos es equivalente
+# a hacer decaer los antiguos, pero no obliga a recalcular todo el set en cada petición.
+# Para que los exponentes no crezcan sin límite, decaer_tendencias() reescala periódicamente
+# todas las puntuaciones (ZUNIONSTORE con WEIGHTS) y mueve la época al instante actual. Si ese
+# trabajo deja de ejecutarse, el script de incremento hace el mismo reescalado en cuanto el
+# exponente supera MAX_VIDAS_MEDIAS_EPOCA, antes de perder precisión o desbordar el float.
+from extensions import mysql, redis_client
+import sys
+import time
+
+HOT_KEY = "publicaciones:hot"
+EPOCA_KEY = "publicaciones:hot:epoca"
+
+# --- Parámetros del ranking ---
+VIDA_MEDIA_SEGUNDOS = 12 * 3600   # Cada 12 horas la contribución de un evento se reduce a la mitad
+MAX_PUBLICACIONES_HOT = 1000      # El set se recorta a las N publicaciones con mayor puntuación
+PUNTUACION_MINIMA = 1e-6          # Puntuaciones despreciables que se eliminan al decaer
+VENTANA_RECONSTRUCCION_DIAS = 7   # Eventos más antiguos aportan menos de 2^-14 y se ignoran
+MAX_VIDAS_MEDIAS_EPOCA = 20       # Con la época más atrasada (2^20), el incremento reescala el set
+
+PESO_PUBLICACION = 3.0
+PESO_COMENTARIO = 1.0
+PESO_IMAGEN = 0.5
+
+# Script atómico: lee la época (o la inicializa), suma la contribución del evento y recorta el set.
+# Si la época se ha quedado demasiado atrás (decaer_tendencias no se ejecuta), reescala el set y
+# la mueve al instante actual antes de sumar; en ese caso retorna 2 en lugar de 1.
+# KEYS: [zset, epoca]  ARGV: [miembro, peso, ahora, vida_media, maximo, max_vidas_medias, puntuacion_minima]
+_LUA_REGISTRAR_EVENTO = """
+local epoca = tonumber(redis.call('GET', KEYS[2]))
+local ahora = tonumber(ARGV[3])
+local vida_media = tonumber(ARGV[4])
+local resultado = 1
+if not epoca then
+    epoca = ahora
+    redis.call('SET', KEYS[2], ARGV[3])
+elseif (ahora - epoca) / vida_media > tonumber(ARGV[6]) then
+    local factor = math.pow(2, -(ahora - epoca) / vida_media)
+    redis.call('ZUNIONSTORE', KEYS[1], 1, KEYS[1], 'WEIGHTS', factor)
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[7])
+    epoca = ahora
+    redis.call('SET', KEYS[2], ARGV[3])
+    resultado = 2
+end
+local incremento = tonumber(ARGV[2]) * math.pow(2, (ahora - epoca) / vida_media)
+redis.call('ZINCRBY', KEYS[1], incremento, ARGV[1])
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(tonumber(ARGV[5]) + 1))
+return resultado
+"""
+
+# Script atómico: reescala todas las puntuaciones a la nueva época y recorta el set.
+# KEYS: [zset, epoca]  ARGV: [ahora, vida_media, maximo, puntuacion_minima]
+_LUA_DECAER = """
+local epoca = tonumber(redis.call('GET', KEYS[2]))
+local ahora = tonumber(ARGV[1])
+if epoca and ahora > epoca then
+    local factor = math.pow(2, -(ahora - epoca) / tonumber(ARGV[2]))
+    redis.call('ZUNIONSTORE', KEYS[1], 1, KEYS[1], 'WEIGHTS', factor)
+end
+redis.call('SET', KEYS[2], ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[4])
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(tonumber(ARGV[3]) + 1))
+return redis.call('ZCARD', KEYS[1])
+"""
+
+def contribucion(peso, instante, epoca):
+    """
+    Lo que suma a la puntuación un evento de peso 'peso' ocurrido en 'instante' (segundos UNIX),
+    relativo a la época del set. Misma fórmula que _LUA_REGISTRAR_EVENTO y reconstruir_tendencias.
+    """
+    return peso * 2 ** ((instante - epoca) / VIDA_MEDIA_SEGUNDOS)
+
+_scripts = {}
+
+def _script(nombre, codigo):
+    """Registra el script Lua una sola vez por proceso (redis-py usa EVALSHA y recarga si hace falta)."""
+    if nombre not in _scripts:
+        _scripts[nombre] = redis_client.register_script(codigo)
+    return _scripts[nombre]
+
+def registrar_evento(publicacion_id, peso):
+    """
+    Suma la contribución de un evento a la puntuación hot de la publicación.
+    Los fallos de Redis se registran pero no interrumpen la escritura que originó el evento.
+    """
+    if redis_client is None:
+        return
+    try:
+        resultado = _script('evento', _LUA_REGISTRAR_EVENTO)(
+            keys=[HOT_KEY, EPOCA_KEY],
+            args=[publicacion_id, peso, time.time(), VIDA_MEDIA_SEGUNDOS, MAX_PUBLICACIONES_HOT,
+                  MAX_VIDAS_MEDIAS_EPOCA, PUNTUACION_MINIMA]
+        )
+        if resultado == 2:
+            print("ADVERTENCIA: tendencias.registrar_evento - La época del ranking hot estaba demasiado atrasada "
+                  "y se reescaló al registrar un evento. ¿Se está ejecutando 'flask --app app user decaer-tendencias'?",
+                  file=sys.stderr)
+    except Exception as e:
+        print(f"ERROR: tendencias.registrar_evento - Fallo al registrar evento de la publicación {publicacion_id}: {e}", file=sys.stderr)
+
+def eliminar_publicacion(publicacion_id):
+    """Quita una publicación eliminada del ranking."""
+    if redis_client is None:
+        return
+    try:
+        redis_client.zrem(HOT_KEY, publicacion_id)
+    except Exception as e:
+        print(f"ERROR: tendencias.eliminar_publicacion - Fallo al quitar la publicación {publicacion_id}: {e}", file=sys.stderr)
+
+def obtener_ids_hot(limite):
+    """Retorna los ids de las publicaciones con mayor puntuación, o None si Redis no está disponible."""
+    if redis_client is None:
+        return None
+    try:
+        return [int(miembro) for miembro in redis_client.zrevrange(HOT_KEY, 0, limite - 1)]
+    except Exception as e:
+        print(f"ERROR: tendencias.obtener_ids_hot - Fallo al leer el ranking: {e}", file=sys.stderr)
+        return None
+
+def decaer_tendencias():
+    """Trabajo periódico: reescala las puntuaciones a la época actual y mantiene el set acotado."""
+    if redis_client is None:
+        raise RuntimeError("Redis no está conectado.")
+    total = _script('decaer', _LUA_DECAER)(
+        keys=[HOT_KEY, EPOCA_KEY],
+        args=[time.time(), VIDA_MEDIA_SEGUNDOS, MAX_PUBLICACIONES_HOT, PUNTUACION_MINIMA]
+    )
+    return total
+
+def reconstruir_tendencias():
+    """
+    Reconstruye el ranking desde MySQL (arranque en frío o tras perder Redis).
+    Solo recorre publicaciones y comentarios de la ventana reciente y sustituye el set
+    de forma atómica con RENAME.
+    """
+    if redis_client is None:
+        raise RuntimeError("Redis no está conectado.")
+    ahora = time.time()
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT
+                p.id,
+                (%s + %s * p.cantidad_imagenes) * POW(2, (UNIX_TIMESTAMP(p.created_at) - %s) / %s)
+                    + COALESCE(c.puntos, 0) AS puntuacion
+            FROM publicaciones p
+            LEFT JOIN (
+                SELECT publicacion_id, SUM(%s * POW(2, (UNIX_TIMESTAMP(created_at) - %s) / %s)) AS puntos
+                FROM comentarios
+                WHERE created_at >= NOW() - INTERVAL {VENTANA_RECONSTRUCCION_DIAS} DAY
+                GROUP BY publicacion_id
+            ) c ON c.publicacion_id = p.id
+            WHERE p.created_at >= NOW() - INTERVAL {VENTANA_RECONSTRUCCION_DIAS} DAY OR c.puntos IS NOT NULL
+            ORDER BY puntuacion DESC
+            LIMIT %s
+        """, (
+            PESO_PUBLICACION, PESO_IMAGEN, ahora, VIDA_MEDIA_SEGUNDOS,
+            PESO_COMENTARIO, ahora, VIDA_MEDIA_SEGUNDOS,
+            MAX_PUBLICACIONES_HOT
+        ))
+        filas = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    clave_temporal = f"{HOT_KEY}:reconstruccion"
+    pipe = redis_client.pipeline()
+    pipe.delete(clave_temporal)
+    if filas:
+        pipe.zadd(clave_temporal, {str(publicacion_id): float(puntuacion) for publicacion_id, puntuacion in filas})
+        pipe.rename(clave_temporal, HOT_KEY)
+    else:
+        pipe.delete(HOT_KEY)
+    pipe.set(EPOCA_KEY, ahora)
+    pipe.execute()
+    return len(filas)
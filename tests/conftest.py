@@ -0,0 +1,235 @@
+# Utilidades compartidas por las pruebas: una aplicación Flask mínima, una conexión MySQL
+# simulada y un Redis en memoria.
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+
+@pytest.fixture
+def app():
+    """Aplicación sin extensiones: basta para current_app.json, jsonify y stream_with_context."""
+    return Flask(__name__)
+
+
+class CursorSimulado:
+    """
+    Cursor que registra las sentencias ejecutadas. 'rowcounts' asocia el comienzo de una
+    sentencia (p. ej. 'UPDATE publicaciones') con su rowcount y 'filas' hace lo mismo con
+    lo que devuelven fetchall/fetchone/fetchmany.
+    """
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+        self.rowcount = 0
+        self.lastrowid = 0
+        self._pendientes = []
+        self.cerrado = False
+
+    def _buscar(self, tabla, sentencia, defecto):
+        for prefijo, valor in tabla.items():
+            if sentencia.startswith(prefijo):
+                return valor
+        return defecto
+
+    def execute(self, sentencia, parametros=None):
+        sentencia = ' '.join(sentencia.split())
+        self._conexion.sentencias.append((sentencia, parametros))
+        error = self._buscar(self._conexion.errores, sentencia, None)
+        if error is not None:
+            raise error
+        self.rowcount = self._buscar(self._conexion.rowcounts, sentencia, 1)
+        self.lastrowid = self._buscar(self._conexion.lastrowids, sentencia, 0)
+        # Copias: el código formatea las filas de DictCursor en el sitio.
+        filas = self._buscar(self._conexion.filas, sentencia, [])
+        self._pendientes = [dict(fila) if isinstance(fila, dict) else fila for fila in filas]
+
+    def fetchall(self):
+        filas, self._pendientes = self._pendientes, []
+        return filas
+
+    def fetchone(self):
+        return self._pendientes.pop(0) if self._pendientes else None
+
+    def fetchmany(self, cantidad):
+        filas, self._pendientes = self._pendientes[:cantidad], self._pendientes[cantidad:]
+        return filas
+
+    def close(self):
+        self.cerrado = True
+
+
+class ConexionSimulada:
+    def __init__(self):
+        self.sentencias = []
+        self.rowcounts = {}
+        self.lastrowids = {}
+        self.filas = {}
+        self.errores = {}
+        self.cursores = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.open = True
+
+    def cursor(self, clase=None):
+        cursor = CursorSimulado(self)
+        self.cursores.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def conexion():
+    return ConexionSimulada()
+
+
+@pytest.fixture
+def mysql_simulado(monkeypatch, conexion):
+    """Sustituye la extensión MySQL de routes.user por la conexión simulada."""
+    import routes.user
+    monkeypatch.setattr(routes.user, 'mysql', SimpleNamespace(connection=conexion))
+    return conexion
+
+
+class RedisSimulado:
+    """
+    Subconjunto en memoria de redis-py (decode_responses=True) con los comandos que usan
+    cache.py y compañía. Los TTL se guardan pero no expiran; 'fallar' hace que todo lance.
+    """
+
+    def __init__(self):
+        self.datos = {}
+        self.ttls = {}
+        self.comandos = []
+        self.fallar = False
+
+    def _registrar(self, comando):
+        if self.fallar:
+            raise ConnectionError("Redis no disponible")
+        self.comandos.append(comando)
+
+    def get(self, clave):
+        self._registrar('GET')
+        return self.datos.get(clave)
+
+    def mget(self, claves):
+        self._registrar('MGET')
+        return [self.datos.get(clave) for clave in claves]
+
+    def set(self, clave, valor, nx=False, ex=None):
+        self._registrar('SET')
+        if nx and clave in self.datos:
+            return None
+        self.datos[clave] = str(valor)
+        self.ttls.pop(clave, None)
+        if ex is not None:
+            self.ttls[clave] = ex
+        return True
+
+    def incr(self, clave):
+        self._registrar('INCR')
+        self.datos[clave] = str(int(self.datos.get(clave, 0)) + 1)
+        return int(self.datos[clave])
+
+    def delete(self, *claves):
+        self._registrar('DEL')
+        for clave in claves:
+            self.ttls.pop(clave, None)
+        return sum(self.datos.pop(clave, None) is not None for clave in claves)
+
+    def expire(self, clave, segundos):
+        self._registrar('EXPIRE')
+        self.ttls[clave] = segundos
+        return clave in self.datos
+
+    def ttl(self, clave):
+        self._registrar('TTL')
+        if clave not in self.datos:
+            return -2
+        return self.ttls.get(clave, -1)
+
+    def hset(self, clave, campo=None, valor=None, mapping=None):
+        self._registrar('HSET')
+        hash_ = self.datos.setdefault(clave, {})
+        if campo is not None:
+            hash_[campo] = str(valor)
+        for c, v in (mapping or {}).items():
+            hash_[c] = str(v)
+
+    def hmget(self, clave, campos):
+        self._registrar('HMGET')
+        hash_ = self.datos.get(clave, {})
+        return [hash_.get(campo) for campo in campos]
+
+    def hincrby(self, clave, campo, incremento=1):
+        self._registrar('HINCRBY')
+        hash_ = self.datos.setdefault(clave, {})
+        hash_[campo] = str(int(hash_.get(campo, 0)) + incremento)
+        return int(hash_[campo])
+
+    def hgetall(self, clave):
+        self._registrar('HGETALL')
+        return dict(self.datos.get(clave, {}))
+
+    # Streams: lista de (id, campos) con ids 'ms-secuencia' del reloj real.
+    def xadd(self, clave, campos):
+        self._registrar('XADD')
+        entradas = self.datos.setdefault(clave, [])
+        ms = int(time.time() * 1000)
+        if entradas:
+            ultimo_ms, ultima_secuencia = map(int, entradas[-1][0].split('-'))
+            ms = max(ms, ultimo_ms)
+        secuencia = ultima_secuencia + 1 if entradas and ms == ultimo_ms else 0
+        entrada_id = f"{ms}-{secuencia}"
+        entradas.append((entrada_id, {c: str(v) for c, v in campos.items()}))
+        return entrada_id
+
+    def xlen(self, clave):
+        self._registrar('XLEN')
+        return len(self.datos.get(clave, []))
+
+    def xrange(self, clave, min='-', max='+', count=None):
+        self._registrar('XRANGE')
+        def orden(entrada_id):
+            return tuple(map(int, entrada_id.split('-')))
+        entradas = [
+            (entrada_id, dict(campos)) for entrada_id, campos in self.datos.get(clave, [])
+            if min == '-' or orden(entrada_id) >= orden(min)
+        ]
+        return entradas[:count] if count is not None else entradas
+
+    def xdel(self, clave, *ids):
+        self._registrar('XDEL')
+        antes = self.datos.get(clave, [])
+        self.datos[clave] = [(entrada_id, campos) for entrada_id, campos in antes if entrada_id not in ids]
+        return len(antes) - len(self.datos[clave])
+
+    def pipeline(self, transaction=True):
+        return _PipelineSimulado(self)
+
+
+class _PipelineSimulado:
+    def __init__(self, redis):
+        self._redis = redis
+        self._llamadas = []
+
+    def __getattr__(self, comando):
+        def encolar(*args, **kwargs):
+            self._llamadas.append((comando, args, kwargs))
+            return self
+        return encolar
+
+    def execute(self):
+        llamadas, self._llamadas = self._llamadas, []
+        return [getattr(self._redis, comando)(*args, **kwargs) for comando, args, kwargs in llamadas]
+
+
+@pytest.fixture
+def redis_simulado():
+    return RedisSimulado()
@@ -0,0 +1,66 @@
+# Pruebas de la búsqueda de publicaciones: fragmento resaltado y validación de parámetros.
+from datetime import datetime
+
+import pytest
+
+import routes.user
+from routes.user import LONGITUD_FRAGMENTO, _generar_fragmento
+
+
+def test_marca_los_terminos_sin_distinguir_mayusculas():
+    assert _generar_fragmento('Un Dragón y otro dragón', ['dragón']) == 'Un <mark>Dragón</mark> y otro <mark>dragón</mark>'
+
+
+def test_escapa_el_html_del_texto():
+    fragmento = _generar_fragmento('<script>alert(1)</script> magia', ['magia'])
+    assert '<script>' not in fragmento
+    assert fragmento == '&lt;script&gt;alert(1)&lt;/script&gt; <mark>magia</mark>'
+
+
+def test_terminos_con_caracteres_especiales_de_regex():
+    assert _generar_fragmento('precio (oferta) hoy', ['(oferta)']) == 'precio <mark>(oferta)</mark> hoy'
+
+
+def test_fragmento_centrado_en_la_primera_coincidencia():
+    texto = ' '.join(['relleno'] * 100) + ' objetivo ' + ' '.join(['cola'] * 100)
+    fragmento = _generar_fragmento(texto, ['objetivo'])
+    assert fragmento.startswith('…relleno')
+    assert fragmento.endswith('…')
+    assert '<mark>objetivo</mark>' in fragmento
+    assert len(fragmento.replace('<mark>', '').replace('</mark>', '')) <= LONGITUD_FRAGMENTO + 2
+
+
+def test_sin_coincidencia_devuelve_el_comienzo():
+    texto = 'a ' * LONGITUD_FRAGMENTO
+    fragmento = _generar_fragmento(texto, ['zzz'])
+    assert not fragmento.startswith('…')
+    assert fragmento.endswith('…')
+
+
+@pytest.mark.parametrize('url', [
+    '/publicaciones/buscar?q=ab',
+    '/publicaciones/buscar?q=' + 'a' * 101,
+    '/publicaciones/buscar?q=dragon&page=0',
+    '/publicaciones/buscar?q=dragon&page=51',
+    '/publicaciones/buscar?q=dragon&limit=x',
+])
+def test_parametros_invalidos_devuelven_400_sin_consultar(app, mysql_simulado, url):
+    with app.test_request_context(url):
+        _, status = routes.user.buscar_publicaciones()
+    assert status == 400
+    assert mysql_simulado.sentencias == []
+
+
+def test_paginacion_por_relevancia(app, monkeypatch, mysql_simulado):
+    monkeypatch.setattr(routes.user, 'obtener_version', lambda recurso: None)
+    mysql_simulado.filas['SELECT'] = [
+        {'id': i, 'titulo': 't', 'texto': 'un dragon', 'relevancia': 1.0 / i, 'created_at': datetime(2024, 5, 1)}
+        for i in range(1, 4)
+    ]
+    with app.test_request_context('/publicaciones/buscar?q=dragon&limit=2&page=2'):
+        cuerpo = routes.user.buscar_publicaciones().get_json()
+    _, parametros = mysql_simulado.sentencias[0]
+    assert parametros == ('dragon', 'dragon', 3, 2)
+    assert [r['id'] for r in cuerpo['resultados']] == [1, 2]
+    assert cuerpo['resultados'][0]['fragmento'] == 'un <mark>dragon</mark>'
+    assert cuerpo['next_page'] == 3
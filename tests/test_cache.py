@@ -0,0 +1,162 @@
+# Pruebas de las claves, ETags y entradas versionadas de cache.py.
+import pytest
+
+import cache
+from cache import clave_cache, generar_etag, recurso_comentarios, recurso_perfil, recurso_publicacion
+
+
+def test_etag_sin_version_es_none():
+    # Sin Redis no hay versión: la respuesta se sirve sin ETag.
+    assert generar_etag('feed', None) is None
+
+
+def test_etag_incluye_recurso_version_y_variante():
+    assert generar_etag('feed', '17') == 'feed-v17'
+    assert generar_etag('feed', '17', 'summary', 20) == 'feed-v17-summary:20'
+
+
+def test_etag_cambia_con_la_version():
+    assert generar_etag('feed', '17', 'full') != generar_etag('feed', '18', 'full')
+
+
+def test_etag_distingue_variantes_del_mismo_recurso():
+    assert generar_etag('feed', '17', 'full') != generar_etag('feed', '17', 'summary')
+
+
+def test_clave_cache_versionada():
+    assert clave_cache(recurso_comentarios(5), '3', 'full') == 'cache:comentarios:5:v3:full'
+    assert clave_cache(recurso_comentarios(5), '4', 'full') != clave_cache(recurso_comentarios(5), '3', 'full')
+
+
+def test_recursos_por_id_no_colisionan():
+    recursos = {recurso_comentarios(1), recurso_perfil(1), recurso_publicacion(1)}
+    assert len(recursos) == 3
+
+
+# --- Versiones y entradas en Redis (con el Redis en memoria de conftest) ---
+
+@pytest.fixture
+def redis_cache(monkeypatch, redis_simulado):
+    monkeypatch.setattr(cache, 'redis_client', redis_simulado)
+    return redis_simulado
+
+
+def test_sin_redis_la_cache_no_interviene(monkeypatch):
+    monkeypatch.setattr(cache, 'redis_client', None)
+    assert cache.obtener_version('feed') is None
+    assert cache.obtener_cache('cache:feed:v1:x') is None
+    assert cache.obtener_cache_multiple(['a', 'b']) == [None, None]
+    cache.guardar_cache('cache:feed:v1:x', '[]', 60)
+    cache.incrementar_version('feed')
+
+
+def test_version_inicial_es_estable(redis_cache):
+    version = cache.obtener_version('feed')
+    assert version is not None
+    assert cache.obtener_version('feed') == version
+
+
+def test_incrementar_version_deja_huerfanas_las_entradas(redis_cache):
+    version = cache.obtener_version('feed')
+    clave = clave_cache('feed', version, 'full', 20)
+    cache.guardar_cache(clave, '[1]', cache.TTL_FEED_SECONDS)
+    assert cache.obtener_cache(clave) == '[1]'
+    assert redis_cache.ttls[clave] == cache.TTL_FEED_SECONDS
+
+    cache.incrementar_version('feed', recurso_comentarios(5))
+    nueva = cache.obtener_version('feed')
+    assert nueva != version
+    assert cache.obtener_cache(clave_cache('feed', nueva, 'full', 20)) is None
+    # Sin KEYS/SCAN ni DEL: la entrada vieja sigue ahí hasta que expire.
+    assert 'DEL' not in redis_cache.comandos
+
+
+def test_obtener_versiones_inicializa_las_que_faltan(redis_cache):
+    redis_cache.set('version:publicacion:1', 7)
+    versiones = cache.obtener_versiones([recurso_publicacion(1), recurso_publicacion(2)])
+    assert versiones[0] == '7'
+    assert versiones[1] is not None
+    assert cache.obtener_version(recurso_publicacion(2)) == versiones[1]
+
+
+def test_entradas_multiples_en_un_pipeline(redis_cache):
+    cache.guardar_cache_multiple({'a': '1', 'b': '2'}, 30)
+    assert cache.obtener_cache_multiple(['a', 'x', 'b']) == ['1', None, '2']
+    assert redis_cache.ttls == {'a': 30, 'b': 30}
+
+
+def test_fallo_de_redis_se_trata_como_fallo_de_cache(redis_cache):
+    redis_cache.fallar = True
+    assert cache.obtener_version('feed') is None
+    assert cache.obtener_versiones(['feed']) is None
+    assert cache.obtener_cache('a') is None
+    assert cache.obtener_cache_multiple(['a']) == [None]
+    cache.guardar_cache('a', '1', 30)
+    cache.incrementar_version('feed')
+
+
+# --- Caché del feed en la ruta GET /publicaciones ---
+
+def fila_feed(publicacion_id):
+    from datetime import datetime
+    return {
+        'id': publicacion_id, 'autor_id': 1, 'author': 'ana', 'title': f"t{publicacion_id}",
+        'content': 'x', 'created_at': datetime(2024, 5, 1, 12, 0, publicacion_id),
+        'cantidad_comentarios': 0, 'all_image_urls': None
+    }
+
+
+def pedir_feed(app, url='/publicaciones?limit=2'):
+    import routes.user
+    with app.test_request_context(url):
+        respuesta = routes.user.publicaciones()
+        return respuesta.get_json()
+
+
+def test_feed_se_sirve_desde_cache_hasta_que_cambia_la_version(app, redis_cache, mysql_simulado):
+    mysql_simulado.filas['SELECT'] = [fila_feed(3), fila_feed(2), fila_feed(1)]
+    primera = pedir_feed(app)
+    assert [p['id'] for p in primera['publicaciones']] == [3, 2]
+    assert len(mysql_simulado.cursores) == 1
+
+    assert pedir_feed(app) == primera
+    assert len(mysql_simulado.cursores) == 1
+
+    # Una escritura (p. ej. crear_publicacion) invalida todas las páginas del feed.
+    cache.incrementar_version(cache.RECURSO_FEED)
+    mysql_simulado.filas['SELECT'] = [fila_feed(4), fila_feed(3), fila_feed(2)]
+    assert [p['id'] for p in pedir_feed(app)['publicaciones']] == [4, 3]
+    assert len(mysql_simulado.cursores) == 2
+
+
+def test_feed_sin_redis_consulta_siempre_mysql(app, monkeypatch, mysql_simulado):
+    monkeypatch.setattr(cache, 'redis_client', None)
+    mysql_simulado.filas['SELECT'] = [fila_feed(1)]
+    pedir_feed(app)
+    pedir_feed(app)
+    assert len(mysql_simulado.cursores) == 2
+
+
+def test_feed_responde_304_con_el_etag_vigente(app, redis_cache, mysql_simulado):
+    import routes.user
+    mysql_simulado.filas['SELECT'] = [fila_feed(1)]
+    with app.test_request_context('/publicaciones?limit=2'):
+        etag = routes.user.publicaciones().headers['ETag']
+    with app.test_request_context('/publicaciones?limit=2', headers={'If-None-Match': etag}):
+        assert routes.user.publicaciones().status_code == 304
+    assert len(mysql_simulado.cursores) == 1
+
+
+def test_cursor_no_canonico_comparte_etag_con_el_canonico(app, redis_cache, mysql_simulado):
+    import routes.user
+    from utils import codificar_cursor
+    mysql_simulado.filas['SELECT'] = [fila_feed(1)]
+    canonico = codificar_cursor(fila_feed(2)['created_at'], 2)
+    etags = []
+    # Relleno y comillas sobrantes: antes llegaban tal cual al ETag y set_etag fallaba con 500.
+    for cursor in (canonico, canonico + '""""'):
+        with app.test_request_context('/publicaciones', query_string={'limit': 2, 'cursor': cursor}):
+            respuesta = routes.user.publicaciones()
+            assert respuesta.status_code == 200
+            etags.append(respuesta.headers['ETag'])
+    assert etags[0] == etags[1]
@@ -0,0 +1,65 @@
+# Pruebas del cálculo de periodos de las clasificaciones por ventana (UTC).
+from datetime import datetime, timezone
+
+import pytest
+
+from clasificacion import periodo_actual, periodo_valido
+
+
+def utc(*partes):
+    return datetime(*partes, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize('ahora, periodo, cierre', [
+    (utc(2025, 6, 30, 0, 0, 0), '2025-06-30', utc(2025, 7, 1)),
+    (utc(2025, 6, 30, 23, 59, 59), '2025-06-30', utc(2025, 7, 1)),
+    (utc(2025, 12, 31, 12), '2025-12-31', utc(2026, 1, 1)),
+])
+def test_periodo_diario(ahora, periodo, cierre):
+    assert periodo_actual('diaria', ahora) == (periodo, cierre)
+
+
+@pytest.mark.parametrize('ahora, periodo, cierre', [
+    (utc(2025, 6, 30, 8), '2025-W27', utc(2025, 7, 7)),      # lunes
+    (utc(2025, 7, 6, 23, 59), '2025-W27', utc(2025, 7, 7)),  # domingo de la misma semana
+    (utc(2024, 12, 30, 10), '2025-W01', utc(2025, 1, 6)),    # la semana ISO 1 de 2025 empieza en 2024
+    (utc(2021, 1, 2, 10), '2020-W53', utc(2021, 1, 4)),
+])
+def test_periodo_semanal_iso(ahora, periodo, cierre):
+    assert periodo_actual('semanal', ahora) == (periodo, cierre)
+
+
+@pytest.mark.parametrize('ahora, periodo, cierre', [
+    (utc(2025, 1, 1), '2025-T1', utc(2025, 4, 1)),
+    (utc(2025, 6, 30, 23, 59), '2025-T2', utc(2025, 7, 1)),
+    (utc(2025, 7, 1), '2025-T3', utc(2025, 10, 1)),
+    (utc(2025, 11, 15), '2025-T4', utc(2026, 1, 1)),
+])
+def test_periodo_temporada(ahora, periodo, cierre):
+    assert periodo_actual('temporada', ahora) == (periodo, cierre)
+
+
+@pytest.mark.parametrize('ventana', ['diaria', 'semanal', 'temporada'])
+def test_el_cierre_es_posterior_y_el_periodo_valido(ventana):
+    ahora = utc(2025, 3, 31, 23, 59, 59)
+    periodo, cierre = periodo_actual(ventana, ahora)
+    assert cierre > ahora
+    assert periodo_valido(ventana, periodo)
+
+
+def test_ventana_desconocida():
+    with pytest.raises(ValueError):
+        periodo_actual('mensual', utc(2025, 1, 1))
+
+
+@pytest.mark.parametrize('ventana, periodo, esperado', [
+    ('diaria', '2025-06-30', True),
+    ('diaria', '2025-W27', False),
+    ('semanal', '2025-W27', True),
+    ('temporada', '2025-T3', True),
+    ('temporada', '2025-T5', False),
+    ('mensual', '2025-06', False),
+    ('diaria', None, False),
+])
+def test_periodo_valido(ventana, periodo, esperado):
+    assert periodo_valido(ventana, periodo) is esperado
@@ -0,0 +1,90 @@
+# Pruebas de los códigos de verificación y restablecimiento guardados en Redis con TTL.
+import pytest
+
+import codigos
+from codigos import CodigosNoDisponibles, DemasiadosIntentos
+
+
+@pytest.fixture
+def redis_codigos(monkeypatch, redis_simulado):
+    monkeypatch.setattr(codigos, 'redis_client', redis_simulado)
+    return redis_simulado
+
+
+def test_codigo_de_seis_digitos():
+    for _ in range(50):
+        codigo = codigos._generar_codigo()
+        assert len(codigo) == 6 and codigo.isdigit()
+
+
+def test_sin_redis_no_se_emiten_codigos(monkeypatch):
+    monkeypatch.setattr(codigos, 'redis_client', None)
+    with pytest.raises(CodigosNoDisponibles):
+        codigos.emitir_codigo_verificacion('ana@example.com')
+    # Anular es best effort: el código caducará por TTL.
+    codigos.anular_codigo_verificacion('ana@example.com')
+
+
+def test_codigo_de_verificacion_sustituye_al_anterior(redis_codigos):
+    codigos.emitir_codigo_verificacion('Ana@Example.com')
+    codigo = codigos.emitir_codigo_verificacion('ana@example.com ')
+    clave = 'codigo:verificacion:ana@example.com'
+    assert redis_codigos.datos[clave] == {'codigo': codigo, 'intentos': '0'}
+    assert redis_codigos.ttls[clave] == codigos.TTL_VERIFICACION_SEGUNDOS
+    codigos.anular_codigo_verificacion('ANA@example.com')
+    assert clave not in redis_codigos.datos
+
+
+def test_codigo_de_reset_anula_el_anterior(redis_codigos, monkeypatch):
+    generados = iter(['111111', '222222'])
+    monkeypatch.setattr(codigos, '_generar_codigo', lambda: next(generados))
+    codigos.emitir_codigo_reset('ana@example.com')
+    codigos.emitir_codigo_reset('Ana@example.com')
+    assert codigos.buscar_email_por_codigo_reset('222222', '10.0.0.1') == 'ana@example.com'
+    assert codigos.buscar_email_por_codigo_reset('111111', '10.0.0.1') is None
+    assert redis_codigos.ttls['codigo:reset:222222'] == codigos.TTL_RESET_SEGUNDOS
+
+
+def test_codigo_de_reset_repetido_se_regenera(redis_codigos, monkeypatch):
+    redis_codigos.set('codigo:reset:111111', 'otra@example.com')
+    generados = iter(['111111', '333333'])
+    monkeypatch.setattr(codigos, '_generar_codigo', lambda: next(generados))
+    assert codigos.emitir_codigo_reset('ana@example.com') == '333333'
+    assert redis_codigos.datos['codigo:reset:111111'] == 'otra@example.com'
+
+
+def test_codigos_de_reset_invalidos_limitan_la_ip(redis_codigos):
+    for _ in range(codigos.MAX_FALLOS_RESET_IP):
+        assert codigos.buscar_email_por_codigo_reset('000000', '10.0.0.1') is None
+    assert redis_codigos.ttls['codigo:reset:fallos_ip:10.0.0.1'] == codigos.VENTANA_FALLOS_RESET_SEGUNDOS
+    with pytest.raises(DemasiadosIntentos) as excinfo:
+        codigos.buscar_email_por_codigo_reset('000000', '10.0.0.1')
+    assert excinfo.value.espera == codigos.VENTANA_FALLOS_RESET_SEGUNDOS
+    # Otra IP no se ve afectada.
+    assert codigos.buscar_email_por_codigo_reset('000000', '10.0.0.2') is None
+
+
+def test_codigo_de_reset_solo_admite_digitos(redis_codigos):
+    codigos.emitir_codigo_reset('ana@example.com')
+    # 'email:<email>' apunta a otra clave del mismo prefijo y no debe resolverse.
+    assert codigos.buscar_email_por_codigo_reset('email:ana@example.com', '10.0.0.1') is None
+
+
+def test_reenvio_una_vez_por_email_y_espera(redis_codigos):
+    codigos.reservar_reenvio_verificacion('ana@example.com', '10.0.0.1')
+    with pytest.raises(DemasiadosIntentos) as excinfo:
+        codigos.reservar_reenvio_verificacion('ANA@example.com', '10.0.0.2')
+    assert excinfo.value.espera == codigos.ESPERA_REENVIO_SEGUNDOS
+
+
+def test_reenvios_limitados_por_ip(redis_codigos):
+    for i in range(codigos.MAX_REENVIOS_IP):
+        codigos.reservar_reenvio_verificacion(f'u{i}@example.com', '10.0.0.1')
+    with pytest.raises(DemasiadosIntentos) as excinfo:
+        codigos.reservar_reenvio_verificacion('otro@example.com', '10.0.0.1')
+    assert excinfo.value.espera == codigos.VENTANA_REENVIOS_IP_SEGUNDOS
+
+
+def test_espera_minima_de_un_segundo():
+    assert DemasiadosIntentos(None).espera == 1
+    assert DemasiadosIntentos(-2).espera == 1
@@ -0,0 +1,34 @@
+# Pruebas de la página de comentarios: formato de las filas y cursor de la página siguiente.
+from datetime import datetime
+
+from routes.user import _formatear_comentario
+from utils import decodificar_cursor, recortar_pagina
+
+
+def fila(comentario_id, segundo, microsegundo=0):
+    return {
+        'id': comentario_id, 'autor_id': 1, 'author': 'ana', 'text': f'comentario {comentario_id}',
+        'created_at': datetime(2025, 6, 30, 12, 0, segundo, microsegundo),
+    }
+
+
+def test_formatear_comentario_serializa_la_fecha():
+    assert _formatear_comentario(fila(1, 5))['created_at'] == '2025-06-30T12:00:05'
+    # Una fila ya formateada (p. ej. reutilizada) no se vuelve a tocar.
+    formateado = _formatear_comentario(fila(2, 5))
+    assert _formatear_comentario(formateado)['created_at'] == '2025-06-30T12:00:05'
+
+
+def test_cursor_desde_comentarios_ya_formateados():
+    # El cursor se construye tras formatear (created_at en texto) y debe conservar los microsegundos.
+    filas = [_formatear_comentario(fila(i, 9 - i, 123456)) for i in (1, 2, 3)]
+    pagina, next_cursor = recortar_pagina(filas, 2)
+    assert [c['id'] for c in pagina] == [1, 2]
+    assert decodificar_cursor(next_cursor) == (datetime(2025, 6, 30, 12, 0, 7, 123456), 2)
+
+
+def test_publicacion_sin_comentarios():
+    # El LEFT JOIN devuelve una fila con id NULL cuando la publicación existe pero no tiene comentarios.
+    filas = [{'id': None, 'autor_id': None, 'author': None, 'text': None, 'created_at': None}]
+    comentarios = [_formatear_comentario(f) for f in filas if f['id'] is not None]
+    assert recortar_pagina(comentarios, 20) == ([], None)
@@ -0,0 +1,62 @@
+# Pruebas de ?embed_comments=N: últimos comentarios de cada publicación en una sola consulta.
+from datetime import datetime
+
+import pytest
+
+import routes.user
+from routes.user import MAX_COMENTARIOS_EMBEBIDOS, _adjuntar_comentarios_recientes
+
+
+def comentario(comentario_id, publicacion_id):
+    return {
+        'id': comentario_id, 'publicacion_id': publicacion_id, 'autor_id': 1, 'author': 'ana',
+        'text': 'hola', 'created_at': datetime(2024, 5, 1, 12, 0, comentario_id)
+    }
+
+
+def test_reparte_los_comentarios_por_publicacion(conexion):
+    conexion.filas['SELECT'] = [comentario(9, 1), comentario(8, 1), comentario(5, 3)]
+    publicaciones = [{'id': 3}, {'id': 2}, {'id': 1}]
+    _adjuntar_comentarios_recientes(conexion.cursor(), publicaciones, 2)
+
+    assert [c['id'] for c in publicaciones[2]['comentarios_recientes']] == [9, 8]
+    assert [c['id'] for c in publicaciones[0]['comentarios_recientes']] == [5]
+    assert publicaciones[1]['comentarios_recientes'] == []
+    assert 'publicacion_id' not in publicaciones[0]['comentarios_recientes'][0]
+    assert publicaciones[0]['comentarios_recientes'][0]['created_at'] == '2024-05-01T12:00:05'
+
+    (sentencia, parametros), = conexion.sentencias
+    assert 'ROW_NUMBER() OVER (PARTITION BY c.publicacion_id' in sentencia
+    assert parametros == [3, 2, 1, 2]
+
+
+def test_pagina_vacia_no_consulta(conexion):
+    _adjuntar_comentarios_recientes(conexion.cursor(), [], 3)
+    assert conexion.sentencias == []
+
+
+@pytest.mark.parametrize('url', [
+    '/publicaciones?embed_comments=-1',
+    f'/publicaciones?embed_comments={MAX_COMENTARIOS_EMBEBIDOS + 1}',
+    '/publicaciones?embed_comments=x',
+    '/publicaciones?embed_comments=2&all=1',
+])
+def test_embed_comments_invalido(app, mysql_simulado, url):
+    with app.test_request_context(url):
+        _, status = routes.user.publicaciones()
+    assert status == 400
+    assert mysql_simulado.sentencias == []
+
+
+def test_feed_con_comentarios_embebidos_usa_dos_consultas(app, monkeypatch, mysql_simulado):
+    monkeypatch.setattr(routes.user, 'obtener_version', lambda recurso: None)
+    mysql_simulado.filas['SELECT p.id'] = [
+        {'id': i, 'autor_id': 1, 'author': 'ana', 'title': 't', 'content': 'x',
+         'created_at': datetime(2024, 5, 1, 12, 0, i), 'cantidad_comentarios': 1, 'all_image_urls': None}
+        for i in (5, 4)
+    ]
+    mysql_simulado.filas['SELECT id, publicacion_id'] = [comentario(7, 4)]
+    with app.test_request_context('/publicaciones?limit=5&embed_comments=1'):
+        cuerpo = routes.user.publicaciones().get_json()
+    assert [len(p['comentarios_recientes']) for p in cuerpo['publicaciones']] == [0, 1]
+    assert len(mysql_simulado.sentencias) == 2
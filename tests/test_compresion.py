@@ -0,0 +1,44 @@
+# Pruebas de la negociación de compresión que no necesitan una petición real.
+from types import SimpleNamespace
+import gzip
+import zlib
+
+import pytest
+
+import compresion
+from compresion import _comprimir_bytes, _comprimir_stream, _es_comprimible, variantes_etag
+
+APP = SimpleNamespace(config={'COMPRESION_NIVEL_GZIP': 6, 'COMPRESION_CALIDAD_BROTLI': 4})
+
+
+def test_variantes_etag():
+    variantes = variantes_etag('feed-v3-full')
+    assert variantes[:2] == ['feed-v3-full', 'feed-v3-full-gzip']
+    assert ('feed-v3-full-br' in variantes) == (compresion.brotli is not None)
+
+
+@pytest.mark.parametrize('tipo, esperado', [
+    ('application/json', True),
+    ('text/html', True),
+    ('text/event-stream', False),   # SSE: comprimirlo retendría los eventos
+    ('image/png', False),
+    ('application/pdf', False),
+    ('application/octet-stream', False),
+    (None, False),
+])
+def test_es_comprimible(tipo, esperado):
+    assert _es_comprimible(SimpleNamespace(mimetype=tipo)) is esperado
+
+
+def test_comprimir_bytes_gzip():
+    datos = b'{"publicaciones": []}' * 50
+    assert gzip.decompress(_comprimir_bytes(APP, datos, 'gzip')) == datos
+
+
+def test_comprimir_stream_gzip_emite_cada_fragmento():
+    fragmentos = [b'[', b'{"id": 1}', b',', b'{"id": 2}', b']']
+    salida = list(_comprimir_stream(APP, iter(fragmentos), 'gzip'))
+    # Cada fragmento se vacía en cuanto se produce (no se acumula hasta el final).
+    assert len(salida) >= len(fragmentos)
+    descompresor = zlib.decompressobj(31)
+    assert descompresor.decompress(b''.join(salida)) == b''.join(fragmentos)
@@ -0,0 +1,72 @@
+# Pruebas del contador publicaciones.cantidad_comentarios que mantienen las rutas de comentarios.
+import inspect
+
+import pytest
+
+import eventos
+import routes.user
+import tendencias
+
+
+@pytest.fixture
+def sesion(monkeypatch, app, mysql_simulado):
+    """Usuario 7 verificado; sin Redis: se registran las invalidaciones en lugar de aplicarlas."""
+    invalidados = []
+    monkeypatch.setattr(routes.user, 'get_jwt_identity', lambda: '7')
+    monkeypatch.setattr(routes.user, 'get_jwt', lambda: {'verificado': True, 'username': 'ana'})
+    monkeypatch.setattr(routes.user, 'incrementar_version', lambda *recursos: invalidados.extend(recursos))
+    monkeypatch.setattr(tendencias, 'registrar_evento', lambda *args: None)
+    monkeypatch.setattr(eventos, 'publicar', lambda *args: None)
+    return invalidados
+
+
+def llamar(app, vista, *args, **peticion):
+    # Se omite @jwt_required: la identidad la aportan los monkeypatch de la fixture 'sesion'.
+    with app.test_request_context(**peticion):
+        respuesta, status = inspect.unwrap(vista)(*args)
+        return respuesta.get_json(), status
+
+
+def test_comentar_incrementa_el_contador_antes_de_insertar(app, sesion, mysql_simulado):
+    mysql_simulado.lastrowids['INSERT INTO comentarios'] = 40
+    cuerpo, status = llamar(app, routes.user.comentar_publicacion, method='POST',
+                            json={'publicacion_id': 3, 'comentario': 'hola'})
+    assert status == 201
+    sentencias = [s for s, _ in mysql_simulado.sentencias]
+    assert sentencias[0].startswith('UPDATE publicaciones SET cantidad_comentarios = cantidad_comentarios + 1')
+    assert sentencias[1].startswith('INSERT INTO comentarios')
+    assert not any('COUNT(' in s for s in sentencias)
+    assert mysql_simulado.commits == 1
+    assert 'comentarios:3' in sesion
+
+
+def test_comentar_en_publicacion_inexistente_no_inserta(app, sesion, mysql_simulado):
+    mysql_simulado.rowcounts['UPDATE publicaciones'] = 0
+    cuerpo, status = llamar(app, routes.user.comentar_publicacion, method='POST',
+                            json={'publicacion_id': 99, 'comentario': 'hola'})
+    assert status == 404
+    assert len(mysql_simulado.sentencias) == 1
+    assert mysql_simulado.rollbacks == 1 and mysql_simulado.commits == 0
+    assert sesion == []
+
+
+def test_eliminar_comentario_descuenta_en_la_misma_sentencia(app, sesion, mysql_simulado):
+    mysql_simulado.lastrowids['UPDATE comentarios c JOIN publicaciones p'] = 3
+    cuerpo, status = llamar(app, routes.user.eliminar_comentario, 12, method='DELETE')
+    assert status == 200
+    (actualizacion, parametros), (borrado, _) = mysql_simulado.sentencias
+    assert 'GREATEST(p.cantidad_comentarios - 1, 0)' in actualizacion
+    assert parametros == (12, 7)
+    assert borrado.startswith('DELETE FROM comentarios')
+    assert mysql_simulado.commits == 1
+    # publicacion_id sale de LAST_INSERT_ID, sin SELECT adicional.
+    assert 'comentarios:3' in sesion and 'publicacion:3' in sesion
+
+
+def test_eliminar_comentario_ajeno_no_borra(app, sesion, mysql_simulado):
+    mysql_simulado.rowcounts['UPDATE comentarios'] = 0
+    mysql_simulado.filas['SELECT autor_id FROM comentarios'] = [(8,)]
+    cuerpo, status = llamar(app, routes.user.eliminar_comentario, 12, method='DELETE')
+    assert status == 403
+    assert not any(s.startswith('DELETE') for s, _ in mysql_simulado.sentencias)
+    assert mysql_simulado.commits == 0
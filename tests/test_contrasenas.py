@@ -0,0 +1,96 @@
+# Pruebas del coste compartido de bcrypt y del control de operaciones pendientes del pool.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import contrasenas
+import extensions
+
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.setitem(contrasenas._config, 'coste', 12)
+    monkeypatch.setitem(contrasenas._config, 'max_pendientes', 2)
+    monkeypatch.setitem(contrasenas._config, 'timeout', 5.0)
+    monkeypatch.setattr(contrasenas, '_pendientes', 0)
+    return contrasenas._config
+
+
+@pytest.mark.parametrize('password_hash, esperado', [
+    ('$2b$10$' + 'a' * 53, True),
+    ('$2b$12$' + 'a' * 53, False),
+    ('$2b$14$' + 'a' * 53, False),   # Nunca se rebaja un hash de coste superior
+    ('', False),
+    (None, False),
+    ('texto plano', False),
+])
+def test_necesita_rehash(config, password_hash, esperado):
+    assert contrasenas.necesita_rehash(password_hash) is esperado
+
+
+def test_coste_compartido_se_calibra_una_sola_vez(monkeypatch, redis_simulado):
+    calibraciones = []
+    monkeypatch.setattr(extensions, 'redis_client', redis_simulado)
+    monkeypatch.setattr(contrasenas, 'calibrar_coste', lambda objetivo: calibraciones.append(objetivo) or 13)
+    assert contrasenas.obtener_coste_compartido(250) == 13
+    assert contrasenas.obtener_coste_compartido(250) == 13
+    assert calibraciones == [250]
+
+
+def test_coste_de_otro_proceso_tiene_prioridad(monkeypatch, redis_simulado):
+    redis_simulado.set(contrasenas.COSTE_KEY, 14)
+    monkeypatch.setattr(extensions, 'redis_client', redis_simulado)
+    monkeypatch.setattr(contrasenas, 'calibrar_coste', lambda objetivo: pytest.fail("no debe calibrar"))
+    assert contrasenas.obtener_coste_compartido(250) == 14
+
+
+def test_sin_redis_se_calibra_en_local(monkeypatch):
+    monkeypatch.setattr(extensions, 'redis_client', None)
+    monkeypatch.setattr(contrasenas, 'calibrar_coste', lambda objetivo: 12)
+    assert contrasenas.obtener_coste_compartido(250) == 12
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Un pool de hilos en lugar de procesos: permite bloquear las operaciones con un Event.
+    ejecutor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(contrasenas, '_obtener_pool', lambda: ejecutor)
+    yield ejecutor
+    ejecutor.shutdown(wait=True)
+
+
+def test_rechaza_cuando_hay_demasiadas_pendientes(config, pool):
+    liberar = threading.Event()
+    esperas = [pool.submit(contrasenas._ejecutar, liberar.wait) for _ in range(2)]
+    while contrasenas._pendientes < 2:
+        time.sleep(0.01)
+    with pytest.raises(contrasenas.HashingSaturado):
+        contrasenas._ejecutar(len, 'x')
+    liberar.set()
+    assert [espera.result() for espera in esperas] == [True, True]
+    # Los callbacks que liberan los huecos corren en los hilos del pool tras fijar el resultado.
+    pool.shutdown(wait=True)
+    assert contrasenas._pendientes == 0
+
+
+def test_timeout_no_libera_el_hueco_hasta_que_termina(config, pool):
+    config['timeout'] = 0.05
+    liberar = threading.Event()
+    with pytest.raises(contrasenas.HashingSaturado):
+        contrasenas._ejecutar(liberar.wait)
+    # La operación sigue ocupando el pool: cuenta como pendiente.
+    assert contrasenas._pendientes == 1
+    liberar.set()
+    pool.shutdown(wait=True)
+    assert contrasenas._pendientes == 0
+
+
+def test_error_al_encolar_libera_el_hueco(config, monkeypatch):
+    def pool_caido():
+        raise RuntimeError("sin pool")
+    monkeypatch.setattr(contrasenas, '_obtener_pool', pool_caido)
+    with pytest.raises(RuntimeError):
+        contrasenas._ejecutar(len, 'x')
+    assert contrasenas._pendientes == 0
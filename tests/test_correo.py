@@ -0,0 +1,198 @@
+# Pruebas del transporte SMTP compartido contra un sumidero SMTP local (sin red externa).
+import socketserver
+import threading
+
+import pytest
+
+from correo import PoolAgotado, TransporteSMTP, construir_mensaje
+
+
+class _ManejadorSMTP(socketserver.StreamRequestHandler):
+    """Servidor SMTP mínimo: acepta todo salvo los destinatarios que contienen 'rechazado'."""
+
+    def responder(self, *lineas):
+        self.wfile.write(''.join(f"{linea}\r\n" for linea in lineas).encode('ascii'))
+
+    def handle(self):
+        estado = self.server
+        with estado.lock:
+            estado.conexiones += 1
+            estado.activas += 1
+            estado.max_activas = max(estado.max_activas, estado.activas)
+        enviados = 0
+        try:
+            self.responder('220 sumidero listo')
+            while True:
+                linea = self.rfile.readline()
+                if not linea:
+                    break
+                comando = linea.decode('utf-8').strip()
+                verbo = comando.split(' ', 1)[0].upper()
+                if verbo in ('EHLO', 'HELO'):
+                    self.responder('250-sumidero', '250 AUTH PLAIN')
+                elif verbo == 'AUTH':
+                    with estado.lock:
+                        estado.logins += 1
+                    self.responder('235 autenticado')
+                elif verbo == 'MAIL':
+                    if estado.cortar_tras is not None and enviados >= estado.cortar_tras:
+                        break  # Corta la conexión sin responder, como un servidor que la descarta
+                    self.responder('250 ok')
+                elif verbo == 'RCPT':
+                    self.responder('550 buzon inexistente' if 'rechazado' in comando else '250 ok')
+                elif verbo == 'DATA':
+                    self.responder('354 adelante')
+                    datos = []
+                    while (linea := self.rfile.readline()) not in (b'.\r\n', b''):
+                        datos.append(linea)
+                    with estado.lock:
+                        estado.mensajes.append(b''.join(datos))
+                    enviados += 1
+                    self.responder('250 encolado')
+                elif verbo == 'NOOP':
+                    with estado.lock:
+                        estado.noops += 1
+                    self.responder('250 ok')
+                elif verbo == 'RSET':
+                    self.responder('250 ok')
+                elif verbo == 'QUIT':
+                    self.responder('221 adios')
+                    break
+                else:
+                    self.responder('502 no implementado')
+        finally:
+            with estado.lock:
+                estado.activas -= 1
+
+
+class _Sumidero(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _ManejadorSMTP)
+        self.lock = threading.Lock()
+        self.conexiones = 0
+        self.activas = 0
+        self.max_activas = 0
+        self.logins = 0
+        self.noops = 0
+        self.mensajes = []
+        self.cortar_tras = None   # Mensajes por conexión tras los que el servidor corta
+
+
+@pytest.fixture
+def sumidero():
+    servidor = _Sumidero()
+    hilo = threading.Thread(target=servidor.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def transporte_para(sumidero, **opciones):
+    return TransporteSMTP('127.0.0.1', sumidero.server_address[1], usuario='app', password='secreto',
+                          usar_tls=False, timeout=5, **opciones)
+
+
+def mensaje(n, destinatario='jugador@example.com'):
+    return construir_mensaje(destinatario, f'Asunto {n}', f'Cuerpo {n}', 'plain', remitente='app@example.com')
+
+
+def test_un_lote_usa_una_sola_conexion_y_un_login(sumidero):
+    transporte = transporte_para(sumidero)
+    resultados = transporte.enviar_lote([mensaje(n) for n in range(10)])
+    transporte.cerrar()
+    assert resultados == [None] * 10
+    assert len(sumidero.mensajes) == 10
+    assert sumidero.conexiones == 1
+    assert sumidero.logins == 1
+
+
+def test_la_conexion_se_reutiliza_entre_envios(sumidero):
+    transporte = transporte_para(sumidero)
+    for n in range(3):
+        transporte.enviar(mensaje(n))
+    transporte.cerrar()
+    assert sumidero.conexiones == 1 and sumidero.logins == 1
+
+
+def test_noop_antes_de_reutilizar_una_conexion_inactiva(sumidero):
+    transporte = transporte_para(sumidero, inactividad_maxima=0)
+    transporte.enviar(mensaje(1))
+    transporte.enviar(mensaje(2))
+    transporte.cerrar()
+    assert sumidero.noops >= 1
+    assert sumidero.conexiones == 1
+
+
+def test_reconecta_si_el_servidor_corta_la_conexion(sumidero):
+    sumidero.cortar_tras = 2
+    transporte = transporte_para(sumidero)
+    resultados = transporte.enviar_lote([mensaje(n) for n in range(5)])
+    transporte.cerrar()
+    assert resultados == [None] * 5
+    assert len(sumidero.mensajes) == 5
+    assert sumidero.conexiones == 3   # 2 + 2 + 1 mensajes
+
+
+def test_conexion_inactiva_cerrada_por_el_servidor_se_sustituye(sumidero):
+    sumidero.cortar_tras = 1
+    transporte = transporte_para(sumidero, inactividad_maxima=0)
+    transporte.enviar(mensaje(1))
+    transporte.enviar(mensaje(2))
+    transporte.cerrar()
+    assert len(sumidero.mensajes) == 2
+    assert sumidero.conexiones == 2
+
+
+def test_rechazo_de_un_mensaje_no_afecta_al_resto(sumidero):
+    transporte = transporte_para(sumidero)
+    resultados = transporte.enviar_lote([mensaje(1), mensaje(2, 'rechazado@example.com'), mensaje(3)])
+    transporte.cerrar()
+    assert resultados[0] is None and resultados[2] is None
+    assert resultados[1] is not None
+    assert len(sumidero.mensajes) == 2
+    assert sumidero.conexiones == 1
+
+
+def test_se_recicla_la_conexion_tras_el_maximo_de_mensajes(sumidero):
+    transporte = transporte_para(sumidero, max_mensajes_por_conexion=3)
+    assert transporte.enviar_lote([mensaje(n) for n in range(7)]) == [None] * 7
+    transporte.cerrar()
+    assert sumidero.conexiones == 3
+
+
+def test_el_semaforo_limita_las_conexiones_simultaneas(sumidero):
+    transporte = transporte_para(sumidero, max_conexiones=2)
+    errores = []
+
+    def enviar_varios(hilo):
+        for n in range(5):
+            try:
+                transporte.enviar(mensaje(f'{hilo}-{n}'))
+            except Exception as e:
+                errores.append(e)
+
+    hilos = [threading.Thread(target=enviar_varios, args=(i,)) for i in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    transporte.cerrar()
+    assert errores == []
+    assert len(sumidero.mensajes) == 30
+    assert sumidero.max_activas <= 2
+
+
+def test_pool_agotado(sumidero):
+    transporte = TransporteSMTP('127.0.0.1', sumidero.server_address[1], usar_tls=False,
+                                timeout=0.2, max_conexiones=1)
+    ocupada = transporte._tomar()
+    try:
+        with pytest.raises(PoolAgotado):
+            transporte._tomar()
+    finally:
+        transporte._devolver(ocupada)
+        transporte.cerrar()
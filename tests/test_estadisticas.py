@@ -0,0 +1,49 @@
+# Pruebas de la búsqueda de percentiles sobre una instantánea y del resumen con NumPy.
+import pytest
+
+from estadisticas import calcular_percentil, resumir
+
+# Cortes de 0..100 puntos repartidos uniformemente: el corte k vale 10 * k.
+INSTANTANEA = {"jugadores": 1000, "percentiles": [10 * k for k in range(101)]}
+
+
+@pytest.mark.parametrize('puntaje, esperado', [
+    (-5, 0),        # por debajo de todos los cortes
+    (0, 0),
+    (9, 0),
+    (10, 1),        # alcanzar un corte exacto cuenta
+    (505, 50),
+    (1000, 100),
+    (10 ** 9, 100),
+])
+def test_calcular_percentil(puntaje, esperado):
+    assert calcular_percentil(INSTANTANEA, puntaje) == esperado
+
+
+def test_percentil_con_cortes_repetidos_toma_el_mayor():
+    # Muchos jugadores con el mismo puntaje repiten corte: se devuelve el mayor percentil alcanzado.
+    instantanea = {"percentiles": [0] * 60 + [100] * 41}
+    assert calcular_percentil(instantanea, 0) == 59
+    assert calcular_percentil(instantanea, 100) == 100
+
+
+@pytest.mark.parametrize('instantanea', [{"jugadores": 0}, {"percentiles": []}])
+def test_percentil_sin_jugadores(instantanea):
+    assert calcular_percentil(instantanea, 50) is None
+
+
+def test_resumir():
+    np = pytest.importorskip('numpy')
+    instantanea = resumir(np.arange(1, 101, dtype=np.int64))
+    assert instantanea['jugadores'] == 100
+    assert instantanea['minimo'] == 1 and instantanea['maximo'] == 100
+    assert instantanea['mediana'] == 50
+    assert len(instantanea['percentiles']) == 101
+    assert sum(instantanea['histograma']['conteos']) == 100
+    # Los cortes son puntajes reales, así que el percentil de cada puntaje es coherente con ellos.
+    assert calcular_percentil(instantanea, 50) == 50
+
+
+def test_resumir_sin_puntajes():
+    np = pytest.importorskip('numpy')
+    assert resumir(np.empty(0, dtype=np.int64)) == {"jugadores": 0}
@@ -0,0 +1,108 @@
+# Pruebas de los Server-Sent Events: formato, reparto a las colas locales y ciclo de vida del stream.
+import json
+import queue
+
+import pytest
+
+import eventos
+import routes.user
+
+
+def mensaje(tipo, datos):
+    return json.dumps({"tipo": tipo, "datos": datos})
+
+
+def test_formatear_evento():
+    assert eventos._formatear_evento(mensaje('comentario', {'id': 1})) == 'event: comentario\ndata: {"id": 1}\n\n'
+
+
+@pytest.mark.parametrize('invalido', ['no es json', '{"tipo": "x"}', '[1, 2]'])
+def test_mensaje_invalido_se_descarta(invalido):
+    assert eventos._formatear_evento(invalido) is None
+
+
+def test_canales_por_publicacion():
+    assert eventos.canal_publicacion(7) == 'eventos:publicacion:7'
+    assert eventos.canal_publicacion(7).startswith(eventos.CANAL_PREFIX)
+    assert eventos.CANAL_FEED.startswith(eventos.CANAL_PREFIX)
+
+
+def test_publicar_serializa_tipo_y_datos(monkeypatch):
+    publicados = []
+
+    class RedisPublicador:
+        def publish(self, canal, datos):
+            publicados.append((canal, json.loads(datos)))
+
+    monkeypatch.setattr(eventos, 'redis_client', RedisPublicador())
+    eventos.publicar(eventos.CANAL_FEED, 'publicacion', {'id': 3})
+    assert publicados == [('eventos:feed', {'tipo': 'publicacion', 'datos': {'id': 3}})]
+
+
+def test_publicar_sin_redis_no_falla(monkeypatch):
+    monkeypatch.setattr(eventos, 'redis_client', None)
+    eventos.publicar(eventos.CANAL_FEED, 'publicacion', {'id': 3})
+
+
+def difusor_con(canal, *colas):
+    # Sin suscribir(): no se arranca el hilo que escucha Redis.
+    difusor = eventos._Difusor()
+    difusor._suscriptores[canal] = set(colas)
+    return difusor
+
+
+def test_repartir_solo_a_las_colas_del_canal():
+    propia, ajena = queue.Queue(), queue.Queue()
+    difusor = difusor_con('eventos:publicacion:1', propia)
+    difusor._suscriptores['eventos:publicacion:2'] = {ajena}
+    difusor._repartir('eventos:publicacion:1', 'm')
+    assert propia.get_nowait() == 'm'
+    assert ajena.empty()
+
+
+def test_cliente_lento_recibe_none_y_se_da_de_baja():
+    lenta = queue.Queue(maxsize=2)
+    difusor = difusor_con(eventos.CANAL_FEED, lenta)
+    for i in range(3):
+        difusor._repartir(eventos.CANAL_FEED, f'm{i}')
+    assert eventos.CANAL_FEED not in difusor._suscriptores
+    assert [lenta.get_nowait(), lenta.get_nowait()] == ['m1', None]
+
+
+def test_escuchar_envia_retry_eventos_y_termina_con_none(monkeypatch):
+    cola = queue.Queue()
+    for m in (mensaje('comentario', {'id': 1}), 'basura', None):
+        cola.put(m)
+    cancelados = []
+    monkeypatch.setattr(eventos._difusor, 'suscribir', lambda canal: cola)
+    monkeypatch.setattr(eventos._difusor, 'cancelar', lambda canal, c: cancelados.append((canal, c)))
+    cuerpo = list(eventos.escuchar('eventos:publicacion:1'))
+    assert cuerpo == [f"retry: {eventos.REINTENTO_CLIENTE_MS}\n\n", 'event: comentario\ndata: {"id": 1}\n\n']
+    assert cancelados == [('eventos:publicacion:1', cola)]
+
+
+def test_cliente_que_cierra_la_conexion_se_da_de_baja(monkeypatch):
+    cancelados = []
+    monkeypatch.setattr(eventos._difusor, 'suscribir', lambda canal: queue.Queue())
+    monkeypatch.setattr(eventos._difusor, 'cancelar', lambda canal, c: cancelados.append(canal))
+    stream = eventos.escuchar(eventos.CANAL_FEED)
+    next(stream)
+    stream.close()
+    assert cancelados == [eventos.CANAL_FEED]
+
+
+def test_ruta_sin_redis_devuelve_503(app, monkeypatch):
+    monkeypatch.setattr(eventos, 'redis_client', None)
+    with app.test_request_context('/publicaciones/eventos'):
+        _, status = routes.user.eventos_feed()
+    assert status == 503
+
+
+def test_ruta_abre_un_stream_sin_cache_ni_transformaciones(app, monkeypatch):
+    monkeypatch.setattr(eventos, 'redis_client', object())
+    monkeypatch.setattr(eventos, 'escuchar', lambda canal: iter([canal]))
+    with app.test_request_context('/publicaciones/4/eventos'):
+        respuesta = routes.user.eventos_publicacion(4)
+    assert respuesta.mimetype == 'text/event-stream'
+    assert respuesta.headers['Cache-Control'] == 'no-cache, no-transform'
+    assert list(respuesta.response) == ['eventos:publicacion:4']
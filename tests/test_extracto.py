@@ -0,0 +1,47 @@
+# Pruebas del extracto precalculado que sirve la vista resumida del feed (?view=summary).
+from datetime import datetime
+
+from routes.user import LONGITUD_EXTRACTO, _formatear_resumen, _generar_extracto
+
+
+def test_texto_corto_se_guarda_completo():
+    assert _generar_extracto('Hola mundo') == 'Hola mundo'
+
+
+def test_normaliza_espacios_y_saltos_de_linea():
+    assert _generar_extracto('  Hola\n\n  mundo\t! ') == 'Hola mundo !'
+
+
+def test_texto_justo_en_el_limite_no_lleva_puntos_suspensivos():
+    texto = 'a' * LONGITUD_EXTRACTO
+    assert _generar_extracto(texto) == texto
+
+
+def test_texto_largo_se_corta_en_el_ultimo_espacio():
+    texto = ' '.join(['palabra'] * 60)
+    extracto = _generar_extracto(texto)
+    assert extracto.endswith('palabra…')
+    assert len(extracto) <= LONGITUD_EXTRACTO + 1
+    assert texto.startswith(extracto[:-1])
+
+
+def test_palabra_sin_espacios_se_corta_en_el_limite():
+    extracto = _generar_extracto('x' * (LONGITUD_EXTRACTO * 2))
+    assert extracto == 'x' * LONGITUD_EXTRACTO + '…'
+
+
+def test_resumen_solo_formatea_la_fecha():
+    pub = {'id': 1, 'extracto': 'Hola', 'created_at': datetime(2024, 5, 1, 12, 0)}
+    assert _formatear_resumen(pub) == {'id': 1, 'extracto': 'Hola', 'created_at': '2024-05-01T12:00:00'}
+    assert _formatear_resumen({'created_at': None}) == {'created_at': None}
+
+
+def test_feed_resumido_no_lee_el_cuerpo(app, monkeypatch, mysql_simulado):
+    import routes.user
+    monkeypatch.setattr(routes.user, 'obtener_version', lambda recurso: None)
+    with app.test_request_context('/publicaciones?view=summary&limit=5'):
+        cuerpo = routes.user.publicaciones().get_json()
+    assert cuerpo == {'publicaciones': [], 'next_cursor': None}
+    (sentencia, parametros), = mysql_simulado.sentencias
+    assert 'p.extracto' in sentencia and 'p.texto' not in sentencia
+    assert parametros == [6]
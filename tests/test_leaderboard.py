@@ -0,0 +1,33 @@
+# Pruebas de la numeración de las entradas de la clasificación (sin Redis ni MySQL).
+from routes import leaderboard
+from routes.leaderboard import _numerar_entradas
+
+USERNAMES = {1: 'ana', 2: 'beto', 4: 'dani', 5: 'eva'}   # El usuario 3 fue eliminado
+
+
+def test_posiciones_consecutivas_aunque_se_omita_un_usuario_eliminado():
+    pares = [(1, 90), (2, 80), (3, 70), (4, 60)]
+    entradas = _numerar_entradas(1, pares, USERNAMES)
+    assert [e['posicion'] for e in entradas] == [1, 2, 3]
+    assert [e['user_id'] for e in entradas] == [1, 2, 4]
+
+
+def test_el_limite_se_aplica_despues_de_filtrar():
+    pares = [(1, 90), (3, 70), (2, 80), (4, 60), (5, 50)]
+    entradas = _numerar_entradas(1, pares, USERNAMES, limite=3)
+    assert [e['user_id'] for e in entradas] == [1, 2, 4]
+    assert [e['posicion'] for e in entradas] == [1, 2, 3]
+
+
+def test_vecinos_numerados_respecto_al_usuario(monkeypatch):
+    monkeypatch.setattr(leaderboard, '_obtener_usernames', lambda ids: {i: n for i, n in USERNAMES.items() if i in ids})
+    # El usuario 4 está en la posición 10; por encima tiene a 2 y a un eliminado (3).
+    pares = [(2, 80), (3, 70), (4, 60), (5, 50)]
+    vecinos = leaderboard._formatear_vecinos(10, 8, 4, pares)
+    assert [(e['user_id'], e['posicion']) for e in vecinos] == [(2, 9), (4, 10), (5, 11)]
+
+
+def test_vecinos_de_un_usuario_eliminado_se_numeran_desde_el_inicio(monkeypatch):
+    monkeypatch.setattr(leaderboard, '_obtener_usernames', lambda ids: {i: n for i, n in USERNAMES.items() if i in ids})
+    vecinos = leaderboard._formatear_vecinos(9, 8, 3, [(2, 80), (3, 70), (4, 60)])
+    assert [(e['user_id'], e['posicion']) for e in vecinos] == [(2, 8), (4, 9)]
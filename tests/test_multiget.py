@@ -0,0 +1,59 @@
+# Pruebas de GET /publicaciones?ids=... (multi-get con caché por publicación).
+import json
+from datetime import datetime
+
+import pytest
+
+import cache
+import routes.user
+from routes.user import MAX_IDS_POR_CONSULTA
+
+
+def fila(publicacion_id):
+    return {
+        'id': publicacion_id, 'autor_id': 1, 'author': 'ana', 'title': f"t{publicacion_id}", 'content': 'x',
+        'created_at': datetime(2024, 5, 1), 'cantidad_comentarios': 0, 'all_image_urls': 'a.png,b.png'
+    }
+
+
+def pedir(app, ids):
+    with app.test_request_context('/publicaciones', query_string={'ids': ids}):
+        respuesta = routes.user.publicaciones()
+    if isinstance(respuesta, tuple):
+        return respuesta[0].get_json(), respuesta[1]
+    return json.loads(respuesta.get_data()), respuesta.status_code
+
+
+@pytest.mark.parametrize('ids', ['', ',', '1,a', '1.5', ','.join(['1'] * (MAX_IDS_POR_CONSULTA + 1))])
+def test_ids_invalidos_devuelven_400(app, mysql_simulado, ids):
+    _, status = pedir(app, ids)
+    assert status == 400
+    assert mysql_simulado.sentencias == []
+
+
+def test_array_alineado_con_null_para_inexistentes(app, monkeypatch, mysql_simulado):
+    monkeypatch.setattr(cache, 'redis_client', None)
+    mysql_simulado.filas['SELECT'] = [fila(1), fila(3)]
+    cuerpo, status = pedir(app, '3, 2,1,3')
+    assert status == 200
+    assert [p and p['id'] for p in cuerpo] == [3, None, 1, 3]
+    assert cuerpo[0]['imageUrl'] == 'a.png'
+    # Una sola consulta IN con los ids sin repetir.
+    (sentencia, parametros), = mysql_simulado.sentencias
+    assert parametros == [3, 2, 1]
+
+
+def test_solo_consulta_los_ids_que_no_estan_en_cache(app, monkeypatch, mysql_simulado, redis_simulado):
+    monkeypatch.setattr(cache, 'redis_client', redis_simulado)
+    mysql_simulado.filas['SELECT'] = [fila(1), fila(2)]
+    pedir(app, '1,2')
+    mysql_simulado.filas['SELECT'] = [fila(3)]
+    cuerpo, _ = pedir(app, '1,2,3')
+    assert [p['id'] for p in cuerpo] == [1, 2, 3]
+    assert mysql_simulado.sentencias[-1][1] == [3]
+
+    # Editar una publicación invalida solo su entrada.
+    cache.incrementar_version(cache.recurso_publicacion(2))
+    mysql_simulado.filas['SELECT'] = [fila(2)]
+    pedir(app, '1,2,3')
+    assert mysql_simulado.sentencias[-1][1] == [2]
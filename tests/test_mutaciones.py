@@ -0,0 +1,61 @@
+# Pruebas de la comprobación de autoría de _mutar_como_autor con un cursor simulado.
+import pytest
+
+from routes.user import _mutar_como_autor
+
+
+class CursorSimulado:
+    """Devuelve el rowcount y el lastrowid indicados para la mutación y 'fila' para el SELECT posterior."""
+
+    def __init__(self, rowcount, fila=None, lastrowid=0):
+        self.rowcount = rowcount
+        self.lastrowid = lastrowid
+        self._fila = fila
+        self.sentencias = []
+
+    def execute(self, sentencia, parametros=None):
+        self.sentencias.append(sentencia)
+        if sentencia.startswith('SELECT'):
+            # Como en MySQLdb, un SELECT deja lastrowid a 0.
+            self.lastrowid = 0
+
+    def fetchone(self):
+        return self._fila
+
+
+def mutar(cursor, autor_id=7):
+    return _mutar_como_autor(
+        cursor, 'comentarios',
+        "UPDATE comentarios SET texto = %s, publicacion_id = LAST_INSERT_ID(publicacion_id) WHERE id = %s AND autor_id = %s",
+        ('hola', 3, autor_id), 3, autor_id
+    )
+
+
+def test_fila_afectada_no_consulta_nada_mas():
+    cursor = CursorSimulado(rowcount=1, lastrowid=42)
+    assert mutar(cursor) == (None, 42)
+    assert len(cursor.sentencias) == 1
+
+
+def test_registro_inexistente_es_404():
+    cursor = CursorSimulado(rowcount=0, fila=None)
+    assert mutar(cursor) == (404, None)
+
+
+def test_registro_de_otro_usuario_es_403():
+    cursor = CursorSimulado(rowcount=0, fila=(99,))
+    error, _ = mutar(cursor)
+    assert error == 403
+
+
+def test_update_sin_cambios_del_autor_no_es_error():
+    # MySQL no cuenta como afectada una fila cuyos valores no cambian: guardar el mismo texto
+    # no debe confundirse con "no existe" ni con "no es el autor", y conserva el lastrowid.
+    cursor = CursorSimulado(rowcount=0, fila=(7,), lastrowid=42)
+    assert mutar(cursor) == (None, 42)
+    assert cursor.sentencias[1].startswith('SELECT autor_id FROM comentarios')
+
+
+@pytest.mark.parametrize('rowcount', [1, 2])
+def test_update_multitabla_cuenta_como_afectado(rowcount):
+    assert mutar(CursorSimulado(rowcount=rowcount, lastrowid=5)) == (None, 5)
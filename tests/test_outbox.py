@@ -0,0 +1,69 @@
+# Pruebas de la bandeja de salida de correos: encolado transaccional, backoff y registro de resultados.
+from types import SimpleNamespace
+
+import pytest
+
+import outbox
+
+
+def test_encolar_no_confirma_la_transaccion(conexion):
+    outbox.encolar_correo(conexion.cursor(), 'ana@example.com', 'Hola', '<p>x</p>')
+    (sentencia, parametros), = conexion.sentencias
+    assert sentencia.startswith('INSERT INTO email_outbox')
+    assert parametros == ('ana@example.com', 'Hola', '<p>x</p>', 'html')
+    assert conexion.commits == 0
+
+
+@pytest.mark.parametrize('intentos, segundos', [(0, 30), (1, 30), (2, 60), (3, 120), (7, 1920), (8, 3600), (30, 3600)])
+def test_backoff_exponencial_acotado(intentos, segundos):
+    assert outbox.calcular_backoff(intentos) == segundos
+
+
+@pytest.fixture
+def worker(monkeypatch, conexion):
+    monkeypatch.setattr(outbox, 'mysql', SimpleNamespace(connection=conexion))
+    return conexion
+
+
+def fila(outbox_id, intentos=0):
+    return (outbox_id, f"u{outbox_id}@example.com", 'Asunto', 'Cuerpo', 'html', intentos)
+
+
+def test_sin_pendientes_no_envia(worker, monkeypatch):
+    monkeypatch.setattr(outbox, '_enviar_lote', lambda filas: pytest.fail("no debe enviar"))
+    assert outbox.procesar_pendientes() == (0, 0)
+    assert worker.commits == 1
+
+
+def test_registra_envios_reintentos_y_descartes(worker, monkeypatch):
+    worker.filas['SELECT id, destinatario'] = [fila(1), fila(2, intentos=2), fila(3, intentos=outbox.MAX_INTENTOS - 1)]
+    monkeypatch.setattr(outbox, '_enviar_lote', lambda filas: {1: None, 2: '451 ocupado', 3: '550 no existe'})
+
+    assert outbox.procesar_pendientes() == (1, 2)
+    sentencias = worker.sentencias
+    # El lease se toma y se confirma antes de hablar con el servidor SMTP.
+    assert 'FOR UPDATE SKIP LOCKED' in sentencias[0][0]
+    assert sentencias[1][1] == (outbox.DURACION_LEASE_SEGUNDOS, 1, 2, 3)
+    assert "estado = 'enviado'" in sentencias[2][0] and sentencias[2][1] == (1,)
+    assert sentencias[3][1] == (outbox.calcular_backoff(3), '451 ocupado', 2)
+    assert "estado = 'fallido'" in sentencias[4][0] and sentencias[4][1] == ('550 no existe', 3)
+    assert worker.commits == 2
+
+
+def test_error_al_registrar_deshace_y_propaga(worker, monkeypatch):
+    worker.filas['SELECT id, destinatario'] = [fila(1)]
+    worker.errores["UPDATE email_outbox SET estado = 'enviado'"] = RuntimeError("conexión perdida")
+    monkeypatch.setattr(outbox, '_enviar_lote', lambda filas: {1: None})
+    with pytest.raises(RuntimeError):
+        outbox.procesar_pendientes()
+    assert worker.rollbacks == 1
+    assert worker.cursores[0].cerrado
+
+
+def test_fallo_de_conexion_reintenta_todo_el_lote(monkeypatch):
+    class TransporteCaido:
+        def enviar_lote(self, mensajes):
+            raise ConnectionRefusedError("smtp caído")
+    monkeypatch.setattr(outbox, 'obtener_transporte', lambda: TransporteCaido())
+    monkeypatch.setattr(outbox, 'construir_mensaje', lambda *args: args)
+    assert outbox._enviar_lote([fila(1), fila(2)]) == {1: 'smtp caído', 2: 'smtp caído'}
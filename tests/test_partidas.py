@@ -0,0 +1,67 @@
+# Pruebas de la validación y la huella de idempotencia de POST /partidas.
+import pytest
+
+import clasificacion
+from routes import partidas
+from routes.partidas import CONTADORES, MAX_RESULTADOS_POR_ENVIO, _huella, _validar_resultados
+
+
+def test_validar_resultados_completa_contadores_con_cero():
+    filas = _validar_resultados([{'dificultad_id': 2, 'puntaje': 150, 'mobs_derrotados': 7}])
+    assert filas == [(2, 150, 0, 0, 0, 0, 7)]
+    assert len(filas[0]) == 2 + len(CONTADORES)
+
+
+def test_validar_resultados_sin_puntaje():
+    assert _validar_resultados([{'dificultad_id': 1}]) == [(1, 0) + (0,) * len(CONTADORES)]
+
+
+@pytest.mark.parametrize('resultados', [
+    None,
+    [],
+    {'dificultad_id': 1},
+    [{'puntaje': 10}],
+    ['1'],
+    [{'dificultad_id': '1'}],
+    [{'dificultad_id': 1, 'puntaje': -5}],
+    [{'dificultad_id': 1, 'puntaje': 1.5}],
+    [{'dificultad_id': 1, 'puntaje': True}],
+    [{'dificultad_id': 1, 'puntaje': 2 ** 31}],
+    [{'dificultad_id': 1, 'mobs_derrotados': 10 ** 9}],
+    [{'dificultad_id': 1}] * (MAX_RESULTADOS_POR_ENVIO + 1),
+])
+def test_validar_resultados_invalidos(resultados):
+    with pytest.raises(ValueError):
+        _validar_resultados(resultados)
+
+
+def test_huella_igual_para_el_mismo_envio():
+    # Un reintento con la misma clave y el mismo contenido debe reconocerse como repetición,
+    # aunque el cliente ordene las claves de otra forma u omita contadores a cero.
+    a = _validar_resultados([{'dificultad_id': 1, 'puntaje': 90, 'pergaminos_raros': 0}])
+    b = _validar_resultados([{'puntaje': 90, 'dificultad_id': 1}])
+    assert _huella(a) == _huella(b)
+
+
+def test_huella_distinta_si_cambia_el_contenido():
+    base = _validar_resultados([{'dificultad_id': 1, 'puntaje': 90}])
+    assert _huella(base) != _huella(_validar_resultados([{'dificultad_id': 1, 'puntaje': 91}]))
+    assert _huella(base) != _huella(_validar_resultados([{'dificultad_id': 2, 'puntaje': 90}]))
+
+
+def test_huella_depende_del_orden_de_los_resultados():
+    uno = {'dificultad_id': 1, 'puntaje': 10}
+    dos = {'dificultad_id': 2, 'puntaje': 20}
+    assert _huella(_validar_resultados([uno, dos])) != _huella(_validar_resultados([dos, uno]))
+
+
+def test_solo_los_puntajes_positivos_llegan_a_la_clasificacion(monkeypatch):
+    registrados = []
+    monkeypatch.setattr(clasificacion, 'registrar_puntaje', lambda *args: registrados.append(args))
+    filas = _validar_resultados([
+        {'dificultad_id': 1, 'puntaje': 40},
+        {'dificultad_id': 2, 'mobs_derrotados': 3},
+        {'dificultad_id': 3, 'puntaje': 0},
+    ])
+    partidas._registrar_en_clasificacion(9, filas)
+    assert registrados == [(9, 1, 40)]
@@ -0,0 +1,109 @@
+# Pruebas del agregado de /perfil: una sola consulta, caché en un HASH de Redis y revalidación.
+import inspect
+import json
+
+import pytest
+
+import cache
+import routes.user
+
+
+def fila(dificultad_id=None, dificultad=None, puntaje=None):
+    return {
+        'username': 'ana', 'email': 'ana@example.com', 'DescripUsuario': 'hola', 'foto_perfil': None,
+        'dificultad_id': dificultad_id, 'dificultad': dificultad, 'puntaje': puntaje
+    }
+
+
+def guardar_si_version(redis):
+    """Equivalente en Python de _LUA_GUARDAR_SI_VERSION sobre el Redis en memoria."""
+    def ejecutar(keys, args):
+        version, etag, cuerpo, ttl = args
+        if redis.datos.get(keys[1]) != version:
+            return 0
+        redis.datos[keys[0]] = {'etag': etag, 'cuerpo': cuerpo}
+        redis.ttls[keys[0]] = ttl
+        return 1
+    return ejecutar
+
+
+@pytest.fixture
+def perfil(monkeypatch, app, mysql_simulado, redis_simulado):
+    monkeypatch.setattr(cache, 'redis_client', redis_simulado)
+    monkeypatch.setitem(cache._scripts, 'perfil', guardar_si_version(redis_simulado))
+    monkeypatch.setattr(routes.user, 'get_jwt_identity', lambda: '7')
+    mysql_simulado.filas['SELECT u.username'] = [fila(1, 'Fácil', 900), fila(3, 'Difícil', 120)]
+
+    def llamar(metodo='GET', **peticion):
+        with app.test_request_context('/perfil', method=metodo, **peticion):
+            respuesta = inspect.unwrap(routes.user.perfil)()
+        if isinstance(respuesta, tuple):
+            respuesta, respuesta.status_code = respuesta
+        return respuesta
+    return llamar
+
+
+def test_construir_perfil_en_una_consulta(app, mysql_simulado):
+    mysql_simulado.filas['SELECT u.username'] = [fila(1, 'Fácil', 900), fila(3, 'Difícil', 120)]
+    with app.app_context():
+        cuerpo = json.loads(routes.user._construir_perfil(7))
+    assert cuerpo['descripcion'] == 'hola'
+    assert cuerpo['puntajes'] == [
+        {'dificultad_id': 1, 'dificultad': 'Fácil', 'puntaje': 900},
+        {'dificultad_id': 3, 'dificultad': 'Difícil', 'puntaje': 120},
+    ]
+    assert len(mysql_simulado.sentencias) == 1
+
+
+def test_usuario_sin_puntajes(app, mysql_simulado):
+    # Con LEFT JOIN llega una única fila con dificultad_id NULL.
+    mysql_simulado.filas['SELECT u.username'] = [fila()]
+    with app.app_context():
+        assert json.loads(routes.user._construir_perfil(7))['puntajes'] == []
+
+
+def test_usuario_inexistente(app, mysql_simulado):
+    mysql_simulado.filas['SELECT u.username'] = []
+    with app.app_context():
+        assert routes.user._construir_perfil(7) is None
+    assert mysql_simulado.cursores[0].cerrado
+
+
+def test_segunda_lectura_sale_de_redis(perfil, mysql_simulado, redis_simulado):
+    primera = perfil()
+    assert primera.headers['Cache-Control'] == 'private, no-cache'
+    segunda = perfil()
+    assert segunda.get_data() == primera.get_data()
+    assert segunda.headers['ETag'] == primera.headers['ETag']
+    assert len(mysql_simulado.sentencias) == 1
+    # El camino caliente es un único HMGET.
+    assert redis_simulado.comandos[-1] == 'HMGET'
+
+
+def test_revalidacion_con_etag(perfil, mysql_simulado):
+    etag = perfil().headers['ETag']
+    assert perfil(headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_escritura_concurrente_impide_guardar(perfil, monkeypatch, mysql_simulado, redis_simulado):
+    construir = routes.user._construir_perfil
+
+    def construir_y_editar(user_id):
+        cuerpo = construir(user_id)
+        cache.invalidar_perfil(user_id)   # Un PUT /perfil termina mientras se consultaba MySQL.
+        return cuerpo
+
+    monkeypatch.setattr(routes.user, '_construir_perfil', construir_y_editar)
+    perfil()
+    assert cache.clave_perfil('7') not in redis_simulado.datos
+
+
+def test_editar_el_perfil_invalida_el_agregado(perfil, mysql_simulado, redis_simulado, monkeypatch):
+    monkeypatch.setattr(routes.user, 'get_user_details', lambda user_id: {'id': 7, 'username': 'ana'})
+    mysql_simulado.filas['SELECT id FROM users'] = []
+    etag = perfil().headers['ETag']
+    assert cache.clave_perfil('7') in redis_simulado.datos
+
+    assert perfil('PUT', json={'descripcion': 'nueva', 'username': 'ana'}).status_code == 200
+    assert cache.clave_perfil('7') not in redis_simulado.datos
+    assert perfil(headers={'If-None-Match': etag}).status_code == 200
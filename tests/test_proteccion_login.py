@@ -0,0 +1,93 @@
+# Pruebas de la protección de /login: claves por cuenta normalizada, fallo abierto sin Redis y
+# respuesta 429 sin tocar MySQL ni bcrypt. Los límites en sí los aplican los scripts Lua.
+from types import SimpleNamespace
+
+import pytest
+
+import contrasenas
+import proteccion_login
+import routes.auth
+
+
+@pytest.fixture
+def scripts(monkeypatch):
+    """Sustituye los scripts Lua por funciones que registran sus claves y devuelven 'resultado'."""
+    llamadas = []
+    resultado = {'verificar': ['ok', 0], 'fallo': 1}
+
+    def script(nombre, codigo):
+        def ejecutar(keys, args):
+            llamadas.append((nombre, keys, args))
+            return resultado[nombre]
+        return ejecutar
+
+    monkeypatch.setattr(proteccion_login, 'redis_client', object())
+    monkeypatch.setattr(proteccion_login, '_script', script)
+    return SimpleNamespace(llamadas=llamadas, resultado=resultado)
+
+
+def test_las_claves_de_cuenta_usan_el_email_normalizado(scripts):
+    proteccion_login.verificar_intento('10.0.0.1', '  Ana@Example.COM ')
+    proteccion_login.registrar_fallo('ANA@example.com')
+    (_, claves_verificar, _), (_, claves_fallo, _) = scripts.llamadas
+    assert claves_verificar == ['login:intentos_ip:10.0.0.1', 'login:fallos:ana@example.com', 'login:bloqueo:ana@example.com']
+    assert claves_fallo == ['login:fallos:ana@example.com', 'login:bloqueo:ana@example.com']
+
+
+def test_miembros_distintos_para_intentos_simultaneos(scripts):
+    proteccion_login.verificar_intento('10.0.0.1', 'a@b.c')
+    proteccion_login.verificar_intento('10.0.0.1', 'a@b.c')
+    miembros = {args[-1] for _, _, args in scripts.llamadas}
+    assert len(miembros) == 2
+
+
+@pytest.mark.parametrize('respuesta, esperado', [
+    (['ok', 0], (None, 0)),
+    (['bloqueo', 899], ('bloqueo', 899)),
+    (['retraso', 4], ('retraso', 4)),
+])
+def test_resultado_del_script(scripts, respuesta, esperado):
+    scripts.resultado['verificar'] = respuesta
+    assert proteccion_login.verificar_intento('10.0.0.1', 'a@b.c') == esperado
+
+
+def test_sin_redis_se_permite_el_intento(monkeypatch):
+    monkeypatch.setattr(proteccion_login, 'redis_client', None)
+    assert proteccion_login.verificar_intento('10.0.0.1', 'a@b.c') == (None, 0)
+    proteccion_login.registrar_fallo('a@b.c')
+    proteccion_login.limpiar_fallos('a@b.c')
+
+
+def test_fallo_de_redis_se_permite_el_intento(monkeypatch):
+    def script_roto(nombre, codigo):
+        raise ConnectionError("Redis caído")
+    monkeypatch.setattr(proteccion_login, 'redis_client', object())
+    monkeypatch.setattr(proteccion_login, '_script', script_roto)
+    assert proteccion_login.verificar_intento('10.0.0.1', 'a@b.c') == (None, 0)
+
+
+@pytest.fixture
+def login(monkeypatch, app, conexion):
+    monkeypatch.setattr(routes.auth, 'mysql', SimpleNamespace(connection=conexion))
+    monkeypatch.setattr(contrasenas, 'verificar', lambda *args: pytest.fail("no debe ejecutar bcrypt"))
+
+    def llamar(email='ana@example.com', password='Secreta1!'):
+        with app.test_request_context('/login', method='POST', json={'email': email, 'password': password}):
+            respuesta, status = routes.auth.login()
+            return respuesta, status
+    return llamar
+
+
+def test_login_limitado_responde_429_sin_consultar(login, conexion, scripts):
+    scripts.resultado['verificar'] = ['ip', 120]
+    respuesta, status = login()
+    assert status == 429
+    assert respuesta.headers['Retry-After'] == '120'
+    assert conexion.sentencias == []
+
+
+def test_email_inexistente_cuenta_como_fallo_sin_bcrypt(login, conexion, scripts):
+    respuesta, status = login()
+    assert status == 401
+    assert [nombre for nombre, _, _ in scripts.llamadas] == ['verificar', 'fallo']
+    assert len(conexion.sentencias) == 1
@@ -0,0 +1,59 @@
+# Pruebas del array JSON escrito en streaming desde un cursor del servidor (?stream=1).
+import json
+
+import pytest
+
+import routes.user
+from routes.user import FILAS_POR_FRAGMENTO_STREAM, _respuesta_json_en_streaming
+
+
+def leer(app, cantidad_filas, mysql_simulado):
+    mysql_simulado.filas['SELECT'] = [{'id': i} for i in range(cantidad_filas)]
+    with app.test_request_context('/publicaciones?stream=1'):
+        respuesta = _respuesta_json_en_streaming("SELECT id FROM publicaciones", (), lambda fila: fila, descripcion='prueba')
+        fragmentos = list(respuesta.response)
+    return fragmentos
+
+
+@pytest.mark.parametrize('cantidad', [0, 1, FILAS_POR_FRAGMENTO_STREAM, FILAS_POR_FRAGMENTO_STREAM * 2 + 1])
+def test_el_stream_es_un_array_json_valido(app, mysql_simulado, cantidad):
+    fragmentos = leer(app, cantidad, mysql_simulado)
+    assert json.loads(''.join(fragmentos)) == [{'id': i} for i in range(cantidad)]
+    assert mysql_simulado.cursores[0].cerrado
+
+
+def test_se_escribe_un_fragmento_por_lote_de_filas(app, mysql_simulado):
+    fragmentos = leer(app, FILAS_POR_FRAGMENTO_STREAM * 2 + 1, mysql_simulado)
+    # '[' + tres lotes + ']': nunca se materializa el array completo.
+    assert len(fragmentos) == 5
+
+
+def test_error_de_sql_se_lanza_antes_de_enviar_encabezados(app, mysql_simulado):
+    mysql_simulado.errores['SELECT'] = RuntimeError("tabla inexistente")
+    with app.test_request_context('/publicaciones?stream=1'):
+        with pytest.raises(RuntimeError):
+            _respuesta_json_en_streaming("SELECT id FROM publicaciones", (), lambda fila: fila)
+    assert mysql_simulado.cursores[0].cerrado
+
+
+def test_cerrar_el_stream_a_medias_cierra_el_cursor(app, mysql_simulado):
+    mysql_simulado.filas['SELECT'] = [{'id': i} for i in range(FILAS_POR_FRAGMENTO_STREAM * 3)]
+    with app.test_request_context('/publicaciones?stream=1'):
+        respuesta = _respuesta_json_en_streaming("SELECT id FROM publicaciones", (), lambda fila: fila)
+        cuerpo = iter(respuesta.response)
+        next(cuerpo)
+        next(cuerpo)
+        # El cliente se desconecta: el servidor WSGI cierra el iterable de la respuesta.
+        respuesta.close()
+    assert mysql_simulado.cursores[0].cerrado
+
+
+def test_feed_con_stream_usa_el_cursor_del_servidor(app, monkeypatch, mysql_simulado):
+    clases = []
+    crear_cursor = mysql_simulado.cursor
+    monkeypatch.setattr(mysql_simulado, 'cursor', lambda clase=None: clases.append(clase) or crear_cursor(clase))
+    monkeypatch.setattr(routes.user, 'obtener_version', lambda recurso: None)
+    with app.test_request_context('/publicaciones?stream=1&view=summary'):
+        respuesta = routes.user.publicaciones()
+        assert json.loads(''.join(respuesta.response)) == []
+    assert clases == [routes.user.SSDictCursor]
@@ -0,0 +1,129 @@
+# Pruebas del buffer de telemetría: validación y agregación de eventos, y volcado exactamente una vez.
+from types import SimpleNamespace
+
+import pytest
+
+import telemetria
+from telemetria import COLUMNAS, MAX_CANTIDAD_POR_EVENTO, MAX_EVENTOS_POR_PETICION, STREAM_KEY
+
+
+def evento(tipo='mob_derrotado', dificultad_id=1, **extra):
+    return {'tipo': tipo, 'dificultad_id': dificultad_id, **extra}
+
+
+def test_agrupa_por_dificultad_y_columna():
+    por_dificultad, total = telemetria.agrupar_eventos([
+        evento(), evento(cantidad=4), evento('pergamino_raro'), evento(dificultad_id=2),
+    ])
+    assert total == 4
+    assert por_dificultad == {1: {'mobs_derrotados': 5, 'pergaminos_raros': 1}, 2: {'mobs_derrotados': 1}}
+
+
+@pytest.mark.parametrize('eventos', [
+    [],
+    {'tipo': 'mob_derrotado'},
+    [evento()] * (MAX_EVENTOS_POR_PETICION + 1),
+    ['mob_derrotado'],
+    [evento('jefe_derrotado')],
+    [evento(dificultad_id=0)],
+    [evento(dificultad_id='1')],
+    [evento(dificultad_id=True)],
+    [evento(cantidad=0)],
+    [evento(cantidad=MAX_CANTIDAD_POR_EVENTO + 1)],
+    [evento(cantidad=1.5)],
+])
+def test_eventos_invalidos(eventos):
+    with pytest.raises(ValueError):
+        telemetria.agrupar_eventos(eventos)
+
+
+def test_ids_del_stream():
+    assert telemetria._ms_de_id('1700000000123-4') == 1700000000123
+    assert telemetria._siguiente_id('1700000000123-4') == '1700000000123-5'
+    assert telemetria._siguiente_id('0-0') == '0-1'
+
+
+@pytest.fixture
+def redis_telemetria(monkeypatch, redis_simulado):
+    monkeypatch.setattr(telemetria, 'redis_client', redis_simulado)
+    return redis_simulado
+
+
+def test_sin_redis_no_se_aceptan_eventos(monkeypatch):
+    monkeypatch.setattr(telemetria, 'redis_client', None)
+    with pytest.raises(telemetria.TelemetriaNoDisponible):
+        telemetria.encolar_eventos(7, {1: {'mobs_derrotados': 1}})
+
+
+def test_una_entrada_por_dificultad(redis_telemetria):
+    telemetria.encolar_eventos(7, {1: {'mobs_derrotados': 3}, 2: {'pergaminos_raros': 1}})
+    entradas = redis_telemetria.xrange(STREAM_KEY)
+    assert [campos for _, campos in entradas] == [
+        {'u': '7', 'd': '1', 'mobs_derrotados': '3'},
+        {'u': '7', 'd': '2', 'pergaminos_raros': '1'},
+    ]
+
+
+def test_stream_saturado(redis_telemetria, monkeypatch):
+    monkeypatch.setattr(telemetria, 'MAX_ENTRADAS_PENDIENTES', 1)
+    telemetria.encolar_eventos(7, {1: {'mobs_derrotados': 1}})
+    with pytest.raises(telemetria.TelemetriaSaturada):
+        telemetria.encolar_eventos(7, {1: {'mobs_derrotados': 1}})
+
+
+@pytest.fixture
+def volcado(monkeypatch, conexion, redis_telemetria):
+    monkeypatch.setattr(telemetria, 'mysql', SimpleNamespace(connection=conexion))
+    conexion.filas['SELECT id FROM users'] = [(7,), (8,)]
+    conexion.filas['SELECT id FROM dificultades'] = [(1,), (2,)]
+    return conexion
+
+
+def test_volcado_suma_el_lote_en_un_unico_upsert(volcado, redis_telemetria):
+    telemetria.encolar_eventos(7, {1: {'mobs_derrotados': 3}})
+    telemetria.encolar_eventos(7, {1: {'mobs_derrotados': 2, 'pergaminos_epicos': 1}})
+    telemetria.encolar_eventos(8, {2: {'pergaminos_raros': 1}})
+    # Usuario eliminado y dificultad inexistente: se descartan sin romper el lote.
+    telemetria.encolar_eventos(9, {1: {'mobs_derrotados': 1}})
+    telemetria.encolar_eventos(7, {5: {'mobs_derrotados': 1}})
+    ultimo_id = redis_telemetria.xrange(STREAM_KEY)[-1][0]
+
+    assert telemetria.volcar_eventos()[:2] == (5, 2)
+    upserts = [(s, p) for s, p in volcado.sentencias if s.startswith('INSERT INTO partidas')]
+    assert len(upserts) == 1
+    valores = upserts[0][1]
+    fila_7 = dict(zip(COLUMNAS, valores[2:2 + len(COLUMNAS)]))
+    assert valores[:2] == [7, 1] and fila_7['mobs_derrotados'] == 5 and fila_7['pergaminos_epicos'] == 1
+    assert valores[2 + len(COLUMNAS):4 + len(COLUMNAS)] == [8, 2]
+    assert volcado.sentencias[-1] == ("UPDATE telemetria_checkpoint SET ultimo_id = %s WHERE stream = %s", (ultimo_id, STREAM_KEY))
+    assert volcado.commits == 1
+    assert redis_telemetria.xlen(STREAM_KEY) == 0
+    assert redis_telemetria.hgetall(telemetria.METRICAS_KEY)['entradas_volcadas'] == '5'
+
+
+def test_el_checkpoint_evita_volcar_dos_veces(volcado, redis_telemetria):
+    telemetria.encolar_eventos(7, {1: {'mobs_derrotados': 3}})
+    ya_aplicada = redis_telemetria.xrange(STREAM_KEY)[0][0]
+    telemetria.encolar_eventos(7, {1: {'mobs_derrotados': 1}})
+    # El proceso anterior murió tras el commit y antes del XDEL.
+    volcado.filas['SELECT ultimo_id'] = [(ya_aplicada,)]
+
+    assert telemetria.volcar_eventos()[0] == 1
+    (_, valores), = [(s, p) for s, p in volcado.sentencias if s.startswith('INSERT INTO partidas')]
+    assert dict(zip(COLUMNAS, valores[2:]))['mobs_derrotados'] == 1
+
+
+def test_primer_volcado_crea_el_checkpoint(volcado):
+    volcado.filas['SELECT ultimo_id'] = []
+    assert telemetria.volcar_eventos() == (0, 0, 0)
+    assert volcado.sentencias[1][0].startswith('INSERT INTO telemetria_checkpoint')
+    assert volcado.commits == 1
+
+
+def test_error_en_el_upsert_no_toca_el_stream(volcado, redis_telemetria):
+    telemetria.encolar_eventos(7, {1: {'mobs_derrotados': 3}})
+    volcado.errores['INSERT INTO partidas'] = RuntimeError("deadlock")
+    with pytest.raises(RuntimeError):
+        telemetria.volcar_eventos()
+    assert volcado.rollbacks == 1
+    assert redis_telemetria.xlen(STREAM_KEY) == 1
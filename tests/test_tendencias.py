@@ -0,0 +1,42 @@
+# Pruebas de la puntuación "hot": la fórmula que aplican el script Lua y la reconstrucción.
+import pytest
+
+from tendencias import (
+    MAX_PUBLICACIONES_HOT, MAX_VIDAS_MEDIAS_EPOCA, PESO_COMENTARIO, PESO_IMAGEN, PESO_PUBLICACION,
+    PUNTUACION_MINIMA, VIDA_MEDIA_SEGUNDOS, contribucion
+)
+
+EPOCA = 1_700_000_000
+
+
+def test_evento_en_la_epoca_suma_su_peso():
+    assert contribucion(PESO_PUBLICACION, EPOCA, EPOCA) == PESO_PUBLICACION
+
+
+def test_cada_vida_media_duplica_el_valor_de_los_eventos_nuevos():
+    assert contribucion(PESO_COMENTARIO, EPOCA + VIDA_MEDIA_SEGUNDOS, EPOCA) == pytest.approx(2 * PESO_COMENTARIO)
+    assert contribucion(PESO_COMENTARIO, EPOCA - VIDA_MEDIA_SEGUNDOS, EPOCA) == pytest.approx(PESO_COMENTARIO / 2)
+
+
+def test_publicacion_reciente_supera_a_una_antigua_con_mas_actividad():
+    antigua = contribucion(PESO_PUBLICACION, EPOCA, EPOCA) + 3 * contribucion(PESO_COMENTARIO, EPOCA, EPOCA)
+    reciente = contribucion(PESO_PUBLICACION, EPOCA + 2 * VIDA_MEDIA_SEGUNDOS, EPOCA)
+    assert reciente > antigua
+
+
+def test_reescalar_a_otra_epoca_conserva_el_orden():
+    # decaer_tendencias multiplica todo el set por 2^-(nueva - epoca) / VIDA_MEDIA: el ranking no cambia.
+    nueva_epoca = EPOCA + 5 * VIDA_MEDIA_SEGUNDOS
+    factor = 2 ** (-(nueva_epoca - EPOCA) / VIDA_MEDIA_SEGUNDOS)
+    eventos = [(PESO_PUBLICACION, EPOCA + 100), (PESO_IMAGEN, EPOCA + 7200), (PESO_COMENTARIO, EPOCA + 40000)]
+    for peso, instante in eventos:
+        assert contribucion(peso, instante, EPOCA) * factor == pytest.approx(contribucion(peso, instante, nueva_epoca))
+
+
+def test_el_umbral_de_epoca_mantiene_las_puntuaciones_acotadas():
+    # Con la época como mucho MAX_VIDAS_MEDIAS_EPOCA vidas medias atrás, incluso una publicación
+    # con la máxima actividad posible sigue lejos del límite de precisión entera de un double,
+    # y el reescalado no borra eventos recientes por debajo de PUNTUACION_MINIMA.
+    maximo = contribucion(PESO_PUBLICACION, EPOCA + MAX_VIDAS_MEDIAS_EPOCA * VIDA_MEDIA_SEGUNDOS, EPOCA)
+    assert maximo * MAX_PUBLICACIONES_HOT < 2 ** 53
+    assert contribucion(PESO_IMAGEN, EPOCA, EPOCA) > PUNTUACION_MINIMA
@@ -0,0 +1,95 @@
+# Pruebas del cursor opaco de la paginación por posición (keyset).
+from datetime import datetime
+
+import pytest
+
+from utils import codificar_cursor, decodificar_cursor, obtener_limite, recortar_pagina
+
+
+def test_cursor_ida_y_vuelta():
+    created_at = datetime(2025, 6, 30, 12, 34, 56, 789000)
+    cursor = codificar_cursor(created_at, 42)
+    assert decodificar_cursor(cursor) == (created_at, 42)
+
+
+def test_cursor_es_apto_para_urls():
+    cursor = codificar_cursor(datetime(2025, 1, 1), 7)
+    assert '=' not in cursor
+    assert '+' not in cursor and '/' not in cursor
+
+
+def test_cursor_acepta_created_at_en_texto():
+    cursor = codificar_cursor('2025-01-01T00:00:00', 3)
+    assert decodificar_cursor(cursor) == (datetime(2025, 1, 1), 3)
+
+
+def test_cursores_distintos_para_el_mismo_instante():
+    # Dos filas con el mismo created_at se distinguen por el id.
+    instante = datetime(2025, 1, 1)
+    assert codificar_cursor(instante, 1) != codificar_cursor(instante, 2)
+
+
+@pytest.mark.parametrize('cursor', ['', 'no-es-base64!', codificar_cursor('no es una fecha', 1), 'WzFd'])
+def test_cursor_invalido(cursor):
+    with pytest.raises(ValueError):
+        decodificar_cursor(cursor)
+
+
+@pytest.mark.parametrize('valor, esperado', [(None, 20), ('', 20), ('5', 5), ('1000', 100)])
+def test_obtener_limite(valor, esperado):
+    assert obtener_limite(valor) == esperado
+
+
+@pytest.mark.parametrize('valor', ['0', '-3', 'abc'])
+def test_obtener_limite_invalido(valor):
+    with pytest.raises(ValueError):
+        obtener_limite(valor)
+
+
+def test_cursor_no_canonico_se_recodifica_igual():
+    # decodificar_cursor tolera caracteres sobrantes; las rutas recodifican la posición para que
+    # la clave de caché y el ETag no dependan de la forma exacta del cursor recibido.
+    canonico = codificar_cursor(datetime(2025, 6, 30, 12, 0), 42)
+    posicion = decodificar_cursor(canonico + '""""')
+    assert codificar_cursor(*posicion) == canonico
+
+
+# --- Límites de página (LIMIT limite + 1) ---
+
+def filas_de_prueba():
+    """Filas ordenadas como el feed (created_at DESC, id DESC), con varios empates de created_at."""
+    instantes = [datetime(2025, 1, 1, 12, 0, s) for s in (5, 5, 5, 4, 3, 3, 2, 1, 1, 1, 0)]
+    filas = [{'id': 100 - i, 'created_at': instante} for i, instante in enumerate(instantes)]
+    return sorted(filas, key=lambda f: (f['created_at'], f['id']), reverse=True)
+
+
+def leer_pagina(filas, posicion, limite):
+    """Equivalente en memoria de 'WHERE (created_at, id) < (%s, %s) ... LIMIT limite + 1'."""
+    if posicion is not None:
+        filas = [f for f in filas if (f['created_at'], f['id']) < posicion]
+    return filas[:limite + 1]
+
+
+@pytest.mark.parametrize('cantidad, hay_mas', [(0, False), (4, False), (5, False), (6, True)])
+def test_recortar_pagina_en_los_limites(cantidad, hay_mas):
+    filas = filas_de_prueba()[:cantidad]
+    pagina, next_cursor = recortar_pagina(filas, 5)
+    assert pagina == filas[:5]
+    assert (next_cursor is not None) is hay_mas
+    if hay_mas:
+        assert decodificar_cursor(next_cursor) == (pagina[-1]['created_at'], pagina[-1]['id'])
+
+
+@pytest.mark.parametrize('limite', [1, 2, 3, 4, 10, 11, 50])
+def test_recorrer_todas_las_paginas_sin_repetir_ni_saltar(limite):
+    # Los empates de created_at caen en los bordes de página con varios límites: el orden
+    # (created_at, id) garantiza que cada fila aparece exactamente una vez.
+    filas = filas_de_prueba()
+    vistas, posicion = [], None
+    while True:
+        pagina, next_cursor = recortar_pagina(leer_pagina(filas, posicion, limite), limite)
+        vistas.extend(pagina)
+        if next_cursor is None:
+            break
+        posicion = decodificar_cursor(next_cursor)
+    assert vistas == filas
@@ -1,16 +1,13 @@
 import random
 import string
-from email.mime.text import MIMEText
-from email.header import Header
-import smtplib
-import os
-from dotenv import load_dotenv
+import base64
+import json
+from datetime import datetime
+from correo import obtener_transporte, construir_mensaje
 
-load_dotenv()
-
-
-MAIL_USER = os.getenv('MAIL_USER')
-MAIL_PASS = os.getenv('MAIL_PASS') 
+# --- Parámetros de paginación por cursor (keyset) ---
+LIMITE_POR_DEFECTO = 20
+LIMITE_MAXIMO = 100
 
 def generar_token():
     return ''.join(random.choices(string.ascii_letters + string.digits, k=64))
@@ -20,16 +17,55 @@ def generar_codigo_verificacion():
 
 def enviar_correo_verificacion(destinatario, codigo):
     cuerpo = f"Tu código de verificación es: {codigo}"
-    msg = MIMEText(cuerpo, 'plain', 'utf-8')
-    msg['Subject'] = Header('Código de Verificación', 'utf-8')
-    msg['From'] = MAIL_USER
-    msg['To'] = destinatario
+    msg = construir_mensaje(destinatario, 'Código de Verificación', cuerpo, 'plain')
 
     try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(MAIL_USER, MAIL_PASS)
-            server.send_message(msg)
+        obtener_transporte().enviar(msg)
         return True
     except Exception as e:
         print("Error al enviar correo:", str(e))
         return False
+
+def codificar_cursor(created_at, registro_id):
+    """
+    Codifica la posición (created_at, id) del último elemento de una página
+    en un cursor opaco apto para URLs.
+    """
+    created_at_str = created_at.isoformat() if isinstance(created_at, datetime) else created_at
+    crudo = json.dumps([created_at_str, registro_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor):
+    """
+    Decodifica un cursor generado por codificar_cursor.
+    Retorna la tupla (created_at, id) o lanza ValueError si el cursor es inválido.
+    """
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        created_at_str, registro_id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return datetime.fromisoformat(created_at_str), int(registro_id)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+def recortar_pagina(filas, limite):
+    """
+    Recorta a 'limite' elementos una página leída con LIMIT limite + 1: la fila extra solo indica
+    que existe una página siguiente. Retorna (pagina, next_cursor), con next_cursor apuntando al
+    último elemento devuelto, o None si no hay más.
+    """
+    if len(filas) <= limite:
+        return filas, None
+    pagina = filas[:limite]
+    return pagina, codificar_cursor(pagina[-1]['created_at'], pagina[-1]['id'])
+
+def obtener_limite(valor, por_defecto=LIMITE_POR_DEFECTO, maximo=LIMITE_MAXIMO):
+    """
+    Convierte el parámetro 'limit' de la query string en un entero dentro de [1, maximo].
+    Lanza ValueError si el valor no es un entero positivo.
+    """
+    if valor is None or valor == '':
+        return por_defecto
+    limite = int(valor)
+    if limite < 1:
+        raise ValueError("El parámetro 'limit' debe ser un entero positivo.")
+    return min(limite, maximo)